@@ -1,13 +1,21 @@
 from abc import ABC, abstractmethod
 import json
+import logging
 import uuid
+from datetime import datetime
 from typing import Any, Optional
 
+logger = logging.getLogger(__name__)
+
 class AbstractWorkerAgent(ABC):
     """
     Abstract Base Class for all worker agents, including LTM functionality.
     """
 
+    # Subclasses may provide an IdempotencyStore (see agents/idempotency.py)
+    # so a redelivered task_assignment gets its original report again
+    idempotency = None
+
     def __init__(self, agent_id: str, supervisor_id: str):
         self._id = agent_id
         self._supervisor_id = supervisor_id
@@ -47,38 +55,63 @@ class AbstractWorkerAgent(ABC):
 
     # --- Concrete Methods (Shared Communication Protocol) ---
 
-    def handle_incoming_message(self, json_message: str):
-        """Receives and processes an incoming JSON message from the supervisor."""
+    def handle_incoming_message(self, message):
+        """
+        Receives and processes one message from the supervisor: a JSON
+        string, or an already-decoded dict when it came over a transport.
+        """
         try:
-            message = json.loads(json_message)
+            if isinstance(message, (str, bytes)):
+                message = json.loads(message)
             msg_type = message.get("type")
             
             if msg_type == "task_assignment":
                 task_params = message.get("task", {}).get("parameters", {})
                 self._current_task_id = message.get("message_id")
-                print(f"[{self._id}] received task: {message['task']['name']}")
+                logger.info("[%s] received task: %s", self._id, message['task']['name'])
                 self._execute_task(task_params, self._current_task_id)
             
         except json.JSONDecodeError as e:
-            print(f"[{self._id}] ERROR decoding message: {e}")
+            logger.error("[%s] ERROR decoding message: %s", self._id, e)
+
+    def handle_incoming_messages(self, messages: list):
+        """Handles a batch delivered by a transport, in order."""
+        for message in messages:
+            self.handle_incoming_message(message)
+
+    def listen(self, transport):
+        """Subscribes to this agent's mailbox on a transport (see agents/transport.py)."""
+        transport.subscribe(self._id, self.handle_incoming_messages)
+        logger.info("[%s] listening for tasks on %s", self._id, type(transport).__name__)
 
     def _execute_task(self, task_data: dict, related_msg_id: str):
         """Executes the concrete process_task logic and handles result reporting."""
-        status = "FAILURE"
-        results = {}
-        
+        def run():
+            return self._completion_report(related_msg_id, "SUCCESS", self.process_task(task_data))
+
+        store = self.idempotency
         try:
-            results = self.process_task(task_data)
-            status = "SUCCESS"
+            if store is not None and related_msg_id:
+                report, replayed = store.run(related_msg_id, run, task_data)
+                if replayed:
+                    logger.info("[%s] re-sending the report for duplicate task %s", self._id, related_msg_id)
+            else:
+                report = run()
         except Exception as e:
             results = {"error": str(e), "details": "Task processing failed."}
-            print(f"[{self._id}] Task FAILED: {e}")
-            
-        self._report_completion(related_msg_id, status, results)
+            logger.exception("[%s] Task FAILED: %s", self._id, e)
+            report = self._completion_report(related_msg_id, "FAILURE", results)
+
+        self.send_message(self._supervisor_id, report)
+        self._current_task_id = None
 
     def _report_completion(self, related_msg_id: str, status: str, results: dict):
-        """Constructs and sends a task completion report."""
-        report = {
+        """Constructs a task completion report and publishes it to the supervisor."""
+        self.send_message(self._supervisor_id, self._completion_report(related_msg_id, status, results))
+        self._current_task_id = None
+
+    def _completion_report(self, related_msg_id: str, status: str, results: dict) -> dict:
+        return {
             "message_id": str(uuid.uuid4()),
             "sender": self._id,
             "recipient": self._supervisor_id,
@@ -86,7 +119,5 @@ class AbstractWorkerAgent(ABC):
             "related_message_id": related_msg_id,
             "status": status,
             "results": results,
-            "timestamp": "..." 
-        }
-        self.send_message(self._supervisor_id, report)
-        self._current_task_id = None
\ No newline at end of file
+            "timestamp": datetime.now().isoformat()
+        }
\ No newline at end of file
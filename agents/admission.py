@@ -0,0 +1,304 @@
+"""
+Priority-aware admission control in front of process_task.
+
+Each task is triaged with the cheap rule stage (the same thresholds as
+analyze_risk_and_factors, via batch_scoring.score_rules) plus the
+employee's trend state, before any graph or LLM work:
+
+    lane      "fast" for low-risk and trend cases (template answers),
+              "deep" for medium/high risk (may call the LLM)
+    priority  high (high risk or a trend), medium, low
+
+Each lane runs at most BURNOUT_ADMISSION_*_WORKERS tasks at once, and
+up to BURNOUT_ADMISSION_*_QUEUE more wait for a slot, highest priority
+first. A freed slot goes straight to the best waiter. When a queue is
+full, a higher-priority arrival evicts the lowest-priority waiter;
+otherwise the arrival itself is shed. Shed (or waited out, after
+BURNOUT_ADMISSION_MAX_WAIT) medium-priority deep work is degraded: it
+runs on the fast lane with the LLM switched off, so it gets a cached
+answer or the template (response_meta.fallback_reason "shed"). Anything
+else that is shed raises Overloaded, which the servers turn into
+429 + Retry-After.
+
+Queue waits land in burnout_admission_wait_ms and /api/v1/status.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import threading
+import time
+
+from agents import config, llm_guard, metrics
+from agents.batch_scoring import score_rules
+from agents.trend_state import trend_detected
+
+logger = logging.getLogger(__name__)
+
+HIGH, MEDIUM, LOW = 0, 1, 2
+PRIORITY_NAMES = {HIGH: "high", MEDIUM: "medium", LOW: "low"}
+
+ADMISSION_TOTAL = metrics.REGISTRY.counter(
+    "burnout_admission_total", "Tasks admitted, queued, degraded or shed, per lane.", ("lane", "outcome"))
+
+
+class Overloaded(Exception):
+    """No slot for the task; `retry_after` is a suggested wait in whole seconds."""
+
+    def __init__(self, lane: str, retry_after: int):
+        super().__init__(f"{lane} lane is full; retry in {retry_after}s")
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+def classify(task_data: dict, trend=None) -> tuple:
+    """(lane, priority) from the threshold rules and, for medium risk, the trend rule."""
+    risk = int(score_rules([task_data])[0][0])
+    if risk == 1 and trend_detected(trend):
+        return "fast", HIGH  # answered from the trend template
+    if risk == 0:
+        return "fast", LOW
+    return "deep", HIGH if risk == 2 else MEDIUM
+
+
+class _Waiter:
+    """One queued task. Woken through an Event (threads) or a Future on its loop (coroutines)."""
+
+    __slots__ = ("priority", "state", "event", "loop", "future")
+
+    def __init__(self, priority: int, loop=None):
+        self.priority = priority
+        self.state = "queued"  # -> running | evicted | timeout (or rejected on arrival)
+        self.loop = loop
+        self.event = None if loop else threading.Event()
+        self.future = loop.create_future() if loop else None
+
+    def wake(self):
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class Lane:
+    """A bounded priority queue in front of `workers` slots."""
+
+    def __init__(self, name: str, workers: int, capacity: int, service_s: float):
+        self.name = name
+        self.workers = max(1, workers)
+        self.capacity = max(0, capacity)
+        self.running = 0
+        self._queue = []  # (priority, seq, waiter): best first
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        # Smoothed seconds per task, for Retry-After
+        self._service_s = service_s
+
+    def enter(self, priority: int, loop=None) -> _Waiter:
+        """A waiter that is running, queued, or rejected (queue full of equal or better work)."""
+        waiter = _Waiter(priority, loop)
+        evicted = None
+        with self._lock:
+            if self.running < self.workers and not self._queue:
+                self.running += 1
+                waiter.state = "running"
+                return waiter
+            if len(self._queue) >= self.capacity:
+                worst = max(self._queue, key=lambda item: (item[0], item[1]), default=None)
+                if worst is None or worst[0] <= priority:
+                    waiter.state = "rejected"
+                    return waiter
+                self._queue.remove(worst)
+                heapq.heapify(self._queue)
+                evicted = worst[2]
+                evicted.state = "evicted"
+            heapq.heappush(self._queue, (priority, next(self._seq), waiter))
+        if evicted is not None:
+            evicted.wake()
+        return waiter
+
+    def settle(self, waiter: _Waiter) -> str:
+        """After a wait ended: the waiter's final state, taking it out of the queue if it timed out."""
+        with self._lock:
+            if waiter.state == "queued":
+                waiter.state = "timeout"
+                self._queue = [item for item in self._queue if item[2] is not waiter]
+                heapq.heapify(self._queue)
+            return waiter.state
+
+    def release(self, service_s: float = None):
+        """Frees a slot, handing it to the best waiter if there is one."""
+        with self._lock:
+            if service_s is not None:
+                self._service_s += 0.2 * (service_s - self._service_s)
+            if not self._queue:
+                self.running -= 1
+                return
+            waiter = heapq.heappop(self._queue)[2]
+            waiter.state = "running"
+        waiter.wake()
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have drained, 1-60."""
+        with self._lock:
+            backlog = self.running + len(self._queue)
+            service_s = self._service_s
+        return int(min(60, max(1, math.ceil(backlog / self.workers * service_s))))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "running": self.running,
+                "queued": len(self._queue),
+                "workers": self.workers,
+                "capacity": self.capacity,
+            }
+
+
+class AdmissionController:
+    """The fast and deep lanes, plus the shedding policy between them."""
+
+    def __init__(self, fast_workers: int = None, fast_queue: int = None, deep_workers: int = None,
+                 deep_queue: int = None, max_wait: float = None, degrade: bool = None):
+        self.lanes = {
+            "fast": Lane("fast", fast_workers or config.ADMISSION_FAST_WORKERS,
+                         config.ADMISSION_FAST_QUEUE if fast_queue is None else fast_queue, 0.05),
+            "deep": Lane("deep", deep_workers or config.ADMISSION_DEEP_WORKERS,
+                         config.ADMISSION_DEEP_QUEUE if deep_queue is None else deep_queue, 2.0),
+        }
+        self.max_wait = config.ADMISSION_MAX_WAIT if max_wait is None else max_wait
+        self.degrade = config.ADMISSION_DEGRADE if degrade is None else degrade
+        metrics.REGISTRY.register_callback(
+            "burnout_admission", "Tasks running and queued per admission lane.", self._gauges)
+
+    def _wait_limit(self, deadline: float = None) -> float:
+        if deadline is None:
+            return self.max_wait
+        return max(0.0, min(self.max_wait, deadline - time.time()))
+
+    def _shed(self, lane: Lane, priority: int, outcome: str) -> bool:
+        """Counts the shed task; True if it should be degraded rather than rejected."""
+        ADMISSION_TOTAL.inc(lane=lane.name, outcome=outcome)
+        degrade = self.degrade and lane.name == "deep" and priority == MEDIUM
+        if not degrade:
+            logger.warning("[Admission] %s %s-priority task shed (%s)",
+                           lane.name, PRIORITY_NAMES[priority], outcome)
+        return degrade
+
+    def _admitted(self, lane: Lane, priority: int, queued_at: float, queued: bool):
+        ADMISSION_TOTAL.inc(lane=lane.name, outcome="queued" if queued else "admitted")
+        metrics.ADMISSION_WAIT.observe((time.monotonic() - queued_at) * 1000,
+                                       lane=lane.name, priority=PRIORITY_NAMES[priority])
+
+    # --- Sync ---
+
+    def _acquire(self, lane: Lane, priority: int, deadline: float = None) -> str:
+        queued_at = time.monotonic()
+        waiter = lane.enter(priority)
+        if waiter.state == "queued":
+            waiter.event.wait(self._wait_limit(deadline))
+            state = lane.settle(waiter)
+        else:
+            state = waiter.state
+        if state == "running":
+            self._admitted(lane, priority, queued_at, waiter.event.is_set())
+        return state
+
+    def run(self, lane: str, priority: int, compute, deadline: float = None):
+        """compute() once a slot on `lane` is free; degraded or Overloaded if none comes."""
+        lane = self.lanes[lane]
+        state = self._acquire(lane, priority, deadline)
+        if state != "running":
+            if not self._shed(lane, priority, state):
+                raise Overloaded(lane.name, lane.retry_after())
+            return self._run_degraded(compute, deadline)
+        start = time.monotonic()
+        try:
+            return compute()
+        finally:
+            lane.release(time.monotonic() - start)
+
+    def _run_degraded(self, compute, deadline: float = None):
+        fast = self.lanes["fast"]
+        state = self._acquire(fast, MEDIUM, deadline)
+        if state != "running":
+            ADMISSION_TOTAL.inc(lane="fast", outcome=state)
+            raise Overloaded("deep", self.lanes["deep"].retry_after())
+        ADMISSION_TOTAL.inc(lane="deep", outcome="degraded")
+        start = time.monotonic()
+        try:
+            with llm_guard.template_only("shed"):
+                return compute()
+        finally:
+            fast.release(time.monotonic() - start)
+
+    # --- Async ---
+
+    async def _aacquire(self, lane: Lane, priority: int, deadline: float = None) -> str:
+        queued_at = time.monotonic()
+        waiter = lane.enter(priority, asyncio.get_running_loop())
+        if waiter.state != "queued":
+            state = waiter.state
+        else:
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter.future), self._wait_limit(deadline))
+            except asyncio.TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                # Client went away: give back a slot that was handed over meanwhile
+                if lane.settle(waiter) == "running":
+                    lane.release()
+                raise
+            state = lane.settle(waiter)
+        if state == "running":
+            self._admitted(lane, priority, queued_at, waiter.future is not None and waiter.future.done())
+        return state
+
+    async def arun(self, lane: str, priority: int, acompute, deadline: float = None):
+        """Async run(): acompute() returns an awaitable; waiting doesn't block the loop."""
+        lane = self.lanes[lane]
+        state = await self._aacquire(lane, priority, deadline)
+        if state != "running":
+            if not self._shed(lane, priority, state):
+                raise Overloaded(lane.name, lane.retry_after())
+            return await self._arun_degraded(acompute, deadline)
+        start = time.monotonic()
+        try:
+            return await acompute()
+        finally:
+            lane.release(time.monotonic() - start)
+
+    async def _arun_degraded(self, acompute, deadline: float = None):
+        fast = self.lanes["fast"]
+        state = await self._aacquire(fast, MEDIUM, deadline)
+        if state != "running":
+            ADMISSION_TOTAL.inc(lane="fast", outcome=state)
+            raise Overloaded("deep", self.lanes["deep"].retry_after())
+        ADMISSION_TOTAL.inc(lane="deep", outcome="degraded")
+        start = time.monotonic()
+        try:
+            with llm_guard.template_only("shed"):
+                return await acompute()
+        finally:
+            fast.release(time.monotonic() - start)
+
+    # --- Stats ---
+
+    def _gauges(self) -> dict:
+        gauges = {}
+        for name, lane in self.lanes.items():
+            stats = lane.stats()
+            gauges[f"{name}_running"] = stats["running"]
+            gauges[f"{name}_queued"] = stats["queued"]
+        return gauges
+
+    def stats(self) -> dict:
+        stats = {name: lane.stats() for name, lane in self.lanes.items()}
+        stats["outcomes"] = {"/".join(key): value for key, value in ADMISSION_TOTAL.values().items()}
+        return stats
@@ -0,0 +1,64 @@
+import numpy as np
+
+# Same thresholds and factor names as analyze_risk_and_factors, in the same order
+FACTOR_NAMES = [
+    "high_stress",
+    "medium_stress",
+    "long_work_hours",
+    "moderate_overtime",
+    "poor_sleep",
+    "negative_mood",
+]
+NEGATIVE_MOODS = ["anxious", "frustrated"]
+RISK_MAP = {0: "low", 1: "medium", 2: "high"}
+# Value each rule input takes when it is missing or not a number
+RULE_DEFAULTS = {"stress": 0.0, "work_hours": 0.0, "sleep_hours": 7.0}
+
+
+def _number(value, default: float) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def rule_inputs(params: dict):
+    """
+    Reads (stress, work_hours, sleep_hours, mood) from one parameter set the
+    way every rule path does: numeric strings become floats, missing or
+    unreadable numbers fall back to RULE_DEFAULTS and mood is a string.
+    """
+    stress, hours, sleep = (_number(params.get(name), default) for name, default in RULE_DEFAULTS.items())
+    return stress, hours, sleep, str(params.get('mood', 'ok'))
+
+
+def score_rules(params_list: list):
+    """
+    Scores the threshold rules for a whole batch with NumPy column operations.
+
+    Returns (risk_scores, factors): an int array of 0/1/2 per row (before any
+    trend elevation) and each row's factor list in rule order.
+    """
+    inputs = [rule_inputs(p) for p in params_list]
+    stress = np.array([row[0] for row in inputs], dtype=float)
+    hours = np.array([row[1] for row in inputs], dtype=float)
+    sleep = np.array([row[2] for row in inputs], dtype=float)
+    mood = np.array([row[3] for row in inputs], dtype=object)
+
+    high_stress = stress > 7
+    medium_stress = (stress > 4) & ~high_stress
+    long_hours = hours > 10
+    overtime = (hours > 8) & ~long_hours
+    poor_sleep = sleep < 6
+    negative_mood = np.isin(mood, NEGATIVE_MOODS)
+
+    flags = np.column_stack([
+        high_stress, medium_stress, long_hours, overtime, poor_sleep, negative_mood
+    ])
+    # Column i contributes this score when its flag is set
+    weights = np.array([2, 1, 2, 1, 1, 1])
+    risk_scores = (flags * weights).max(axis=1) if len(params_list) else np.zeros(0, dtype=int)
+
+    names = np.array(FACTOR_NAMES, dtype=object)
+    factors = [list(names[row]) or ["healthy_habits"] for row in flags]
+    return risk_scores.astype(int), factors
@@ -1,45 +1,308 @@
-import json
+import asyncio
+import atexit
+import copy
+import logging
 import os
-import uuid
-import chromadb # <--- NEW IMPORT
+import threading
 from datetime import datetime
+from agents import admission, config, llm_guard, metrics
 from agents.Abstract_Class_Worker_Agent import AbstractWorkerAgent
-from agents.burnout_graph import burnout_app, BurnoutState 
+from agents.burnout_graph import (
+    BurnoutState,
+    analyze_risk_and_factors, decide_next_step,
+    generate_ai_response, generate_quick_response, format_response,
+    stream_ai_response,
+)
+from agents import burnout_graph
+from agents.batch_scoring import score_rules, RISK_MAP
+from agents.history_index import HistoryIndex, StoreHistoryView
+from agents.idempotency import IdempotencyStore, SqliteIdempotencyStore
+from agents.rollups import RollupStore
+from agents import ltm_compaction, ltm_snapshot
+from agents.ltm_store import create_ltm_store, entry_employee_id, DEFAULT_EMPLOYEE
+from agents.startup_timing import timed
+from agents.transport import TransportFull, current_transport, get_transport
+from agents.trend_state import TrendTracker, trend_from_entries, trend_detected
+from agents.vector_records import build_record, collection_name, new_entry_id, to_case, where_clause
+from agents.vector_writer import ChromaBatchWriter
+
+logger = logging.getLogger(__name__)
 
 class BurnoutPreventionAgent(AbstractWorkerAgent):
 
-    def __init__(self, agent_id: str, supervisor_id: str):
+    def __init__(self, agent_id: str, supervisor_id: str, ltm_dir: str = None, chroma_path: str = None):
         super().__init__(agent_id, supervisor_id)
-        print(f"[{self._id}] Burnout Agent is online.")
+        logger.info("[%s] Burnout Agent is online.", self._id)
         
-        # 1. JSON LTM Path (File Storage)
-        self._ltm_path = os.path.join("LTM", self._id, "memory.json")
-        os.makedirs(os.path.dirname(self._ltm_path), exist_ok=True)
+        # 1. LTM (append-only JSON-lines per employee, or SQLite; see config).
+        # Shard workers pass their own partition (see agents/sharding.py).
+        self._ltm_dir = ltm_dir or os.path.join(config.LTM_DIR, self._id)
+        self._ltm_path = os.path.join(self._ltm_dir, "memory.json")  # legacy single file
+        self._chroma_path = chroma_path or config.CHROMA_PATH
 
-        # 2. ChromaDB Setup (Vector Storage) - NEW
-        # This creates a local folder 'chroma_db' to store vector memory
-        try:
-            self.chroma_client = chromadb.PersistentClient(path="./chroma_db")
-            self.collection = self.chroma_client.get_or_create_collection(name="burnout_memory")
-            print(f"[{self._id}] ChromaDB initialized.")
-        except Exception as e:
-            print(f"[{self._id}] Warning: ChromaDB failed to init: {e}")
-            self.collection = None
+        # LTM store, history index and ChromaDB are built lazily on first use
+        # (or by warm_up()), so constructing the agent is cheap.
+        self._init_lock = threading.RLock()
+        self._ltm = None
+        self._history_index = None
+        self._trend_tracker = None
+        self._snapshot = None
+        self._rollups = None
+        self._idempotency = None
+        self._memory_ready = False
+        # Held while an entry is appended and the in-memory index/trend updated
+        self._write_lock = threading.RLock()
+        self._chroma_ready = False
+        self.chroma_client = None
+        self._collection = None
+        self._vector_writer = None
+        self._compaction_scheduler = None
+        self._snapshot_job = None
+        atexit.register(self.shutdown)
+
+    # --- Lazy Components ---
 
-    def process_task(self, task_data: dict) -> dict:
+    @property
+    def ltm(self):
+        if self._ltm is None:
+            with self._init_lock:
+                if self._ltm is None:
+                    with timed("init:ltm_store"):
+                        ltm = create_ltm_store(self._ltm_dir)
+                        try:
+                            ltm.migrate_legacy(self._ltm_path)
+                        except Exception as e:
+                            logger.warning("[%s] LTM migration failed: %s", self._id, e)
+                    self._ltm = ltm
+                    if config.LTM_COMPACT_INTERVAL > 0:
+                        self._compaction_scheduler = ltm_compaction.PeriodicJob(self.compact_ltm).start()
+        return self._ltm
+
+    def _init_memory(self):
         """
-        This is the main logic.
-        It runs the LangGraph brain.
+        Builds the history index and trend tracker. With the jsonl backend
+        and snapshots on, both start empty and each employee is loaded on
+        first use (see agents/ltm_snapshot.py); otherwise they are built
+        from the whole LTM here.
         """
-        print(f"[{self._id}] processing task: {task_data}")
-        
-        # 1. Check LTM (JSON) first
-        current_history = self.read_from_ltm() or []
-        
-        # Prepare the initial state for the graph
-        initial_state = BurnoutState(
+        with self._init_lock:
+            if self._memory_ready:
+                return
+            ltm = self.ltm
+            if ltm.shared:
+                # Other processes write there: the index queries the store and
+                # the trend is folded from the freshly queried window instead
+                self._history_index = StoreHistoryView(ltm)
+            elif config.LTM_SNAPSHOT_ENABLED and ltm_snapshot.available():
+                with timed("init:snapshot"):
+                    self._history_index = HistoryIndex()
+                    self._trend_tracker = TrendTracker()
+                    self._snapshot = ltm_snapshot.SnapshotMemory(
+                        ltm, os.path.join(self._ltm_dir, config.LTM_SNAPSHOT_FILE),
+                        self._history_index, self._trend_tracker,
+                        ltm_compaction.load_trend_seeds(self._ltm_dir))
+                metrics.REGISTRY.register_callback(
+                    "burnout_ltm_snapshot", "Employees loaded from the memory snapshot vs. their logs.",
+                    self._snapshot.stats)
+                if config.LTM_SNAPSHOT_INTERVAL > 0:
+                    self._snapshot_job = ltm_compaction.PeriodicJob(
+                        self.save_snapshot, config.LTM_SNAPSHOT_INTERVAL, name="ltm-snapshot").start()
+            else:
+                if config.LTM_SNAPSHOT_ENABLED:
+                    logger.warning("[%s] ormsgpack/zstandard missing; memory snapshots disabled.", self._id)
+                self._history_index = self._build_history_index(ltm)
+                self._trend_tracker = self._load_trend_tracker(ltm, self._history_index)
+            self._rollups = self._load_rollups(ltm)
+            self._memory_ready = True
+
+    def _build_history_index(self, ltm) -> HistoryIndex:
+        with timed("init:history_index"):
+            index = HistoryIndex()
+            try:
+                with metrics.LTM_DURATION.time(op="load_index"):
+                    index.build(ltm.iter_all())
+            except Exception as e:
+                logger.error("[%s] ERROR building history index: %s", self._id, e)
+        return index
+
+    def _load_trend_tracker(self, ltm, index) -> TrendTracker:
+        # trend_state.json, rebuilt from LTM when missing or out of date
+        with timed("init:trend_state"):
+            tracker = TrendTracker(os.path.join(self._ltm_dir, config.TREND_STATE_FILE))
+            if not tracker.load() or tracker.entries != index.entries:
+                try:
+                    with metrics.LTM_DURATION.time(op="rebuild_trend"):
+                        tracker.build(ltm.iter_all(), ltm_compaction.load_trend_seeds(self._ltm_dir))
+                    tracker.save()
+                except Exception as e:
+                    logger.error("[%s] ERROR rebuilding trend state: %s", self._id, e)
+        return tracker.start_autosave()
+
+    def _load_rollups(self, ltm):
+        # Must happen before the first write; a missing file is rebuilt on first read instead
+        with timed("init:rollups"):
+            rollups = self._new_rollups(ltm)
+            if rollups.load() or not ltm.employee_ids():
+                return rollups.start_autosave()
+        return None
+
+    def _new_rollups(self, ltm) -> RollupStore:
+        # Saved with the LTM size, so a file missing writes since its last save is rebuilt
+        if ltm.shared:
+            return RollupStore(None)
+        return RollupStore(os.path.join(self._ltm_dir, config.ROLLUP_FILE), ltm_size=ltm.total_size)
+
+    @property
+    def rollups(self) -> RollupStore:
+        """Team/org rollups, rebuilt from the LTM in one pass if there was no saved copy."""
+        if not self._memory_ready:
+            self._init_memory()
+        if self._rollups is None:
+            with self._init_lock:
+                if self._rollups is None:
+                    rollups = self._new_rollups(self.ltm)
+                    with self._write_lock, metrics.LTM_DURATION.time(op="rebuild_rollups"):
+                        rollups.build(self.ltm.iter_all())
+                        self._rollups = rollups
+                    rollups.save()
+                    rollups.start_autosave()
+        return self._rollups
+
+    @property
+    def history_index(self) -> HistoryIndex:
+        # Per-employee recent-history index
+        if not self._memory_ready:
+            self._init_memory()
+        return self._history_index
+
+    @property
+    def trend_tracker(self):
+        """Per-employee rolling trend state (None for shared stores)."""
+        if not self._memory_ready:
+            self._init_memory()
+        return self._trend_tracker
+
+    @property
+    def idempotency(self):
+        """Completed reports by message_id (see agents/idempotency.py); None when disabled."""
+        if not config.IDEMPOTENCY_ENABLED:
+            return None
+        if self._idempotency is None:
+            with self._init_lock:
+                if self._idempotency is None:
+                    with timed("init:idempotency"):
+                        if self.ltm.shared:
+                            # Other processes serve retries too: share a table in the LTM database
+                            store = SqliteIdempotencyStore(self.ltm.path)
+                        else:
+                            store = IdempotencyStore(os.path.join(self._ltm_dir, config.IDEMPOTENCY_FILE))
+                    metrics.REGISTRY.register_callback(
+                        "burnout_idempotency", "Tasks executed vs. answered from stored reports.", store.stats)
+                    self._idempotency = store
+        return self._idempotency
+
+    def _ensure_loaded(self, employee_id: str):
+        """With snapshots, pulls the employee into the index and tracker on first use."""
+        if not self._memory_ready:
+            self._init_memory()
+        if self._snapshot is not None:
+            self._snapshot.ensure(employee_id)
+
+    def _recent_history(self, employee_id: str) -> list:
+        self._ensure_loaded(employee_id)
+        return self.history_index.recent(employee_id)
+
+    def save_snapshot(self) -> dict:
+        """Writes the memory snapshot now (also runs periodically and on shutdown)."""
+        if self._snapshot is None:
+            return None
+        with metrics.LTM_DURATION.time(op="snapshot_save"):
+            result = self._snapshot.save(self._write_lock)
+        logger.info("[%s] Memory snapshot saved: %s", self._id, result)
+        return result
+
+    def _trend_for(self, employee_id: str, history: list):
+        tracker = self.trend_tracker
+        if tracker is not None:
+            return tracker.get(employee_id)
+        return trend_from_entries(history)
+
+    def _init_chroma(self):
+        with self._init_lock:
+            if self._chroma_ready:
+                return
+            # 2. ChromaDB Setup (Vector Storage)
+            # This creates a local folder (BURNOUT_CHROMA_PATH, 'chroma_db') to store vector memory
+            if not config.CHROMA_ENABLED:
+                logger.info("[%s] ChromaDB disabled by config.", self._id)
+                self._chroma_ready = True
+                return
+            try:
+                with timed("import:chromadb"):
+                    import chromadb
+                with timed("init:chroma"):
+                    self.chroma_client = chromadb.PersistentClient(path=self._chroma_path)
+                    name = collection_name(config.CHROMA_MODE)
+                    if config.CHROMA_MODE == "metadata":
+                        # Vectors are supplied with each record; never load an embedding model
+                        self._collection = self.chroma_client.get_or_create_collection(
+                            name=name, embedding_function=None, metadata={"hnsw:space": "l2"})
+                    else:
+                        self._collection = self.chroma_client.get_or_create_collection(name=name)
+                logger.info("[%s] ChromaDB initialized (%s mode).", self._id, config.CHROMA_MODE)
+            except Exception as e:
+                logger.warning("[%s] ChromaDB failed to init: %s", self._id, e)
+                self._collection = None
+
+            # Vector writes are batched on a background thread, off the request path
+            self._vector_writer = ChromaBatchWriter(self._collection) if self._collection else None
+            if self._vector_writer:
+                metrics.REGISTRY.register_callback(
+                    "burnout_vector_writer", "Background ChromaDB writer queue and flush stats.",
+                    self._vector_writer.stats)
+            self._chroma_ready = True
+
+    @property
+    def collection(self):
+        if not self._chroma_ready:
+            self._init_chroma()
+        return self._collection
+
+    @property
+    def vector_writer(self):
+        if not self._chroma_ready:
+            self._init_chroma()
+        return self._vector_writer
+
+    def warm_up(self, pre_fork: bool = False):
+        """
+        Builds everything that is otherwise created on first use.
+        Pre-fork servers should call warm_up(pre_fork=True) in the master:
+        that builds the graph only, leaving the Gemini client, file handles,
+        the Chroma client and its writer thread to be created in each worker.
+        """
+        with timed("warm_up:graph"):
+            burnout_graph.warm_up(llm=not pre_fork)
+        if pre_fork:
+            return
+        with timed("warm_up:storage"):
+            self.history_index
+            self.trend_tracker
+            self.idempotency
+            self.collection
+
+    def _initial_state(self, task_data: dict, deadline: float = None) -> BurnoutState:
+        """Builds the graph input, with only this employee's recent LTM window."""
+        employee_id = task_data.get('employee_id', DEFAULT_EMPLOYEE)
+        with metrics.LTM_DURATION.time(op="recent"):
+            current_history = self._recent_history(employee_id)
+            trend = self._trend_for(employee_id, current_history)
+
+        return BurnoutState(
             input_data=task_data,
             history=current_history,
+            trend=trend,
+            deadline=deadline,
             burnout_risk="unknown",
             is_trend=False,
             key_factors=[],
@@ -47,11 +310,38 @@ class BurnoutPreventionAgent(AbstractWorkerAgent):
             actionable_steps=[],
             conversation_starter="",
             recommendation="",
-            final_response={}
+            final_response={},
+            response_meta={}
         )
+
+    @staticmethod
+    def _result(final_state: BurnoutState) -> dict:
+        """final_response plus response_meta for deep-path requests (LTM stores only the former)."""
+        if not final_state.get('response_meta'):
+            return final_state['final_response']
+        return dict(final_state['final_response'], response_meta=final_state['response_meta'])
+
+    def triage(self, task_data: dict) -> tuple:
+        """Admission lane and priority from the rule stage and trend state (see agents/admission.py)."""
+        employee_id = task_data.get('employee_id', DEFAULT_EMPLOYEE)
+        self._ensure_loaded(employee_id)
+        tracker = self.trend_tracker
+        return admission.classify(task_data, tracker.get(employee_id) if tracker is not None else None)
+
+    def process_task(self, task_data: dict, deadline: float = None) -> dict:
+        """
+        This is the main logic.
+        It runs the LangGraph brain. `deadline` (epoch seconds, or deadline_ms /
+        deadline in task_data) bounds the LLM call; see agents/llm_guard.py.
+        """
+        logger.debug("[%s] processing task: %s", self._id, task_data)
+        task_data, deadline = llm_guard.split_deadline(task_data, deadline)
+        
+        # 1. Check LTM first and prepare the initial state for the graph
+        initial_state = self._initial_state(task_data, deadline)
         
-        # 2. Run the LangGraph
-        final_state = burnout_app.invoke(initial_state)
+        # 2. Run the LangGraph (low-risk results skip the graph runtime)
+        final_state = burnout_graph.run_workflow(initial_state)
         
         # 3. WRITE results to Memory (Both JSON and Chroma)
         log_entry = {
@@ -61,52 +351,389 @@ class BurnoutPreventionAgent(AbstractWorkerAgent):
         }
         self.write_to_ltm(log_entry) # <-- This now saves to both!
 
-        return final_state['final_response']
+        return self._result(final_state)
+
+    async def aprocess_task(self, task_data: dict, deadline: float = None) -> dict:
+        """
+        Async version of process_task for the ASGI server.
+        The graph is awaited (LLM via ainvoke) and LTM I/O runs in a worker
+        thread, so the event loop is never blocked.
+        """
+        logger.debug("[%s] processing task (async): %s", self._id, task_data)
+        task_data, deadline = llm_guard.split_deadline(task_data, deadline)
+
+        initial_state = await asyncio.to_thread(self._initial_state, task_data, deadline)
+        final_state = await burnout_graph.arun_workflow(initial_state)
+
+        log_entry = {
+            "timestamp": datetime.now().isoformat(),
+            "input_data": task_data,
+            "final_response": final_state['final_response']
+        }
+        await asyncio.to_thread(self.write_to_ltm, log_entry)
+
+        return self._result(final_state)
+
+    def stream_task(self, task_data: dict):
+        """
+        Streaming version of process_task for the demo page.
+        Runs the same nodes step by step and yields (event, data) pairs:
+          ("analysis", risk/factors/trend) as soon as the rules have run,
+          ("token", text chunk) while the empathetic response is generated,
+          ("final", final_response) once everything is parsed and saved.
+        """
+        logger.debug("[%s] streaming task: %s", self._id, task_data)
+
+        state = analyze_risk_and_factors(self._initial_state(task_data))
+        yield "analysis", {
+            "risk_level": state['burnout_risk'],
+            "key_factors": state['key_factors'],
+            "is_trend": state['is_trend'],
+        }
+
+        if decide_next_step(state) == "fast_path":
+            generate_quick_response(state)
+            yield "token", {"text": state['empathetic_response']}
+        else:
+            for chunk in stream_ai_response(state):
+                yield "token", {"text": chunk}
+
+        final_response = format_response(state)['final_response']
+        self.write_to_ltm({
+            "timestamp": datetime.now().isoformat(),
+            "input_data": task_data,
+            "final_response": final_response
+        })
+        yield "final", final_response
+
+    def process_batch(self, task_list: list) -> list:
+        """
+        Scores many parameter sets in one call.
+        Threshold rules are evaluated as NumPy columns over the whole batch,
+        the LLM runs once per unique (risk, factors) group and all LTM entries
+        are written in one bulk append. Returns one final_response per task,
+        in input order.
+        """
+        logger.debug("[%s] processing batch of %d tasks", self._id, len(task_list))
+        if not task_list:
+            return []
+
+        risk_scores, factor_lists = score_rules(task_list)
+
+        # Trend check per row, using each employee's trend state advanced by
+        # earlier rows of this batch (so order matches sequential runs)
+        trends = {}
+        rows = []
+        for task_data, score, factors in zip(task_list, risk_scores, factor_lists):
+            employee_id = task_data.get('employee_id', DEFAULT_EMPLOYEE)
+            trend = trends.get(employee_id)
+            if trend is None:
+                trend = trends[employee_id] = self._trend_for(
+                    employee_id, self._recent_history(employee_id))
+
+            score = int(score)
+            is_trend = False
+            if score == 1 and trend_detected(trend):
+                score = 2
+                is_trend = True
+                factors = [f for f in factors if f != "healthy_habits"] + ["consistent_stress_trend"]
+
+            risk = RISK_MAP[score]
+            metrics.PATH_TOTAL.inc(path="fast" if risk == "low" else "deep")
+            trend.update(task_data, risk)
+            rows.append((risk, is_trend, list(set(factors))))
+
+        # One generation per unique (risk, trend, factor set) group
+        group_responses = {}
+        for risk, is_trend, factors in rows:
+            group_key = (risk, is_trend, frozenset(factors))
+            if group_key in group_responses:
+                continue
+            state = BurnoutState(
+                input_data={},
+                history=[],
+                trend=None,
+                deadline=None,
+                burnout_risk=risk,
+                is_trend=is_trend,
+                key_factors=factors,
+                empathetic_response="",
+                actionable_steps=[],
+                conversation_starter="",
+                recommendation="",
+                final_response={},
+                response_meta={}
+            )
+            state = generate_quick_response(state) if risk == "low" else generate_ai_response(state)
+            group_responses[group_key] = format_response(state)['final_response']
+
+        results = []
+        entries = []
+        timestamp = datetime.now().isoformat()
+        for task_data, (risk, is_trend, factors) in zip(task_list, rows):
+            final_response = copy.deepcopy(group_responses[(risk, is_trend, frozenset(factors))])
+            final_response['key_factors'] = factors
+            results.append(final_response)
+            entries.append({
+                "timestamp": timestamp,
+                "input_data": task_data,
+                "final_response": final_response
+            })
+
+        self.write_many_to_ltm(entries)
+        return results
+
+    def runtime_stats(self) -> dict:
+        """Stats for components that have been built so far (never builds them)."""
+        stats = {}
+        if self._history_index is not None:
+            stats["history_index_employees"] = len(self._history_index)
+        if self._trend_tracker is not None:
+            stats["trend_state_employees"] = len(self._trend_tracker)
+        if self._snapshot is not None:
+            stats["ltm_snapshot"] = self._snapshot.stats()
+        if self._rollups is not None:
+            stats["rollup_teams"] = len(self._rollups)
+        if self._idempotency is not None:
+            stats["idempotency"] = self._idempotency.stats()
+        if self._vector_writer is not None:
+            stats["vector_writer"] = self._vector_writer.stats()
+        if current_transport() is not None:
+            stats["transport"] = current_transport().stats()
+        return stats
 
     # --- Required Methods ---
 
-    def send_message(self, recipient: str, message_obj: dict):
-        print(f"[{self._id}] sending message to {recipient}: {json.dumps(message_obj)}")
-        pass
+    @property
+    def transport(self):
+        """The process-wide transport picked by BURNOUT_TRANSPORT, or None (log only)."""
+        return get_transport()
+
+    def listen(self, transport=None):
+        super().listen(transport or self.transport)
+
+    def send_message(self, recipient: str, message_obj: dict) -> bool:
+        """Publishes through the transport; returns False if it was not handed over."""
+        logger.info("[%s] sending message to %s", self._id, recipient, extra={"outgoing_message": message_obj})
+        transport = self.transport
+        if transport is None:
+            return False
+        try:
+            return transport.publish(recipient, message_obj)
+        except (TransportFull, ConnectionError, TimeoutError) as e:
+            logger.warning("[%s] could not publish to %s: %s", self._id, recipient, e)
+            return False
+
+    def _chroma_record(self, entry: dict) -> tuple:
+        """Returns the (document, metadata, id, embedding) stored in ChromaDB for an entry."""
+        return build_record(entry, config.CHROMA_MODE)
 
     def write_to_ltm(self, entry: dict) -> bool:
         """Writes data to JSON AND ChromaDB."""
         try:
-            # A. Write to JSON (Standard Storage)
-            history = self.read_from_ltm() or []
-            history.append(entry)
-            with open(self._ltm_path, 'w') as f:
-                json.dump(history, f, indent=2)
+            # A. Append to the employee's JSON-lines log (Standard Storage)
+            entry.setdefault('id', new_entry_id())
+            self._ensure_loaded(entry_employee_id(entry))
+            with self._write_lock:
+                with metrics.LTM_DURATION.time(op="append"):
+                    self.ltm.append(entry)
+                self.history_index.add(entry)
+                if self.trend_tracker is not None:
+                    self.trend_tracker.update(entry)
+                if self._rollups is not None:
+                    self._rollups.update(entry)
             
-            # B. Write to ChromaDB (Vector Storage) - NEW
-            if self.collection:
-                doc_id = str(uuid.uuid4())
-                risk_level = entry.get('final_response', {}).get('risk_level', 'unknown')
-                user_id = entry.get('input_data', {}).get('employee_id', 'unknown')
-                
-                # We convert the full entry dict to a string for storage
-                document_text = json.dumps(entry)
-                
-                self.collection.add(
-                    documents=[document_text],
-                    metadatas=[{"risk": risk_level, "user": user_id}], # Metadata for filtering
-                    ids=[doc_id]
-                )
+            # B. Queue for ChromaDB (Vector Storage), written in the background
+            if self.vector_writer:
+                self.vector_writer.submit(*self._chroma_record(entry))
             
-            print(f"[{self._id}] Wrote new entry to LTM (JSON + ChromaDB).")
+            logger.debug("[%s] Wrote new entry to LTM (JSON + ChromaDB).", self._id)
+            return True
+        except Exception as e:
+            logger.exception("[%s] ERROR writing to LTM: %s", self._id, e)
+            return False
+
+    def write_many_to_ltm(self, entries: list) -> bool:
+        """Bulk version of write_to_ltm: one LTM append for the whole batch."""
+        try:
+            for entry in entries:
+                entry.setdefault('id', new_entry_id())
+            for employee_id in {entry_employee_id(entry) for entry in entries}:
+                self._ensure_loaded(employee_id)
+            with self._write_lock:
+                with metrics.LTM_DURATION.time(op="append_many"):
+                    self.ltm.append_many(entries)
+                tracker = self.trend_tracker
+                for entry in entries:
+                    self.history_index.add(entry)
+                    if tracker is not None:
+                        tracker.update(entry)
+                if self._rollups is not None:
+                    self._rollups.update_many(entries)
+
+            if self.vector_writer:
+                self.vector_writer.submit_many([self._chroma_record(entry) for entry in entries])
+
+            logger.debug("[%s] Wrote %d entries to LTM (JSON + ChromaDB).", self._id, len(entries))
             return True
         except Exception as e:
-            print(f"[{self._id}] ERROR writing to LTM: {e}")
+            logger.exception("[%s] ERROR writing batch to LTM: %s", self._id, e)
             return False
 
-    def read_from_ltm(self) -> any:
-        """Reads data from the LTM JSON file."""
+    def read_from_ltm(self, employee_id: str = None) -> any:
+        """Reads one employee's LTM entries, or everything when no id is given."""
+        try:
+            if employee_id is not None:
+                return self.ltm.read_employee(employee_id)
+            return self.ltm.read_all()
+        except Exception as e:
+            logger.exception("[%s] ERROR reading from LTM: %s", self._id, e)
+            return None
+
+    # --- LTM Compaction ---
+
+    def compact_ltm(self, keep_raw: int = None, max_age_days: float = None) -> dict:
+        """
+        Applies the retention policy (see agents/ltm_compaction.py): old raw
+        entries are folded into per-employee aggregates and dropped. The
+        in-memory index and trend state stay valid, since only entries
+        outside their windows are removed.
+        """
+        with metrics.LTM_DURATION.time(op="compact"):
+            result = ltm_compaction.compact(self.ltm, self._ltm_dir, keep_raw, max_age_days)
+        if result["folded"]:
+            self.history_index.compacted(result["folded"])
+            if self.trend_tracker is not None:
+                self.trend_tracker.compacted(result["folded"])
+                self.trend_tracker.save()
+            if self._snapshot is not None:
+                self._snapshot.reload_seeds(ltm_compaction.load_trend_seeds(self._ltm_dir))
+            if self._rollups is not None:
+                # Rollups keep folded entries; record the smaller LTM so they aren't rebuilt
+                self._rollups.save(force=True)
+        return result
+
+    # --- Team / Org Rollups ---
+
+    def team_rollup(self, team_id: str = None, buckets: int = None) -> dict:
+        """Precomputed risk rollup for one team, or the whole org (None for an unknown team)."""
+        return self.rollups.get(team_id, buckets)
+
+    def rebuild_rollups(self) -> dict:
+        """Recomputes every rollup from the raw LTM (see agents/rollups.py)."""
+        rollups = self.rollups
+        with self._write_lock, metrics.LTM_DURATION.time(op="rebuild_rollups"):
+            rollups.build(self.ltm.iter_all())
+        rollups.save()
+        return {"teams": len(rollups), "entries": rollups.entries}
+
+    def ltm_aggregates(self, employee_id: str) -> dict:
+        """Summary of the employee's compacted history (None if nothing was folded yet)."""
+        aggregate = ltm_compaction.load_aggregates(self._ltm_dir).get(str(employee_id))
+        return ltm_compaction.summarize(aggregate) if aggregate else None
+
+    # --- Vector Memory Queries ---
+
+    def find_similar_cases(self, employee_id: str, k: int = 5, other_employees: bool = False,
+                           **filters) -> list:
+        """
+        Past cases most similar to the employee's latest entry, nearest first.
+        other_employees=True leaves out the employee's own history; extra
+        filters (risk, since, until) are applied as Chroma metadata filters.
+        """
+        if other_employees:
+            filters["exclude_employee"] = employee_id
+        return self.find_similar_cases_many([employee_id], k, **filters).get(str(employee_id), [])
+
+    def find_similar_cases_many(self, employee_ids: list, k: int = 5, **filters) -> dict:
+        """
+        Batched find_similar_cases: one Chroma query for every employee.
+        Returns {employee_id: [case, ...]}; employees without history get [].
+        """
+        results = {str(eid): [] for eid in employee_ids}
+        collection = self.collection
+        if collection is None:
+            return results
+        if self.vector_writer:
+            self.vector_writer.flush()
+
+        sources = []
+        for employee_id in results:
+            recent = self._recent_history(employee_id)
+            if recent:
+                sources.append((employee_id, recent[-1]))
+        if not sources:
+            return results
+
+        records = [build_record(entry, config.CHROMA_MODE) for _, entry in sources]
+        query = {"n_results": k + 1, "where": where_clause(**filters),
+                 "include": ["metadatas", "documents", "distances"]}
+        if config.CHROMA_MODE == "metadata":
+            query["query_embeddings"] = [embedding for _, _, _, embedding in records]
+        else:
+            query["query_texts"] = [document for document, _, _, _ in records]
+
+        try:
+            with metrics.LTM_DURATION.time(op="chroma_query"):
+                response = collection.query(**query)
+        except Exception as e:
+            logger.error("[%s] ERROR querying ChromaDB: %s", self._id, e)
+            return results
+
+        for row, (employee_id, entry) in enumerate(sources):
+            metadatas = response["metadatas"][row]
+            documents = (response.get("documents") or [None] * len(sources))[row] or [None] * len(metadatas)
+            cases = []
+            for record_id, metadata, document, distance in zip(
+                    response["ids"][row], metadatas, documents, response["distances"][row]):
+                # Skip the query's own source record (entries from before ids: by user + timestamp)
+                if entry.get('id') is not None:
+                    if record_id == entry['id']:
+                        continue
+                elif metadata.get("user") == employee_id and metadata.get("timestamp") == entry.get('timestamp'):
+                    continue
+                cases.append(to_case(metadata, document, distance))
+            results[employee_id] = cases[:k]
+        return results
+
+    def find_cases(self, employee_id: str = None, risk: str = None, since: float = None,
+                   until: float = None, limit: int = 100) -> list:
+        """Metadata-only lookup (no embeddings); since/until are epoch seconds."""
+        collection = self.collection
+        if collection is None:
+            return []
+        if self.vector_writer:
+            self.vector_writer.flush()
         try:
-            if not os.path.exists(self._ltm_path):
-                return []
-            with open(self._ltm_path, 'r') as f:
-                data = json.load(f)
-            return data
+            with metrics.LTM_DURATION.time(op="chroma_get"):
+                response = collection.get(
+                    where=where_clause(employee_id=employee_id, risk=risk, since=since, until=until),
+                    limit=limit, include=["metadatas", "documents"])
         except Exception as e:
-            print(f"[{self._id}] ERROR reading from LTM: {e}")
-            return None
\ No newline at end of file
+            logger.error("[%s] ERROR querying ChromaDB: %s", self._id, e)
+            return []
+        metadatas = response["metadatas"]
+        documents = response.get("documents") or [None] * len(metadatas)
+        return [to_case(metadata, document) for metadata, document in zip(metadatas, documents)]
+
+    def shutdown(self):
+        """Flushes pending LTM and vector writes. Safe to call more than once."""
+        if self._compaction_scheduler:
+            self._compaction_scheduler.stop()
+        if self._snapshot_job:
+            self._snapshot_job.stop()
+        if self._vector_writer:
+            self._vector_writer.close()
+        if self._snapshot is not None:
+            try:
+                self.save_snapshot()
+            except Exception as e:
+                logger.error("[%s] ERROR saving memory snapshot: %s", self._id, e)
+        if self._trend_tracker is not None:
+            self._trend_tracker.close()
+        if self._rollups is not None:
+            self._rollups.close()
+        if self._idempotency is not None:
+            self._idempotency.close()
+        if self._ltm:
+            self._ltm.close()
\ No newline at end of file
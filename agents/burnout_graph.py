@@ -1,12 +1,19 @@
+import asyncio
+import logging
 import os
+import threading
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
 # Using the correct import as we fixed before
 from pydantic import BaseModel, Field
 from typing import TypedDict, Literal, List, Any
-from langgraph.graph import StateGraph, END
+from agents import config, llm_guard, metrics
+from agents.batch_scoring import rule_inputs
+from agents.ltm_store import entry_employee_id
+from agents.response_cache import ResponseCache
+from agents.trend_state import trend_from_entries, trend_detected
+from agents.startup_timing import timed
+
+logger = logging.getLogger(__name__)
 
 # --- Load API Key ---
 load_dotenv()
@@ -15,6 +22,8 @@ load_dotenv()
 class BurnoutState(TypedDict):
     input_data: dict
     history: List[dict]
+    trend: Any  # EmployeeTrend for this employee (see agents/trend_state.py)
+    deadline: Any  # absolute epoch seconds the task must finish by, or None
     burnout_risk: Literal["low", "medium", "high", "unknown"]
     is_trend: bool
     key_factors: List[str]
@@ -23,6 +32,7 @@ class BurnoutState(TypedDict):
     conversation_starter: str
     recommendation: str
     final_response: dict
+    response_meta: dict  # how the deep-path text was produced (see agents/llm_guard.py)
 
 # --- Define Output Structure ---
 class AIResponse(BaseModel):
@@ -30,13 +40,6 @@ class AIResponse(BaseModel):
     actionable_steps: List[str] = Field(description="A list of 2 or 3 simple, concrete actions the user can take right now.")
     conversation_starter: str = Field(description="A 1-2 sentence 'ice-breaker' the user can send to their manager.")
 
-# --- LLM Setup ---
-# Using the model we verified works for you
-llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0.7)
-
-# --- Create the Output Parser ---
-output_parser = JsonOutputParser(pydantic_object=AIResponse)
-
 # --- Create the Prompt ---
 prompt_template = """
 You are an empathetic corporate wellness assistant.
@@ -51,28 +54,242 @@ Based on this, generate a JSON object with the following fields:
 {format_instructions}
 """
 
-prompt = ChatPromptTemplate.from_template(
-    prompt_template,
-    partial_variables={"format_instructions": output_parser.get_format_instructions()}
+# Structured mode: the response schema goes to the model as a JSON schema,
+# so the prompt only has to carry the inputs and the length limits
+compact_prompt_template = (
+    "You are an empathetic corporate wellness assistant. Burnout risk: {risk}. Key factors: {factors}.\n"
+    "Reply in JSON: empathetic_response (2-3 sentences), actionable_steps (2-3 short actions), "
+    "conversation_starter (1-2 sentences to their manager)."
 )
 
-llm_chain = prompt | llm | output_parser
+# --- Lazy Construction ---
+# The Gemini client, prompt/parser chain and compiled graph are built on
+# first use (or by warm_up()), not at import time, so importing this module
+# and forking workers stays cheap.
+_build_lock = threading.RLock()
+_llm = None
+_llm_chain = None
+_stream_chain = None
+_burnout_app = None
+_deep_app = None
+_response_cache = None
+
+def get_llm():
+    """Returns the shared ChatGoogleGenerativeAI client, creating it on first use."""
+    global _llm
+    if _llm is None:
+        with _build_lock:
+            if _llm is None:
+                with timed("import:langchain_google_genai"):
+                    from langchain_google_genai import ChatGoogleGenerativeAI
+                kwargs = {}
+                if config.LLM_OUTPUT_MODE == "structured":
+                    # Capped reply, and no hidden "thinking" tokens eating into the cap
+                    if config.LLM_MAX_OUTPUT_TOKENS:
+                        kwargs["max_output_tokens"] = config.LLM_MAX_OUTPUT_TOKENS
+                    kwargs["thinking_budget"] = 0
+                with timed("init:llm"):
+                    # Using the model we verified works for you
+                    _llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0.7,
+                                                  timeout=config.LLM_TIMEOUT, **kwargs)
+    return _llm
+
+def set_llm(new_llm):
+    """Swaps the chat model (e.g. a local stub for benchmarks); the chain is rebuilt on next use."""
+    global _llm, _llm_chain, _stream_chain
+    with _build_lock:
+        _llm = new_llm
+        _llm_chain = None
+        _stream_chain = None
+
+def _response_dict(result) -> dict:
+    return result.model_dump() if isinstance(result, BaseModel) else result
+
+def _compact_json_chain(llm):
+    """Compact prompt | llm | JSON parsed from the text (streams partial dicts)."""
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.output_parsers import JsonOutputParser
+    return ChatPromptTemplate.from_template(compact_prompt_template) | llm | JsonOutputParser()
+
+def get_llm_chain():
+    """
+    Returns the chain that turns {risk, factors} into an AIResponse dict,
+    creating it on first use: prompt | llm | output_parser in "parser"
+    mode, compact prompt | llm.with_structured_output(AIResponse) in
+    "structured" mode.
+    """
+    global _llm_chain
+    if _llm_chain is None:
+        with _build_lock:
+            if _llm_chain is None:
+                llm = get_llm()
+                with timed("import:langchain_core"):
+                    from langchain_core.prompts import ChatPromptTemplate
+                    from langchain_core.output_parsers import JsonOutputParser
+                with timed("init:llm_chain"):
+                    if config.LLM_OUTPUT_MODE == "structured":
+                        _llm_chain = _build_structured_chain(llm)
+                    else:
+                        output_parser = JsonOutputParser(pydantic_object=AIResponse)
+                        prompt = ChatPromptTemplate.from_template(
+                            prompt_template,
+                            partial_variables={"format_instructions": output_parser.get_format_instructions()}
+                        )
+                        _llm_chain = prompt | llm | output_parser
+    return _llm_chain
+
+def _build_structured_chain(llm):
+    from langchain_core.prompts import ChatPromptTemplate
+    try:
+        structured_llm = llm.with_structured_output(AIResponse, method="json_schema")
+    except (NotImplementedError, ValueError, TypeError) as e:
+        logger.warning("%s has no native structured output (%s); parsing JSON from its text.",
+                       type(llm).__name__, e)
+        return _compact_json_chain(llm)
+    return ChatPromptTemplate.from_template(compact_prompt_template) | structured_llm | _response_dict
+
+def get_stream_chain():
+    """
+    The chain /demo/stream reads partial dicts from. Native structured
+    output arrives in one piece, so structured mode streams the compact
+    prompt's JSON text instead.
+    """
+    global _stream_chain
+    if config.LLM_OUTPUT_MODE != "structured":
+        return get_llm_chain()
+    if _stream_chain is None:
+        with _build_lock:
+            if _stream_chain is None:
+                _stream_chain = _compact_json_chain(get_llm())
+    return _stream_chain
+
+def get_burnout_app():
+    """Returns the compiled LangGraph app, building it on first use."""
+    global _burnout_app
+    if _burnout_app is None:
+        with _build_lock:
+            if _burnout_app is None:
+                _burnout_app = _build_graph()
+    return _burnout_app
+
+def get_deep_app():
+    """Returns the deep-path-only graph (generate_ai_response -> format_response), building it on first use."""
+    global _deep_app
+    if _deep_app is None:
+        with _build_lock:
+            if _deep_app is None:
+                _deep_app = _build_deep_graph()
+    return _deep_app
+
+def __getattr__(name: str):
+    # Keeps `from agents.burnout_graph import burnout_app` (and llm, llm_chain) working
+    if name == "burnout_app":
+        return get_burnout_app()
+    if name == "llm_chain":
+        return get_llm_chain()
+    if name == "llm":
+        return get_llm()
+    if name == "response_cache":
+        return get_response_cache()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# --- Response Cache ---
+# Deep-path inputs come from a tiny finite space (risk x factor set), so most
+# requests can reuse an earlier Gemini answer instead of a fresh round-trip.
+# Built on first deep-path use: loading the cache file and starting its save
+# job belong in each worker, not in a pre-fork master.
+def get_response_cache() -> ResponseCache:
+    """Returns the shared deep-path response cache, creating it on first use."""
+    global _response_cache
+    if _response_cache is None:
+        with _build_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache()
+    return _response_cache
+
+metrics.REGISTRY.register_callback(
+    "burnout_llm_cache", "Deep-path response cache counters.",
+    lambda: _response_cache.stats() if _response_cache is not None else {})
+
+def _llm_config(tokens=None) -> dict:
+    """Run config with the metrics callbacks, plus the request's token counter."""
+    return {"callbacks": metrics.llm_callbacks() + ([tokens] if tokens is not None else [])}
+
+def _record_tokens(meta: dict, tokens):
+    """Puts the request's prompt/completion tokens in response_meta and /metrics."""
+    if tokens is None or not (tokens.prompt_tokens or tokens.completion_tokens):
+        return
+    mode = config.LLM_OUTPUT_MODE
+    meta.update(output_mode=mode, prompt_tokens=tokens.prompt_tokens, completion_tokens=tokens.completion_tokens)
+    metrics.LLM_REQUEST_TOKENS.observe(tokens.prompt_tokens, mode=mode, kind="prompt")
+    metrics.LLM_REQUEST_TOKENS.observe(tokens.completion_tokens, mode=mode, kind="completion")
+
+def _invoke_llm(risk: str, factors: List[str], tokens=None) -> dict:
+    """Calls the LLM chain and checks the reply has every field we need."""
+    response_dict = get_llm_chain().invoke(
+        {"risk": risk, "factors": ", ".join(sorted(factors))},
+        config=_llm_config(tokens)
+    )
+    missing = [k for k in AIResponse.model_fields if k not in response_dict]
+    if missing:
+        raise ValueError(f"LLM response missing fields: {missing}")
+    return response_dict
+
+# --- Async LLM Access (ASGI serving mode) ---
+# Caps concurrent in-flight Gemini calls per event loop
+_llm_semaphore = None
+
+def _get_llm_semaphore() -> asyncio.Semaphore:
+    global _llm_semaphore
+    loop = asyncio.get_running_loop()
+    if _llm_semaphore is None or _llm_semaphore[0] is not loop:
+        _llm_semaphore = (loop, asyncio.Semaphore(config.LLM_MAX_CONCURRENCY))
+    return _llm_semaphore[1]
+
+async def _ainvoke_llm(risk: str, factors: List[str], tokens=None) -> dict:
+    """Async twin of _invoke_llm, bounded by LLM_MAX_CONCURRENCY."""
+    async with _get_llm_semaphore():
+        response_dict = await get_llm_chain().ainvoke(
+            {"risk": risk, "factors": ", ".join(sorted(factors))},
+            config=_llm_config(tokens)
+        )
+    missing = [k for k in AIResponse.model_fields if k not in response_dict]
+    if missing:
+        raise ValueError(f"LLM response missing fields: {missing}")
+    return response_dict
+
+# --- Canned Responses ---
+
+def _apply_trend_response(state: BurnoutState) -> BurnoutState:
+    state['empathetic_response'] = "I'm noticing a consistent pattern of high stress. This is a clear sign of burnout. It's important we address this."
+    state['actionable_steps'] = ["Please book a meeting with your manager today.", "Notify HR of your current workload concerns."]
+    state['conversation_starter'] = "Hi [Manager], I need to discuss my workload as I've been feeling significantly burnt out for a while now. When is a good time for us to talk?"
+    return state
+
+def _apply_llm_response(state: BurnoutState, response_dict: dict) -> BurnoutState:
+    state['empathetic_response'] = response_dict['empathetic_response']
+    state['actionable_steps'] = response_dict['actionable_steps']
+    state['conversation_starter'] = response_dict['conversation_starter']
+    return state
+
+def _apply_fallback_response(state: BurnoutState) -> BurnoutState:
+    state['empathetic_response'] = "I'm sorry to hear you're feeling this way. Please remember to take regular breaks."
+    state['actionable_steps'] = ["Take a 5-minute walk.", "Drink a glass of water."]
+    state['conversation_starter'] = "Hi [Manager], I'm feeling a bit overwhelmed and would like to find 15 minutes to chat."
+    return state
 
 # --- NODES ---
 
 def analyze_risk_and_factors(state: BurnoutState) -> BurnoutState:
     """Node 1: Analysis Logic"""
-    print("\n--- Node: Analyzing Risk & Factors ---")
+    logger.debug("--- Node: Analyzing Risk & Factors ---")
     data = state['input_data']
     history = state['history']
     
-    stress = data.get('stress', 0)
-    hours = data.get('work_hours', 0)
-    sleep = data.get('sleep_hours', 7)
-    mood = data.get('mood', 'ok')
+    stress, hours, sleep, mood = rule_inputs(data)
     employee_id = data.get('employee_id', 'unknown_user')
     
-    print(f"--- INPUTS: Stress={stress}, Hours={hours}, Sleep={sleep}, Mood={mood} ---")
+    logger.debug("--- INPUTS: Stress=%s, Hours=%s, Sleep=%s, Mood=%s ---", stress, hours, sleep, mood)
 
     risk_score = 0
     factors = []
@@ -108,64 +325,157 @@ def analyze_risk_and_factors(state: BurnoutState) -> BurnoutState:
     if not factors:
         factors.append("healthy_habits")
 
-    # LTM Trend Logic
-    if risk_score != 2:
-        employee_history = [
-            entry for entry in history 
-            if entry.get('input_data', {}).get('employee_id') == employee_id
-        ]
-        
-        if len(employee_history) >= 2:
-            last_two_risks = [
-                entry.get('final_response', {}).get('risk_level') 
-                for entry in employee_history[-2:]
-            ]
-            
-            if all(r in ["medium", "high"] for r in last_two_risks) and risk_score == 1:
-                print(f"--- LTM Check: Trend detected for {employee_id}. Elevating risk. ---")
-                risk_score = 2
-                state['is_trend'] = True
-                factors.append("consistent_stress_trend")
-                if "healthy_habits" in factors:
-                    factors.remove("healthy_habits")
+    # LTM Trend Logic (reads the employee's rolling trend state)
+    if risk_score == 1:
+        trend = state.get('trend')
+        if trend is None:
+            # Callers that only pass raw history: fold it on the spot
+            trend = trend_from_entries(
+                entry for entry in history if entry_employee_id(entry) == str(employee_id)
+            )
+
+        if trend_detected(trend):
+            logger.info("--- LTM Check: Trend detected for %s. Elevating risk. ---", employee_id)
+            risk_score = 2
+            state['is_trend'] = True
+            factors.append("consistent_stress_trend")
+            if "healthy_habits" in factors:
+                factors.remove("healthy_habits")
 
     risk_map = {0: "low", 1: "medium", 2: "high"}
     state['burnout_risk'] = risk_map[risk_score]
     state['key_factors'] = list(set(factors))
     
-    print(f"--- OUTPUT: Risk={state['burnout_risk']}, Factors={state['key_factors']} ---")
+    logger.debug("--- OUTPUT: Risk=%s, Factors=%s ---", state['burnout_risk'], state['key_factors'])
     return state
 
 def generate_ai_response(state: BurnoutState) -> BurnoutState:
     """Node 2A: Deep Reasoning (LLM) for High/Med Risk"""
-    print("--- Node: Generating AI Response (Deep Path) ---")
+    logger.debug("--- Node: Generating AI Response (Deep Path) ---")
 
     if state['is_trend']:
-        state['empathetic_response'] = "I'm noticing a consistent pattern of high stress. This is a clear sign of burnout. It's important we address this."
-        state['actionable_steps'] = ["Please book a meeting with your manager today.", "Notify HR of your current workload concerns."]
-        state['conversation_starter'] = "Hi [Manager], I need to discuss my workload as I've been feeling significantly burnt out for a while now. When is a good time for us to talk?"
-        return state
+        state['response_meta'] = {"source": "trend_template"}
+        return _apply_trend_response(state)
 
+    # Stays "cache" unless the compute callback actually calls the LLM
+    meta = state['response_meta'] = {"source": "cache"}
+    tokens = None
     try:
         risk = state['burnout_risk']
-        factors = ", ".join(state['key_factors'])
-        response_dict = llm_chain.invoke({"risk": risk, "factors": factors})
-        
-        state['empathetic_response'] = response_dict['empathetic_response']
-        state['actionable_steps'] = response_dict['actionable_steps']
-        state['conversation_starter'] = response_dict['conversation_starter']
+        factors = state['key_factors']
+        budget = llm_guard.remaining_budget(state.get('deadline'))
+        tokens = metrics.token_counter()
+        # Degraded or short-budget callers never lead a shared call others wait on
+        response_dict = get_response_cache().get_or_compute(
+            risk, factors, lambda: llm_guard.guarded_call(lambda: _invoke_llm(risk, factors, tokens), budget, meta),
+            lead=llm_guard.unavailable_reason(budget) is None,
+        )
+        _apply_llm_response(state, response_dict)
         
     except Exception as e:
-        print(f"--- ERROR: LLM call failed: {e} ---")
-        state['empathetic_response'] = "I'm sorry to hear you're feeling this way. Please remember to take regular breaks."
-        state['actionable_steps'] = ["Take a 5-minute walk.", "Drink a glass of water."]
-        state['conversation_starter'] = "Hi [Manager], I'm feeling a bit overwhelmed and would like to find 15 minutes to chat."
+        logger.error("--- ERROR: LLM call failed: %s ---", e)
+        meta["source"] = "fallback"
+        meta.setdefault("fallback_reason", "error")
+        _apply_fallback_response(state)
 
+    _record_tokens(meta, tokens)
     return state
 
+async def agenerate_ai_response(state: BurnoutState) -> BurnoutState:
+    """Node 2A (async): same as generate_ai_response, but awaits the LLM"""
+    logger.debug("--- Node: Generating AI Response (Deep Path, async) ---")
+
+    if state['is_trend']:
+        state['response_meta'] = {"source": "trend_template"}
+        return _apply_trend_response(state)
+
+    meta = state['response_meta'] = {"source": "cache"}
+    tokens = None
+    try:
+        risk = state['burnout_risk']
+        factors = state['key_factors']
+        budget = llm_guard.remaining_budget(state.get('deadline'))
+        tokens = metrics.token_counter()
+        response_dict = await get_response_cache().aget_or_compute(
+            risk, factors, lambda: llm_guard.aguarded_call(lambda: _ainvoke_llm(risk, factors, tokens), budget, meta),
+            lead=llm_guard.unavailable_reason(budget) is None,
+        )
+        _apply_llm_response(state, response_dict)
+
+    except Exception as e:
+        logger.error("--- ERROR: LLM call failed: %s ---", e)
+        meta["source"] = "fallback"
+        meta.setdefault("fallback_reason", "error")
+        _apply_fallback_response(state)
+
+    _record_tokens(meta, tokens)
+    return state
+
+def stream_ai_response(state: BurnoutState):
+    """
+    Streaming variant of generate_ai_response for the /demo/stream endpoint.
+    Yields chunks of empathetic_response as the LLM produces them and fills
+    in the rest of the state once the JSON is complete.
+    """
+    logger.debug("--- Node: Generating AI Response (Deep Path, streaming) ---")
+
+    if state['is_trend']:
+        state['response_meta'] = {"source": "trend_template"}
+        _apply_trend_response(state)
+        yield state['empathetic_response']
+        return
+
+    risk = state['burnout_risk']
+    factors = state['key_factors']
+    response_cache = get_response_cache()
+    cached = response_cache.lookup(risk, factors)
+    if cached is not None:
+        state['response_meta'] = {"source": "cache"}
+        _apply_llm_response(state, cached)
+        yield state['empathetic_response']
+        return
+
+    sent = ""
+    meta = state['response_meta'] = {"source": "llm"}
+    tokens = None
+    try:
+        if not llm_guard.breaker.allow():
+            meta["fallback_reason"] = "circuit_open"
+            raise llm_guard.LLMUnavailable("circuit_open")
+        response_dict = {}
+        tokens = metrics.token_counter()
+        # JsonOutputParser streams progressively more complete dicts
+        stream = get_stream_chain().stream(
+            {"risk": risk, "factors": ", ".join(sorted(factors))},
+            config=_llm_config(tokens)
+        )
+        for response_dict in stream:
+            text = (response_dict or {}).get('empathetic_response') or ""
+            if len(text) > len(sent) and text.startswith(sent):
+                yield text[len(sent):]
+                sent = text
+
+        missing = [k for k in AIResponse.model_fields if k not in response_dict]
+        if missing:
+            raise ValueError(f"LLM response missing fields: {missing}")
+        llm_guard.breaker.record_success()
+        _apply_llm_response(state, response_dict)
+        if response_cache.enabled:
+            response_cache.put(response_cache.make_key(risk, factors), response_dict)
+
+    except Exception as e:
+        logger.error("--- ERROR: LLM call failed: %s ---", e)
+        if "fallback_reason" not in meta:
+            llm_guard.breaker.record_failure()
+            meta["fallback_reason"] = "error"
+        meta["source"] = "fallback"
+        # The final event carries the fallback text, replacing any partial stream
+        _apply_fallback_response(state)
+    _record_tokens(meta, tokens)
+
 def generate_quick_response(state: BurnoutState) -> BurnoutState:
     """Node 2B: Fast Path (Template) for Low Risk"""
-    print("--- Node: Generating Quick Response (Fast Path) ---")
+    logger.debug("--- Node: Generating Quick Response (Fast Path) ---")
     
     state['empathetic_response'] = "Great job maintaining a healthy balance! Your metrics look good. Keep up the positive habits."
     state['actionable_steps'] = ["Continue your current sleep schedule.", "Share your productivity tips with a colleague."]
@@ -175,7 +485,7 @@ def generate_quick_response(state: BurnoutState) -> BurnoutState:
 
 def format_response(state: BurnoutState) -> BurnoutState:
     """Node 3: Formatting"""
-    print("--- Node: Formatting Response ---")
+    logger.debug("--- Node: Formatting Response ---")
     state['final_response'] = {
         "risk_level": state['burnout_risk'],
         "empathetic_suggestion": state['empathetic_response'],
@@ -195,36 +505,120 @@ def decide_next_step(state: BurnoutState):
     """
     risk = state['burnout_risk']
     if risk == "low":
+        metrics.PATH_TOTAL.inc(path="fast")
         return "fast_path"
     else:
+        metrics.PATH_TOTAL.inc(path="deep")
         return "deep_path"
 
 # --- GRAPH CONSTRUCTION ---
-workflow = StateGraph(BurnoutState)
-
-# Add Nodes
-workflow.add_node("analyze_risk_and_factors", analyze_risk_and_factors)
-workflow.add_node("generate_ai_response", generate_ai_response)
-workflow.add_node("generate_quick_response", generate_quick_response)
-workflow.add_node("format_response", format_response)
-
-# Set Entry Point
-workflow.set_entry_point("analyze_risk_and_factors")
-
-# ** CONDITIONAL EDGES (REASONING) **
-workflow.add_conditional_edges(
-    "analyze_risk_and_factors",
-    decide_next_step,
-    {
-        "fast_path": "generate_quick_response",
-        "deep_path": "generate_ai_response"
-    }
-)
-
-# Connect branches to formatter
-workflow.add_edge("generate_ai_response", "format_response")
-workflow.add_edge("generate_quick_response", "format_response")
-workflow.add_edge("format_response", END)
-
-# Compile
-burnout_app = workflow.compile()
\ No newline at end of file
+def _build_graph():
+    with timed("import:langgraph"):
+        from langchain_core.runnables import RunnableLambda
+        from langgraph.graph import StateGraph, END
+
+    with timed("init:graph"):
+        workflow = StateGraph(BurnoutState)
+
+        # Add Nodes (each wrapped so its duration is recorded in /metrics)
+        node = metrics.instrument_node
+        workflow.add_node("analyze_risk_and_factors", node("analyze_risk_and_factors", analyze_risk_and_factors))
+        # invoke() runs the sync function, ainvoke() awaits the async one
+        workflow.add_node(
+            "generate_ai_response",
+            RunnableLambda(
+                node("generate_ai_response", generate_ai_response),
+                afunc=node("generate_ai_response", agenerate_ai_response)
+            )
+        )
+        workflow.add_node("generate_quick_response", node("generate_quick_response", generate_quick_response))
+        workflow.add_node("format_response", node("format_response", format_response))
+
+        # Set Entry Point
+        workflow.set_entry_point("analyze_risk_and_factors")
+
+        # ** CONDITIONAL EDGES (REASONING) **
+        workflow.add_conditional_edges(
+            "analyze_risk_and_factors",
+            decide_next_step,
+            {
+                "fast_path": "generate_quick_response",
+                "deep_path": "generate_ai_response"
+            }
+        )
+
+        # Connect branches to formatter
+        workflow.add_edge("generate_ai_response", "format_response")
+        workflow.add_edge("generate_quick_response", "format_response")
+        workflow.add_edge("format_response", END)
+
+        # Compile
+        return workflow.compile()
+
+def _build_deep_graph():
+    """The deep branch on its own, for states whose rules already ran."""
+    from langchain_core.runnables import RunnableLambda
+    from langgraph.graph import StateGraph, END
+
+    with timed("init:deep_graph"):
+        workflow = StateGraph(BurnoutState)
+        node = metrics.instrument_node
+        workflow.add_node(
+            "generate_ai_response",
+            RunnableLambda(
+                node("generate_ai_response", generate_ai_response),
+                afunc=node("generate_ai_response", agenerate_ai_response)
+            )
+        )
+        workflow.add_node("format_response", node("format_response", format_response))
+        workflow.set_entry_point("generate_ai_response")
+        workflow.add_edge("generate_ai_response", "format_response")
+        workflow.add_edge("format_response", END)
+        return workflow.compile()
+
+# --- GRAPH-FREE FAST PATH ---
+# The rules and the low-risk branch are plain function calls; running them
+# through LangGraph only adds state copying and per-node bookkeeping. With
+# BURNOUT_FAST_PATH_DIRECT on, only deep-path states enter a graph, which
+# starts at generate_ai_response. final_response is identical either way.
+
+def _analyze(state: BurnoutState):
+    with metrics.NODE_DURATION.time(node="analyze_risk_and_factors"):
+        state = analyze_risk_and_factors(state)
+    return state, decide_next_step(state)
+
+def _finish_fast_path(state: BurnoutState) -> BurnoutState:
+    with metrics.NODE_DURATION.time(node="generate_quick_response"):
+        state = generate_quick_response(state)
+    with metrics.NODE_DURATION.time(node="format_response"):
+        return format_response(state)
+
+def run_workflow(state: BurnoutState) -> BurnoutState:
+    """Same result as get_burnout_app().invoke(state)."""
+    if not config.FAST_PATH_DIRECT:
+        return get_burnout_app().invoke(state)
+    state, route = _analyze(state)
+    if route == "fast_path":
+        return _finish_fast_path(state)
+    return get_deep_app().invoke(state)
+
+async def arun_workflow(state: BurnoutState) -> BurnoutState:
+    """Same result as await get_burnout_app().ainvoke(state)."""
+    if not config.FAST_PATH_DIRECT:
+        return await get_burnout_app().ainvoke(state)
+    state, route = _analyze(state)
+    if route == "fast_path":
+        return _finish_fast_path(state)
+    return await get_deep_app().ainvoke(state)
+
+def warm_up(llm: bool = True):
+    """
+    Builds the graph now, and the Gemini client and chain unless `llm` is
+    False. A pre-fork master passes False: the client holds a gRPC channel,
+    which must not cross a fork, so each worker builds its own.
+    """
+    if llm:
+        get_llm_chain()
+    get_burnout_app()
+    if config.FAST_PATH_DIRECT:
+        get_deep_app()
@@ -0,0 +1,216 @@
+import os
+from dotenv import load_dotenv
+
+# --- Load .env (same file the graph uses for the API key) ---
+load_dotenv()
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+# --- Long-Term Memory (LTM) ---
+# Root folder; each agent keeps its data under LTM_DIR/<agent_id>/
+LTM_DIR = os.getenv("BURNOUT_LTM_DIR", "LTM")
+# fsync after this many appended records...
+LTM_FSYNC_EVERY = _env_int("BURNOUT_LTM_FSYNC_EVERY", 32)
+# ...or after this many seconds, whichever comes first
+LTM_FSYNC_INTERVAL = _env_float("BURNOUT_LTM_FSYNC_INTERVAL", 1.0)
+# Upper bound on per-employee log files kept open at once
+LTM_MAX_OPEN_FILES = _env_int("BURNOUT_LTM_MAX_OPEN_FILES", 64)
+
+# --- LTM Compaction / Retention ---
+# Raw entries kept per employee; older ones are folded into aggregates.json
+LTM_KEEP_RAW = _env_int("BURNOUT_LTM_KEEP_RAW", 200)
+# Also fold raw entries older than this many days (0 = no age limit)
+LTM_RAW_MAX_AGE_DAYS = _env_float("BURNOUT_LTM_RAW_MAX_AGE_DAYS", 0.0)
+# Seconds between scheduled compactions in a running agent (0 = CLI only)
+LTM_COMPACT_INTERVAL = _env_float("BURNOUT_LTM_COMPACT_INTERVAL", 0.0)
+LTM_AGGREGATES_FILE = os.getenv("BURNOUT_LTM_AGGREGATES_FILE", "aggregates.json")
+
+# --- Memory Snapshots (jsonl backend) ---
+# Compressed msgpack snapshot of each employee's recent window and trend
+# state, read lazily per employee at startup instead of parsing every log
+LTM_SNAPSHOT_ENABLED = _env_bool("BURNOUT_LTM_SNAPSHOT_ENABLED", True)
+LTM_SNAPSHOT_FILE = os.getenv("BURNOUT_LTM_SNAPSHOT_FILE", "snapshot.bin")
+# Seconds between snapshots in a running agent (0 = only on shutdown)
+LTM_SNAPSHOT_INTERVAL = _env_float("BURNOUT_LTM_SNAPSHOT_INTERVAL", 300.0)
+LTM_SNAPSHOT_LEVEL = _env_int("BURNOUT_LTM_SNAPSHOT_LEVEL", 3)
+
+# --- History Index ---
+# Recent entries kept in memory per employee
+HISTORY_WINDOW = _env_int("BURNOUT_HISTORY_WINDOW", 10)
+
+# --- Trend State ---
+# Consecutive medium/high results that turn a medium result into a trend
+TREND_WINDOW = _env_int("BURNOUT_TREND_WINDOW", 2)
+# EWMA decay for stress / work hours / sleep (weight of the newest report)
+TREND_EWMA_ALPHA = _env_float("BURNOUT_TREND_EWMA_ALPHA", 0.3)
+# Smoothed stress at or above this also counts as a trend (0 = rule off)
+TREND_EWMA_STRESS = _env_float("BURNOUT_TREND_EWMA_STRESS", 0.0)
+# Saved under LTM_DIR/<agent_id>/; rebuilt from LTM if missing or stale
+TREND_STATE_FILE = os.getenv("BURNOUT_TREND_STATE_FILE", "trend_state.json")
+# Seconds between background saves (0 = only on shutdown)
+TREND_SAVE_INTERVAL = _env_float("BURNOUT_TREND_SAVE_INTERVAL", 30.0)
+
+# --- LLM Response Cache ---
+LLM_CACHE_ENABLED = _env_bool("BURNOUT_LLM_CACHE_ENABLED", True)
+LLM_CACHE_MAX_ENTRIES = _env_int("BURNOUT_LLM_CACHE_MAX_ENTRIES", 256)
+LLM_CACHE_TTL = _env_float("BURNOUT_LLM_CACHE_TTL", 24 * 3600.0)
+# Distinct LLM responses kept per (risk, factors) key before we stop calling the LLM
+LLM_CACHE_VARIANTS = _env_int("BURNOUT_LLM_CACHE_VARIANTS", 3)
+# Optional JSON file to persist the cache across restarts ("" = memory only)
+LLM_CACHE_PATH = os.getenv("BURNOUT_LLM_CACHE_PATH", "")
+# Seconds between background saves of that file (it is also saved at exit)
+LLM_CACHE_SAVE_INTERVAL = _env_float("BURNOUT_LLM_CACHE_SAVE_INTERVAL", 30.0)
+
+# --- Fast Path ---
+# Low-risk requests skip LangGraph: rules + template run as plain calls and
+# only deep-path requests enter the graph. Output is identical either way.
+FAST_PATH_DIRECT = _env_bool("BURNOUT_FAST_PATH_DIRECT", True)
+
+# --- Async Serving (asgi.py) ---
+# Max concurrent in-flight LLM calls per event loop; extra requests wait their turn
+LLM_MAX_CONCURRENCY = _env_int("BURNOUT_LLM_MAX_CONCURRENCY", 32)
+
+# --- ChromaDB Background Writer ---
+CHROMA_QUEUE_SIZE = _env_int("BURNOUT_CHROMA_QUEUE_SIZE", 10000)
+CHROMA_BATCH_SIZE = _env_int("BURNOUT_CHROMA_BATCH_SIZE", 64)
+# Max seconds an entry waits in a partial batch before it is flushed
+CHROMA_FLUSH_INTERVAL = _env_float("BURNOUT_CHROMA_FLUSH_INTERVAL", 0.5)
+# How long a request blocks on a full queue before the entry is dropped
+CHROMA_PUT_TIMEOUT = _env_float("BURNOUT_CHROMA_PUT_TIMEOUT", 1.0)
+
+# --- Startup ---
+# "full": build graph, LLM client, LTM index and Chroma when app.py loads
+# "pre_fork": build only the graph (for gunicorn --preload masters; the
+# Gemini client is not fork-safe, so each worker builds its own)
+# "off": build everything lazily on the first request
+WARM_UP = os.getenv("BURNOUT_WARM_UP", "full").strip().lower()
+
+# --- LTM Backend ---
+# "jsonl": per-employee append-only files (single process)
+# "sqlite": one WAL-mode SQLite file, safe for several worker processes
+LTM_BACKEND = os.getenv("BURNOUT_LTM_BACKEND", "jsonl").strip().lower()
+LTM_SQLITE_FILE = os.getenv("BURNOUT_LTM_SQLITE_FILE", "ltm.sqlite3")
+# Seconds a writer waits on another process's lock before erroring
+LTM_SQLITE_BUSY_TIMEOUT = _env_float("BURNOUT_LTM_SQLITE_BUSY_TIMEOUT", 5.0)
+
+# --- ChromaDB ---
+# Set to 0 to skip vector storage entirely (e.g. offline benchmarks: the
+# default embedding function downloads a model on first use)
+CHROMA_ENABLED = _env_bool("BURNOUT_CHROMA_ENABLED", True)
+# What each LTM entry becomes in ChromaDB:
+# "full": the whole entry as JSON is embedded (default; the original burnout_memory collection)
+# "summary": a short risk/factors/suggestion text is embedded
+# "metadata": no text and no embedding model, just a small numeric vector
+# Each mode has its own collection: switching starts from an empty one
+CHROMA_MODE = os.getenv("BURNOUT_CHROMA_MODE", "full").strip().lower()
+CHROMA_PATH = os.getenv("BURNOUT_CHROMA_PATH", "chroma_db")
+
+# --- Logging ---
+LOG_FILE = os.getenv("BURNOUT_LOG_FILE", "agent.log")
+LOG_LEVEL = os.getenv("BURNOUT_LOG_LEVEL", "INFO").upper()
+LOG_CONSOLE_LEVEL = os.getenv("BURNOUT_LOG_CONSOLE_LEVEL", "WARNING").upper()
+LOG_MAX_BYTES = _env_int("BURNOUT_LOG_MAX_BYTES", 10 * 1024 * 1024)
+LOG_BACKUP_COUNT = _env_int("BURNOUT_LOG_BACKUP_COUNT", 5)
+# Records waiting for the writer thread; beyond this they are dropped, never blocking a request
+LOG_QUEUE_SIZE = _env_int("BURNOUT_LOG_QUEUE_SIZE", 10000)
+# Fraction of DEBUG / INFO records kept (WARNING and above are always kept)
+LOG_SAMPLE_DEBUG = _env_float("BURNOUT_LOG_SAMPLE_DEBUG", 1.0)
+LOG_SAMPLE_INFO = _env_float("BURNOUT_LOG_SAMPLE_INFO", 1.0)
+
+# --- Supervisor/Worker Transport ---
+# "none" (send_message only logs), "inprocess" (asyncio queues in this
+# process) or "unix" (a broker on TRANSPORT_SOCKET, see agents/transport.py)
+TRANSPORT = os.getenv("BURNOUT_TRANSPORT", "none").strip().lower()
+TRANSPORT_SOCKET = os.getenv("BURNOUT_TRANSPORT_SOCKET", "/tmp/burnout-broker.sock")
+# Messages waiting per mailbox before publish() blocks
+TRANSPORT_QUEUE_SIZE = _env_int("BURNOUT_TRANSPORT_QUEUE_SIZE", 10000)
+TRANSPORT_BATCH_SIZE = _env_int("BURNOUT_TRANSPORT_BATCH_SIZE", 64)
+# Seconds a delivery waits for more messages to fill its batch
+TRANSPORT_BATCH_INTERVAL = _env_float("BURNOUT_TRANSPORT_BATCH_INTERVAL", 0.01)
+# Seconds publish() blocks on a full mailbox before raising TransportFull
+TRANSPORT_PUBLISH_TIMEOUT = _env_float("BURNOUT_TRANSPORT_PUBLISH_TIMEOUT", 1.0)
+# Lease in seconds on a delivered batch; the subscriber renews it every third of
+# this while its handler runs, so only a dead subscriber's batch is redelivered
+TRANSPORT_ACK_TIMEOUT = _env_float("BURNOUT_TRANSPORT_ACK_TIMEOUT", 5.0)
+# Redeliveries of an un-acked batch before it is dead-lettered
+TRANSPORT_MAX_RETRIES = _env_int("BURNOUT_TRANSPORT_MAX_RETRIES", 3)
+
+# --- LLM Latency Budget (see agents/llm_guard.py) ---
+# Upper bound in seconds on one deep-path LLM call (tighter if the task carries a deadline)
+LLM_TIMEOUT = _env_float("BURNOUT_LLM_TIMEOUT", 10.0)
+# Below this many ms of remaining budget the template is used without calling the LLM
+LLM_MIN_BUDGET_MS = _env_float("BURNOUT_LLM_MIN_BUDGET_MS", 50.0)
+# Start a second, hedged call if the first hasn't answered after this many seconds (0 = off)
+LLM_HEDGE_DELAY = _env_float("BURNOUT_LLM_HEDGE_DELAY", 0.0)
+# Consecutive LLM timeouts/errors that open the circuit breaker
+BREAKER_FAILURES = _env_int("BURNOUT_BREAKER_FAILURES", 5)
+# Seconds the breaker stays open before letting one probe call through
+BREAKER_COOLDOWN = _env_float("BURNOUT_BREAKER_COOLDOWN", 30.0)
+
+# --- LLM Output Format ---
+# "parser": prompt embeds the JSON format instructions, reply parsed from text (original)
+# "structured": short prompt, the model's native JSON-schema output against AIResponse
+LLM_OUTPUT_MODE = os.getenv("BURNOUT_LLM_OUTPUT_MODE", "parser").strip().lower()
+# Output token cap for the Gemini client in structured mode (0 = model default)
+LLM_MAX_OUTPUT_TOKENS = _env_int("BURNOUT_LLM_MAX_OUTPUT_TOKENS", 400)
+
+# --- Team / Org Rollups (see agents/rollups.py) ---
+# Time bucket for rollups: hour, day, week or month
+ROLLUP_BUCKET = os.getenv("BURNOUT_ROLLUP_BUCKET", "day").strip().lower()
+# Newest buckets kept per team (older ones still count in the totals)
+ROLLUP_MAX_BUCKETS = _env_int("BURNOUT_ROLLUP_MAX_BUCKETS", 90)
+ROLLUP_FILE = os.getenv("BURNOUT_ROLLUP_FILE", "rollups.json")
+# Seconds between background saves (0 = only on shutdown)
+ROLLUP_SAVE_INTERVAL = _env_float("BURNOUT_ROLLUP_SAVE_INTERVAL", 30.0)
+
+# --- Idempotency (see agents/idempotency.py) ---
+IDEMPOTENCY_ENABLED = _env_bool("BURNOUT_IDEMPOTENCY_ENABLED", True)
+# Seconds a completed report is replayed for retries of its message_id
+IDEMPOTENCY_TTL = _env_float("BURNOUT_IDEMPOTENCY_TTL", 24 * 3600.0)
+IDEMPOTENCY_MAX_ENTRIES = _env_int("BURNOUT_IDEMPOTENCY_MAX_ENTRIES", 10000)
+IDEMPOTENCY_FILE = os.getenv("BURNOUT_IDEMPOTENCY_FILE", "idempotency.jsonl")
+# Seconds a duplicate waits for its still-running original before giving up (409)
+IDEMPOTENCY_WAIT_TIMEOUT = _env_float("BURNOUT_IDEMPOTENCY_WAIT_TIMEOUT", 120.0)
+
+# --- Sharded Worker Pool (see agents/sharding.py) ---
+# Worker processes that each own a partition of employees (0 = single process, -1 = one per CPU)
+SHARDS = _env_int("BURNOUT_SHARDS", 0)
+# Points per shard on the consistent-hash ring
+SHARD_VNODES = _env_int("BURNOUT_SHARD_VNODES", 128)
+# Requests each worker runs concurrently
+SHARD_THREADS = _env_int("BURNOUT_SHARD_THREADS", 16)
+# Seconds the router waits for a worker's answer, and for a worker to start
+SHARD_TIMEOUT = _env_float("BURNOUT_SHARD_TIMEOUT", 120.0)
+SHARD_START_TIMEOUT = _env_float("BURNOUT_SHARD_START_TIMEOUT", 120.0)
+# Longest pause in seconds before restarting a worker that keeps exiting soon
+# after it starts (doubling from 0.5 s); one that ran this long restarts at once
+SHARD_RESTART_BACKOFF_MAX = _env_float("BURNOUT_SHARD_RESTART_BACKOFF_MAX", 30.0)
+
+# --- Admission Control (see agents/admission.py) ---
+ADMISSION_ENABLED = _env_bool("BURNOUT_ADMISSION_ENABLED", True)
+# Tasks run at once on the fast (template) and deep (LLM) lanes
+ADMISSION_FAST_WORKERS = _env_int("BURNOUT_ADMISSION_FAST_WORKERS", 64)
+ADMISSION_DEEP_WORKERS = _env_int("BURNOUT_ADMISSION_DEEP_WORKERS", LLM_MAX_CONCURRENCY)
+# Tasks that may wait for a slot on each lane; beyond this load is shed
+ADMISSION_FAST_QUEUE = _env_int("BURNOUT_ADMISSION_FAST_QUEUE", 256)
+ADMISSION_DEEP_QUEUE = _env_int("BURNOUT_ADMISSION_DEEP_QUEUE", 64)
+# Seconds a task waits for a slot before it is shed (less if its deadline is sooner)
+ADMISSION_MAX_WAIT = _env_float("BURNOUT_ADMISSION_MAX_WAIT", 5.0)
+# Shed medium-priority deep work to the template response instead of answering 429
+ADMISSION_DEGRADE = _env_bool("BURNOUT_ADMISSION_DEGRADE", True)
@@ -0,0 +1,91 @@
+import threading
+from collections import deque
+
+from agents import config
+from agents.ltm_store import entry_employee_id
+
+
+class HistoryIndex:
+    """
+    In-memory index: employee_id -> bounded deque of their latest LTM entries.
+    Built once from LTM at startup and updated on every write, so a request
+    only ever touches its own employee's recent window.
+    """
+
+    def __init__(self, window: int = None):
+        self.window = window or config.HISTORY_WINDOW
+        self._recent = {}
+        self._lock = threading.Lock()
+        self.entries = 0  # total entries seen (build + add)
+
+    def build(self, entries):
+        """(Re)builds the index from an iterable of LTM entries, oldest first."""
+        recent = {}
+        count = 0
+        for entry in entries:
+            count += 1
+            employee_id = entry_employee_id(entry)
+            bucket = recent.get(employee_id)
+            if bucket is None:
+                bucket = recent[employee_id] = deque(maxlen=self.window)
+            bucket.append(entry)
+        with self._lock:
+            self._recent = recent
+            self.entries = count
+
+    def add(self, entry: dict):
+        employee_id = entry_employee_id(entry)
+        with self._lock:
+            bucket = self._recent.get(employee_id)
+            if bucket is None:
+                bucket = self._recent[employee_id] = deque(maxlen=self.window)
+            bucket.append(entry)
+            self.entries += 1
+
+    def set_window(self, employee_id: str, entries: list):
+        """Installs an employee's window loaded elsewhere (e.g. a snapshot), unless already present."""
+        with self._lock:
+            if employee_id not in self._recent:
+                self._recent[employee_id] = deque(entries, maxlen=self.window)
+
+    def compacted(self, removed: int):
+        """Records that `removed` old entries were folded out of the LTM."""
+        with self._lock:
+            self.entries -= removed
+
+    def recent(self, employee_id: str) -> list:
+        """Returns a copy of the employee's recent window, oldest first."""
+        with self._lock:
+            bucket = self._recent.get(str(employee_id))
+            return list(bucket) if bucket else []
+
+    def __len__(self):
+        return len(self._recent)
+
+
+class StoreHistoryView:
+    """
+    HistoryIndex stand-in for shared backends (e.g. SQLite used by several
+    worker processes). Other processes write to the same store, so an
+    in-process copy would go stale; every lookup is an indexed query instead.
+    """
+
+    def __init__(self, store, window: int = None):
+        self.store = store
+        # Long enough for the trend rule, which is folded from this window
+        self.window = window or max(config.HISTORY_WINDOW, config.TREND_WINDOW)
+
+    def build(self, entries):
+        pass  # nothing cached
+
+    def add(self, entry: dict):
+        pass  # already persisted by the store
+
+    def compacted(self, removed: int):
+        pass
+
+    def recent(self, employee_id: str) -> list:
+        return self.store.recent(str(employee_id), self.window)
+
+    def __len__(self):
+        return len(self.store.employee_ids())
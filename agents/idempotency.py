@@ -0,0 +1,441 @@
+"""
+Idempotent task processing keyed on message_id.
+
+A supervisor that retries a task (HTTP timeout, transport redelivery)
+sends the same message_id again. The first completed report for a
+message_id is kept for BURNOUT_IDEMPOTENCY_TTL seconds (at most
+BURNOUT_IDEMPOTENCY_MAX_ENTRIES of them), and a retry gets that report back
+without re-running the graph, calling the LLM or writing LTM/Chroma again.
+A duplicate that arrives while the original is still running waits for its
+result. Failures are not kept, so retrying a failed task runs it again.
+
+Completed reports are appended to <ltm_dir>/idempotency.jsonl, so a
+restart still recognises retries. The file is rewritten without expired
+or evicted entries on load and whenever it holds twice the limit.
+
+With the SQLite LTM backend several processes serve tasks, so
+SqliteIdempotencyStore keeps the reports in an `idempotency` table of the
+shared database instead: a retry is recognised whichever process gets it,
+and a duplicate of a task running in another process polls for its report.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from agents import config
+from agents.llm_guard import DEADLINE_KEYS
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotencyConflict(Exception):
+    """The message_id was already used for other parameters, or its original is still running."""
+
+
+def fingerprint(params: dict) -> str:
+    """Short hash of a task's parameters (deadlines left out: a retry may carry a new one)."""
+    params = {k: v for k, v in (params or {}).items() if k not in DEADLINE_KEYS}
+    blob = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(blob.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    message_id -> completed report, in insertion order (so oldest and
+    soonest-expiring first), plus the in-flight originals as Futures that
+    both threads and coroutines can wait on.
+    """
+
+    def __init__(self, path: str = None, ttl: float = None, max_entries: int = None,
+                 wait_timeout: float = None):
+        self.path = path
+        self.ttl = config.IDEMPOTENCY_TTL if ttl is None else ttl
+        self.max_entries = max_entries or config.IDEMPOTENCY_MAX_ENTRIES
+        self.wait_timeout = config.IDEMPOTENCY_WAIT_TIMEOUT if wait_timeout is None else wait_timeout
+
+        self._done = OrderedDict()  # message_id -> (expires, fingerprint, report)
+        self._in_flight = {}  # message_id -> (fingerprint, Future)
+        self._lock = threading.Lock()
+        self._file = None
+        self._journal_lines = 0
+        self.replayed = 0
+        self.waited = 0
+        self.executed = 0
+        self.conflicts = 0
+
+        if self.path:
+            self._load()
+
+    # --- Claiming ---
+
+    def _claim(self, message_id: str, fp: str) -> tuple:
+        """("done", report), ("wait", future) or ("run", future) for a new original."""
+        with self._lock:
+            entry = self._done.get(message_id)
+            if entry is not None and entry[0] <= time.time():
+                del self._done[message_id]
+                entry = None
+            if entry is not None:
+                self._check(message_id, fp, entry[1])
+                self.replayed += 1
+                return "done", entry[2]
+            flight = self._in_flight.get(message_id)
+            if flight is not None:
+                self._check(message_id, fp, flight[0])
+                self.waited += 1
+                return "wait", flight[1]
+            future = Future()
+            self._in_flight[message_id] = (fp, future)
+            self.executed += 1
+            return "run", future
+
+    def _check(self, message_id: str, fp: str, original: str):
+        if fp is not None and original is not None and fp != original:
+            self.conflicts += 1
+            raise IdempotencyConflict(f"message_id '{message_id}' was already used for a different task")
+
+    def _finish(self, message_id: str, fp: str, future: Future, report=None, error: BaseException = None):
+        with self._lock:
+            self._in_flight.pop(message_id, None)
+            if error is None:
+                self._put(message_id, time.time() + self.ttl, fp, report)
+        if error is None:
+            future.set_result(report)
+        else:
+            future.set_exception(error)
+
+    def _timed_out(self, message_id: str):
+        return IdempotencyConflict(
+            f"message_id '{message_id}' is still being processed after {self.wait_timeout:g}s; retry later")
+
+    # --- Running ---
+
+    def run(self, message_id: str, compute, params: dict = None) -> tuple:
+        """
+        Returns (report, replayed): the stored report for message_id, or
+        the one compute() builds (stored only if it returns). Raises
+        IdempotencyConflict if message_id was used for other params.
+        """
+        fp = fingerprint(params) if params is not None else None
+        kind, value = self._claim(message_id, fp)
+        if kind == "done":
+            return value, True
+        if kind == "wait":
+            try:
+                return value.result(timeout=self.wait_timeout), True
+            except FutureTimeout:
+                raise self._timed_out(message_id) from None
+        try:
+            report = compute()
+        except BaseException as e:
+            self._finish(message_id, fp, value, error=e)
+            raise
+        self._finish(message_id, fp, value, report)
+        return report, False
+
+    async def arun(self, message_id: str, acompute, params: dict = None) -> tuple:
+        """
+        Async run(): acompute() returns an awaitable. Claiming and recording
+        (journal writes, SQLite transactions) run in worker threads and
+        waiting is awaited, so none of it blocks the loop.
+        """
+        fp = fingerprint(params) if params is not None else None
+        claim = asyncio.ensure_future(asyncio.to_thread(self._claim, message_id, fp))
+        try:
+            kind, value = await asyncio.shield(claim)
+        except asyncio.CancelledError:
+            # The claim still lands in its thread; release an original it made
+            claim.add_done_callback(lambda done: self._abandon(message_id, fp, done))
+            raise
+        if kind == "done":
+            return value, True
+        if kind == "wait":
+            try:
+                return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(value)), self.wait_timeout), True
+            except asyncio.TimeoutError:
+                raise self._timed_out(message_id) from None
+        try:
+            report = await acompute()
+        except BaseException as e:
+            await asyncio.to_thread(self._finish, message_id, fp, value, error=e)
+            raise
+        await asyncio.to_thread(self._finish, message_id, fp, value, report)
+        return report, False
+
+    def _abandon(self, message_id: str, fp: str, claim: asyncio.Future):
+        """Fails an original claimed for a caller that was cancelled while claiming."""
+        if claim.cancelled() or claim.exception() is not None:
+            return
+        kind, future = claim.result()
+        if kind == "run":
+            asyncio.get_running_loop().run_in_executor(
+                None, lambda: self._finish(message_id, fp, future, error=asyncio.CancelledError()))
+
+    # --- Storage ---
+
+    def _put(self, message_id: str, expires: float, fp: str, report, journal: bool = True):
+        """Caller must hold the lock."""
+        self._done[message_id] = (expires, fp, report)
+        self._done.move_to_end(message_id)
+        now = time.time()
+        while self._done:
+            oldest = next(iter(self._done.values()))
+            if len(self._done) <= self.max_entries and oldest[0] > now:
+                break
+            self._done.popitem(last=False)
+        if journal and self.path:
+            self._append(message_id, expires, fp, report)
+
+    def _append(self, message_id: str, expires: float, fp: str, report):
+        try:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(json.dumps({"id": message_id, "expires": expires, "fp": fp, "report": report},
+                                        separators=(",", ":"), default=str) + "\n")
+            self._file.flush()
+            self._journal_lines += 1
+            if self._journal_lines > 2 * self.max_entries:
+                self._rewrite()
+        except OSError as e:
+            logger.warning("[Idempotency] could not write %s: %s", self.path, e)
+
+    def _rewrite(self):
+        """Replaces the journal with just the live entries. Caller must hold the lock."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for message_id, (expires, fp, report) in self._done.items():
+                f.write(json.dumps({"id": message_id, "expires": expires, "fp": fp, "report": report},
+                                   separators=(",", ":"), default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._journal_lines = len(self._done)
+
+    def _load(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if not os.path.exists(self.path):
+            return
+        now = time.time()
+        with self._lock:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            continue  # torn last line
+                        if record.get("expires", 0) > now:
+                            self._put(record["id"], record["expires"], record.get("fp"), record["report"],
+                                      journal=False)
+                self._rewrite()
+            except OSError as e:
+                logger.warning("[Idempotency] could not load %s: %s", self.path, e)
+        logger.info("[Idempotency] %d completed reports loaded from %s.", len(self._done), self.path)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __len__(self):
+        return len(self._done)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._done),
+                "in_flight": len(self._in_flight),
+                "executed": self.executed,
+                "replayed": self.replayed,
+                "waited": self.waited,
+                "conflicts": self.conflicts,
+            }
+
+
+# --- Shared (SQLite) Store ---
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS idempotency (
+    message_id TEXT PRIMARY KEY,
+    fp         TEXT,
+    expires    REAL NOT NULL,
+    report     TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_idempotency_expires ON idempotency (expires);
+"""
+SELECT_CLAIM = "SELECT fp, expires, report FROM idempotency WHERE message_id = ?"
+UPSERT_CLAIM = "INSERT OR REPLACE INTO idempotency (message_id, fp, expires, report) VALUES (?, ?, ?, NULL)"
+UPDATE_REPORT = "UPDATE idempotency SET expires = ?, report = ? WHERE message_id = ?"
+DELETE_CLAIM = "DELETE FROM idempotency WHERE message_id = ? AND report IS NULL"
+DELETE_EXPIRED = "DELETE FROM idempotency WHERE expires <= ?"
+DELETE_OLDEST = (
+    "DELETE FROM idempotency WHERE message_id IN ("
+    "SELECT message_id FROM idempotency WHERE report IS NOT NULL ORDER BY expires LIMIT ?)"
+)
+COUNT_REPORTS = "SELECT COUNT(*) FROM idempotency WHERE report IS NOT NULL"
+PRUNE_EVERY = 64
+
+
+class SqliteIdempotencyStore(IdempotencyStore):
+    """
+    IdempotencyStore over a table in the shared LTM database. A running
+    original holds a row with no report until it finishes (a failure
+    deletes the row). That claim lapses after wait_timeout, so a process
+    that died mid-task doesn't block its message_id until the TTL.
+    """
+
+    def __init__(self, db_path: str, ttl: float = None, max_entries: int = None,
+                 wait_timeout: float = None, busy_timeout: float = None):
+        super().__init__(None, ttl, max_entries, wait_timeout)
+        self.db_path = db_path
+        self.busy_timeout = busy_timeout if busy_timeout is not None else config.LTM_SQLITE_BUSY_TIMEOUT
+        self._db_lock = threading.RLock()
+        self._conn_obj = None
+        self._pid = None
+        self._writes = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per process, like SqliteLTMStore; callers hold _db_lock."""
+        if self._conn_obj is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, check_same_thread=False,
+                                   isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._conn_obj = conn
+            self._pid = os.getpid()
+        return self._conn_obj
+
+    def _claim_row(self, message_id: str, fp: str) -> tuple:
+        """("run", None), ("done", (fp, report)) or ("busy", fp), decided in one transaction."""
+        with self._db_lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(SELECT_CLAIM, (message_id,)).fetchone()
+                if row is None or row[1] <= time.time():
+                    conn.execute(UPSERT_CLAIM, (message_id, fp, time.time() + self.wait_timeout))
+                    result = "run", None
+                elif row[2] is not None:
+                    result = "done", (row[0], json.loads(row[2]))
+                else:
+                    result = "busy", row[0]
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return result
+
+    def _claim(self, message_id: str, fp: str) -> tuple:
+        with self._lock:
+            flight = self._in_flight.get(message_id)
+            if flight is not None:
+                self._check(message_id, fp, flight[0])
+                self.waited += 1
+                return "wait", flight[1]
+            try:
+                kind, value = self._claim_row(message_id, fp)
+            except sqlite3.Error as e:
+                logger.warning("[Idempotency] could not claim %s in %s: %s", message_id, self.db_path, e)
+                kind, value = "run", None
+            if kind == "done":
+                self._check(message_id, fp, value[0])
+                self.replayed += 1
+                return "done", value[1]
+            future = Future()
+            if kind == "busy":
+                # Running in another process; duplicates here share one watcher
+                self._check(message_id, fp, value)
+                self._in_flight[message_id] = (value, future)
+                self.waited += 1
+                threading.Thread(target=self._watch, args=(message_id, future),
+                                 name="idempotency-watch", daemon=True).start()
+                return "wait", future
+            self._in_flight[message_id] = (fp, future)
+            self.executed += 1
+            return "run", future
+
+    def _watch(self, message_id: str, future: Future):
+        """Polls for the report of an original running in another process."""
+        deadline = time.monotonic() + self.wait_timeout
+        delay = 0.02
+        try:
+            while time.monotonic() < deadline:
+                time.sleep(delay)
+                delay = min(0.5, delay * 2)
+                try:
+                    with self._db_lock:
+                        row = self._conn().execute(SELECT_CLAIM, (message_id,)).fetchone()
+                except sqlite3.Error:
+                    continue
+                if row is not None and row[2] is not None:
+                    future.set_result(json.loads(row[2]))
+                    return
+                if row is None or row[1] <= time.time():
+                    future.set_exception(IdempotencyConflict(
+                        f"message_id '{message_id}' did not complete in the process running it; retry it"))
+                    return
+            future.set_exception(self._timed_out(message_id))
+        finally:
+            with self._lock:
+                if self._in_flight.get(message_id, (None, None))[1] is future:
+                    del self._in_flight[message_id]
+
+    def _finish(self, message_id: str, fp: str, future: Future, report=None, error: BaseException = None):
+        try:
+            with self._db_lock:
+                conn = self._conn()
+                if error is None:
+                    conn.execute(UPDATE_REPORT, (time.time() + self.ttl,
+                                                 json.dumps(report, separators=(",", ":"), default=str),
+                                                 message_id))
+                    self._writes += 1
+                    if self._writes % PRUNE_EVERY == 0:
+                        self._prune(conn)
+                else:
+                    conn.execute(DELETE_CLAIM, (message_id,))
+        except sqlite3.Error as e:
+            logger.warning("[Idempotency] could not record %s in %s: %s", message_id, self.db_path, e)
+        with self._lock:
+            self._in_flight.pop(message_id, None)
+        if error is None:
+            future.set_result(report)
+        else:
+            future.set_exception(error)
+
+    def _prune(self, conn):
+        """Drops expired rows, then the soonest-expiring reports over max_entries."""
+        conn.execute(DELETE_EXPIRED, (time.time(),))
+        excess = conn.execute(COUNT_REPORTS).fetchone()[0] - self.max_entries
+        if excess > 0:
+            conn.execute(DELETE_OLDEST, (excess,))
+
+    def close(self):
+        with self._db_lock:
+            if self._conn_obj is not None and self._pid == os.getpid():
+                self._conn_obj.close()
+            self._conn_obj = None
+
+    def __len__(self):
+        with self._db_lock:
+            return self._conn().execute(COUNT_REPORTS).fetchone()[0]
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        try:
+            stats["entries"] = len(self)
+        except sqlite3.Error:
+            pass
+        return stats
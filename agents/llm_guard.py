@@ -0,0 +1,309 @@
+"""
+Latency budget, circuit breaker and hedging around the Gemini call.
+
+Every deep-path LLM call gets a budget: the time left until the task's
+deadline (deadline_ms / deadline on the task message), capped at
+BURNOUT_LLM_TIMEOUT. A call that can't finish within it is abandoned and the
+request falls back to the static template. After BURNOUT_BREAKER_FAILURES
+timeouts or errors in a row the breaker opens and deep-path requests go
+straight to the template for BURNOUT_BREAKER_COOLDOWN seconds, then one
+probe call decides whether it closes again. With BURNOUT_LLM_HEDGE_DELAY
+set, a second identical call is started if the first hasn't answered by
+then, and whichever finishes first wins.
+
+Inside template_only() (used when admission control sheds load) deep-path
+calls go straight to the template as well; the response cache still answers.
+
+What happened is recorded in state['response_meta'] and in /metrics.
+"""
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+from agents import config, metrics
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_KEYS = ("deadline_ms", "deadline")
+
+GUARD_EVENTS = metrics.REGISTRY.counter(
+    "burnout_llm_guard_total", "LLM calls skipped, timed out, failed or hedged.", ("event",))
+
+
+class LLMUnavailable(Exception):
+    """The LLM was not (or not successfully) called; `reason` says why."""
+
+    def __init__(self, reason: str, detail: str = ""):
+        super().__init__(f"{reason}: {detail}" if detail else reason)
+        self.reason = reason
+
+
+# --- Deadlines ---
+
+def parse_deadline(source: dict, received: float = None):
+    """
+    Absolute deadline (epoch seconds) from a message or its parameters:
+    deadline_ms is a budget counted from `received` (default now), deadline
+    an absolute epoch timestamp. None if neither is set.
+    """
+    if not isinstance(source, dict):
+        return None
+    try:
+        if source.get("deadline_ms") is not None:
+            return (received or time.time()) + float(source["deadline_ms"]) / 1000.0
+        if source.get("deadline") is not None:
+            return float(source["deadline"])
+    except (TypeError, ValueError):
+        logger.warning("Ignoring malformed deadline in %s", {k: source.get(k) for k in DEADLINE_KEYS})
+    return None
+
+
+def split_deadline(task_data: dict, deadline: float = None) -> tuple:
+    """Returns (task_data without deadline keys, effective deadline)."""
+    if not any(key in task_data for key in DEADLINE_KEYS):
+        return task_data, deadline
+    own = parse_deadline(task_data)
+    task_data = {k: v for k, v in task_data.items() if k not in DEADLINE_KEYS}
+    if own is not None and (deadline is None or own < deadline):
+        deadline = own
+    return task_data, deadline
+
+
+def remaining_budget(deadline: float = None) -> float:
+    """Seconds the LLM call may take: time to the deadline, at most LLM_TIMEOUT."""
+    if deadline is None:
+        return config.LLM_TIMEOUT
+    return min(config.LLM_TIMEOUT, deadline - time.time())
+
+
+# --- Circuit Breaker ---
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures; open ->
+    half_open after `cooldown` seconds, letting a single probe through;
+    the probe's outcome closes or re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = None, cooldown: float = None):
+        self.failure_threshold = failure_threshold or config.BREAKER_FAILURES
+        self.cooldown = config.BREAKER_COOLDOWN if cooldown is None else cooldown
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.opens = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = "half_open"
+                self._probing = False
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logger.info("[LLMGuard] circuit closed")
+            self.state = "closed"
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or (self.state == "closed" and self._failures >= self.failure_threshold):
+                logger.warning("[LLMGuard] circuit opened after %d failures", self._failures)
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self._probing = False
+                self.opens += 1
+
+    def reset(self):
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+            self._probing = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "open": int(self.state == "open"),
+                "half_open": int(self.state == "half_open"),
+                "consecutive_failures": self._failures,
+                "opens": self.opens,
+                "rejected": self.rejected,
+            }
+
+
+breaker = CircuitBreaker()
+metrics.REGISTRY.register_callback("burnout_llm_circuit", "LLM circuit breaker state.", breaker.stats)
+
+
+# --- Budgeted / Hedged Calls ---
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=config.LLM_MAX_CONCURRENCY, thread_name_prefix="llm")
+    return _executor
+
+
+def call_with_budget(fn, budget: float, hedge_delay: float = None) -> tuple:
+    """
+    Runs fn() on the LLM pool and returns (result, hedged, hedge_won).
+    Raises LLMUnavailable("timeout") if nothing answered within `budget`.
+    A call that times out keeps running in the background (threads can't
+    be cancelled) but nobody waits for it.
+    """
+    hedge_delay = config.LLM_HEDGE_DELAY if hedge_delay is None else hedge_delay
+    start = time.monotonic()
+    futures = [_get_executor().submit(fn)]
+    if 0 < hedge_delay < budget:
+        done, _ = wait(futures, timeout=hedge_delay)
+        if not done:
+            futures.append(_get_executor().submit(fn))
+            GUARD_EVENTS.inc(event="hedged")
+
+    pending, error = set(futures), None
+    while pending:
+        remaining = budget - (time.monotonic() - start)
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result(), len(futures) > 1, future is not futures[0]
+            error = future.exception()
+    if error is not None and not pending:
+        raise error
+    raise LLMUnavailable("timeout", f"no answer within {budget * 1000:.0f} ms")
+
+
+async def acall_with_budget(make_coro, budget: float, hedge_delay: float = None) -> tuple:
+    """Async call_with_budget: make_coro() returns a fresh awaitable; losers are cancelled."""
+    hedge_delay = config.LLM_HEDGE_DELAY if hedge_delay is None else hedge_delay
+    start = time.monotonic()
+    tasks = [asyncio.ensure_future(make_coro())]
+    try:
+        if 0 < hedge_delay < budget:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if not done:
+                tasks.append(asyncio.ensure_future(make_coro()))
+                GUARD_EVENTS.inc(event="hedged")
+
+        pending, error = set(tasks), None
+        while pending:
+            remaining = budget - (time.monotonic() - start)
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result(), len(tasks) > 1, task is not tasks[0]
+                error = task.exception()
+        if error is not None and not pending:
+            raise error
+        raise LLMUnavailable("timeout", f"no answer within {budget * 1000:.0f} ms")
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+_skip_reason = contextvars.ContextVar("llm_skip_reason", default=None)
+
+
+@contextmanager
+def template_only(reason: str = "shed"):
+    """Deep-path LLM calls made inside the block (this thread or task) are skipped with `reason`."""
+    token = _skip_reason.set(reason)
+    try:
+        yield
+    finally:
+        _skip_reason.reset(token)
+
+
+def skip_reason():
+    """The template_only() reason in effect here, or None."""
+    return _skip_reason.get()
+
+
+def unavailable_reason(budget: float):
+    """Why a call with this budget would be skipped here whatever the breaker says ("shed", "deadline"), or None."""
+    skip = skip_reason()
+    if skip is not None:
+        return skip
+    if budget * 1000 < config.LLM_MIN_BUDGET_MS:
+        return "deadline"
+    return None
+
+
+def _admit(budget: float, meta: dict):
+    meta["budget_ms"] = round(budget * 1000, 1)
+    reason = unavailable_reason(budget)
+    if reason is None:
+        if breaker.allow():
+            return
+        reason = "circuit_open"
+    GUARD_EVENTS.inc(event=reason)
+    meta["fallback_reason"] = reason
+    raise LLMUnavailable(reason)
+
+
+def _record(meta: dict, start: float, hedged: bool, hedge_won: bool):
+    breaker.record_success()
+    if hedge_won:
+        GUARD_EVENTS.inc(event="hedge_won")
+    meta.update(source="llm", llm_ms=round((time.monotonic() - start) * 1000, 1), hedged=hedged)
+
+
+def _failed(meta: dict, error: Exception):
+    breaker.record_failure()
+    reason = error.reason if isinstance(error, LLMUnavailable) else "error"
+    GUARD_EVENTS.inc(event=reason)
+    meta["fallback_reason"] = reason
+
+
+def guarded_call(fn, budget: float, meta: dict):
+    """fn() within the budget and behind the breaker; fills `meta`, raises LLMUnavailable or fn's error."""
+    _admit(budget, meta)
+    start = time.monotonic()
+    try:
+        result, hedged, hedge_won = call_with_budget(fn, budget)
+    except Exception as e:
+        _failed(meta, e)
+        raise
+    _record(meta, start, hedged, hedge_won)
+    return result
+
+
+async def aguarded_call(make_coro, budget: float, meta: dict):
+    """Async guarded_call."""
+    _admit(budget, meta)
+    start = time.monotonic()
+    try:
+        result, hedged, hedge_won = await acall_with_budget(make_coro, budget)
+    except Exception as e:
+        _failed(meta, e)
+        raise
+    _record(meta, start, hedged, hedge_won)
+    return result
@@ -0,0 +1,303 @@
+"""
+LTM compaction and retention.
+
+Keeps the newest BURNOUT_LTM_KEEP_RAW entries per employee (and, with
+BURNOUT_LTM_RAW_MAX_AGE_DAYS, nothing older than that) as raw records and
+folds everything older into per-employee aggregates in aggregates.json:
+counts per risk level, factor frequencies, min / max / mean of the inputs
+and the trend state at the fold point, which seeds trend_state rebuilds.
+
+Run by hand with:
+    python -m agents.ltm_compaction LTM/WorkerAgent_BurnoutPrevention [--keep 100] [--max-age-days 90] [--dry-run]
+
+With the jsonl backend, run the CLI only while the agent is stopped (a
+running agent compacts itself when BURNOUT_LTM_COMPACT_INTERVAL is set).
+SQLite stores can be compacted at any time.
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from agents import config
+from agents.trend_state import EmployeeTrend
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, runs are not guarded
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+AGGREGATES_VERSION = 1
+INPUT_FIELDS = ("stress", "work_hours", "sleep_hours")
+LOCK_FILE = ".compaction.lock"
+
+
+# --- Aggregates ---
+
+def _new_aggregate() -> dict:
+    return {
+        "count": 0,
+        "first_timestamp": None,
+        "last_timestamp": None,
+        "risk_counts": {},
+        "factor_counts": {},
+        "trend_count": 0,
+        "inputs": {},
+        "trend": None,
+    }
+
+
+def fold_entries(aggregate: dict, entries: list) -> dict:
+    """Adds entries (oldest first) to an employee's aggregate in place."""
+    trend = EmployeeTrend.from_dict(aggregate["trend"]) if aggregate.get("trend") else EmployeeTrend()
+    previous = aggregate["last_timestamp"]
+    for entry in entries:
+        timestamp = entry.get('timestamp')
+        # Already folded by an earlier run that stopped before dropping them
+        if timestamp and previous and timestamp <= previous:
+            continue
+        data = entry.get('input_data', {})
+        response = entry.get('final_response', {})
+
+        aggregate["count"] += 1
+        if timestamp:
+            aggregate["first_timestamp"] = aggregate["first_timestamp"] or timestamp
+            aggregate["last_timestamp"] = timestamp
+        risk = response.get('risk_level', 'unknown')
+        aggregate["risk_counts"][risk] = aggregate["risk_counts"].get(risk, 0) + 1
+        for factor in response.get('key_factors', []):
+            aggregate["factor_counts"][factor] = aggregate["factor_counts"].get(factor, 0) + 1
+        if response.get('is_trend'):
+            aggregate["trend_count"] += 1
+
+        for field in INPUT_FIELDS:
+            try:
+                value = float(data[field])
+            except (KeyError, TypeError, ValueError):
+                continue
+            stats = aggregate["inputs"].get(field)
+            if stats is None:
+                aggregate["inputs"][field] = {"min": value, "max": value, "sum": value, "n": 1}
+            else:
+                stats["min"] = min(stats["min"], value)
+                stats["max"] = max(stats["max"], value)
+                stats["sum"] += value
+                stats["n"] += 1
+
+        trend.update_from_entry(entry)
+    aggregate["trend"] = trend.to_dict()
+    return aggregate
+
+
+def summarize(aggregate: dict) -> dict:
+    """Aggregate with input means filled in, for callers and the API."""
+    out = {key: value for key, value in aggregate.items() if key != "inputs"}
+    out["inputs"] = {
+        field: {"min": s["min"], "max": s["max"], "mean": round(s["sum"] / s["n"], 3), "count": s["n"]}
+        for field, s in aggregate.get("inputs", {}).items() if s.get("n")
+    }
+    return out
+
+
+def aggregates_path(ltm_dir: str) -> str:
+    return os.path.join(ltm_dir, config.LTM_AGGREGATES_FILE)
+
+
+def load_aggregates(ltm_dir: str) -> dict:
+    """employee_id -> aggregate ({} when nothing has been compacted yet)."""
+    path = aggregates_path(ltm_dir)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("[Compaction] could not load %s: %s", path, e)
+        return {}
+    return data.get("employees", {})
+
+
+def save_aggregates(ltm_dir: str, aggregates: dict):
+    path = aggregates_path(ltm_dir)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"version": AGGREGATES_VERSION, "employees": aggregates}, f, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_trend_seeds(ltm_dir: str) -> dict:
+    """employee_id -> EmployeeTrend of everything already folded away."""
+    return {
+        employee_id: EmployeeTrend.from_dict(aggregate["trend"])
+        for employee_id, aggregate in load_aggregates(ltm_dir).items()
+        if aggregate.get("trend")
+    }
+
+
+# --- Retention Policy ---
+
+def _entry_time(entry: dict):
+    try:
+        return datetime.fromisoformat(str(entry.get('timestamp')))
+    except ValueError:
+        return None
+
+
+def fold_count(entries: list, keep_raw: int, max_age_days: float = 0.0, now: datetime = None) -> int:
+    """How many of an employee's oldest entries the retention policy folds away."""
+    # Never fold into the window the history index and trend rule read
+    min_keep = max(config.HISTORY_WINDOW, config.TREND_WINDOW)
+    count = max(0, len(entries) - max(keep_raw, min_keep))
+    if max_age_days:
+        cutoff = (now or datetime.now()) - timedelta(days=max_age_days)
+        old = 0
+        for entry in entries:
+            when = _entry_time(entry)
+            if when is None or when >= cutoff:
+                break
+            old += 1
+        count = max(count, old)
+    count = max(0, min(count, len(entries) - min_keep))
+    # Don't split entries that share a timestamp (batch writes): the
+    # re-run guard in fold_entries compares timestamps
+    while 0 < count < len(entries) and entries[count - 1].get('timestamp') == entries[count].get('timestamp'):
+        count -= 1
+    return count
+
+
+# --- Compaction Run ---
+
+class _RunLock:
+    """Non-blocking cross-process lock so two compactions never overlap."""
+
+    def __init__(self, ltm_dir: str):
+        self.path = os.path.join(ltm_dir, LOCK_FILE)
+        self._file = None
+
+    def acquire(self) -> bool:
+        self._file = open(self.path, "a")
+        if fcntl is None:
+            return True
+        try:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            self._file.close()
+            self._file = None
+            return False
+
+    def release(self):
+        if self._file is not None:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+
+def compact(store, ltm_dir: str, keep_raw: int = None, max_age_days: float = None,
+            dry_run: bool = False) -> dict:
+    """
+    Folds old entries of every employee into aggregates.json, then drops
+    them from the store. Aggregates are saved before anything is dropped,
+    so an interrupted run loses nothing (and the next run won't double
+    count). Returns {"employees", "folded", "kept", "ms", "skipped"}.
+    """
+    keep_raw = config.LTM_KEEP_RAW if keep_raw is None else keep_raw
+    max_age_days = config.LTM_RAW_MAX_AGE_DAYS if max_age_days is None else max_age_days
+    started = time.perf_counter()
+
+    lock = _RunLock(ltm_dir)
+    if not lock.acquire():
+        logger.info("[Compaction] another compaction is running; skipped.")
+        return {"employees": 0, "folded": 0, "kept": 0, "ms": 0.0, "skipped": True}
+    try:
+        aggregates = load_aggregates(ltm_dir)
+        plan = {}
+        kept = 0
+        now = datetime.now()
+        for employee_id in store.employee_ids():
+            entries = store.read_employee(employee_id)
+            count = fold_count(entries, keep_raw, max_age_days, now)
+            kept += len(entries) - count
+            if count:
+                fold_entries(aggregates.setdefault(employee_id, _new_aggregate()), entries[:count])
+                plan[employee_id] = count
+
+        folded = sum(plan.values())
+        if plan and not dry_run:
+            save_aggregates(ltm_dir, aggregates)
+            # Appends only ever go to the end, so the planned prefixes are still the oldest entries
+            folded = sum(store.drop_oldest(employee_id, count) for employee_id, count in plan.items())
+            store.flush()
+
+        result = {
+            "employees": len(plan),
+            "folded": folded,
+            "kept": kept,
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+            "skipped": False,
+        }
+        logger.info("[Compaction] %s", result, extra={"compaction": result, "dry_run": dry_run})
+        return result
+    finally:
+        lock.release()
+
+
+class PeriodicJob:
+    """Background thread that calls `job` every `interval` seconds (compaction, snapshots)."""
+
+    def __init__(self, job, interval: float = None, name: str = "ltm-compaction"):
+        self.job = job
+        self.interval = interval or config.LTM_COMPACT_INTERVAL
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.job()
+            except Exception as e:
+                logger.exception("[%s] scheduled run failed: %s", self._thread.name, e)
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+
+def main(argv=None):
+    from agents.ltm_store import create_ltm_store
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("ltm_dir", help="agent LTM folder, e.g. LTM/WorkerAgent_BurnoutPrevention")
+    parser.add_argument("--keep", type=int, default=config.LTM_KEEP_RAW, help="raw entries kept per employee")
+    parser.add_argument("--max-age-days", type=float, default=config.LTM_RAW_MAX_AGE_DAYS,
+                        help="also fold raw entries older than this (0 = no limit)")
+    parser.add_argument("--dry-run", action="store_true", help="report what would be folded, change nothing")
+    args = parser.parse_args(argv)
+
+    store = create_ltm_store(args.ltm_dir)
+    try:
+        result = compact(store, args.ltm_dir, args.keep, args.max_age_days, args.dry_run)
+    finally:
+        store.close()
+    prefix = "Would fold" if args.dry_run else "Folded"
+    print(f"{prefix} {result['folded']} entries from {result['employees']} employees "
+          f"({result['kept']} raw entries kept) in {result['ms']} ms")
+    if result["folded"] and not args.dry_run:
+        print("Trend state will be rebuilt from the remaining LTM and the aggregates on next start.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+Compressed binary snapshots of agent memory for fast cold starts.
+
+Layout of LTM/<agent_id>/snapshot.bin:
+
+    MAGIC (8 bytes) | header length (uint32, little endian) | header | blocks
+
+The header is a zstd-compressed msgpack map:
+    {"version", "created", "window", "trend_window", "alpha",
+     "employees": {employee_id: [offset, length, log_size]}}
+and every employee has their own zstd-compressed msgpack block
+    {"recent": [latest entries], "trend": EmployeeTrend.to_dict()}
+so opening a snapshot only decodes the header, and one employee's memory
+is loaded (on their first request) without touching anyone else's.
+log_size is the employee's LTM log size when the block was written; a
+different size on disk means the block is stale and the log is read.
+"""
+import logging
+import os
+import struct
+import threading
+from datetime import datetime
+
+from agents import config, metrics
+from agents.trend_state import EmployeeTrend, TrendTracker
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"BPSNAP1\n"
+SNAPSHOT_VERSION = 1
+_HEADER_LEN = struct.Struct("<I")
+
+
+def available() -> bool:
+    """True if ormsgpack and zstandard can be imported."""
+    try:
+        import ormsgpack  # noqa: F401
+        import zstandard  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _settings() -> dict:
+    return {"window": config.HISTORY_WINDOW, "trend_window": config.TREND_WINDOW,
+            "alpha": config.TREND_EWMA_ALPHA}
+
+
+def encode_block(recent: list, trend: dict, level: int = None) -> bytes:
+    import ormsgpack
+    import zstandard
+    packed = ormsgpack.packb({"recent": recent, "trend": trend})
+    return zstandard.ZstdCompressor(level=level or config.LTM_SNAPSHOT_LEVEL).compress(packed)
+
+
+def write_snapshot(path: str, blocks, level: int = None) -> dict:
+    """
+    Writes a snapshot atomically. `blocks` yields
+    (employee_id, encoded_block, log_size); encoded blocks come from
+    encode_block() or SnapshotReader.raw_block() (copied unchanged).
+    Returns {"employees", "bytes"}.
+    """
+    import ormsgpack
+    import zstandard
+
+    index = {}
+    offset = 0
+    tmp_path = path + ".tmp"
+    with open(tmp_path + ".blocks", "wb") as body:
+        for employee_id, block, log_size in blocks:
+            body.write(block)
+            index[employee_id] = [offset, len(block), log_size]
+            offset += len(block)
+
+    header = dict(_settings(), version=SNAPSHOT_VERSION, created=datetime.now().isoformat(),
+                  employees=index)
+    header_bytes = zstandard.ZstdCompressor(level=level or config.LTM_SNAPSHOT_LEVEL).compress(
+        ormsgpack.packb(header))
+    try:
+        with open(tmp_path, "wb") as f, open(tmp_path + ".blocks", "rb") as body:
+            f.write(MAGIC)
+            f.write(_HEADER_LEN.pack(len(header_bytes)))
+            f.write(header_bytes)
+            while True:
+                chunk = body.read(1 << 20)
+                if not chunk:
+                    break
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        os.remove(tmp_path + ".blocks")
+    return {"employees": len(index), "bytes": len(MAGIC) + _HEADER_LEN.size + len(header_bytes) + offset}
+
+
+class SnapshotReader:
+    """
+    Opens a snapshot, decoding only its header; blocks are read on demand.
+    The file is reopened per read rather than held open, so a newer
+    snapshot can replace it at any time (on Windows too).
+    """
+
+    def __init__(self, path: str):
+        import ormsgpack
+        import zstandard
+        self._unpackb = ormsgpack.unpackb
+        self._decompressor = zstandard.ZstdDecompressor()
+        self.path = path
+        self._lock = threading.Lock()  # the decompressor is not thread-safe
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a memory snapshot")
+            (header_len,) = _HEADER_LEN.unpack(f.read(_HEADER_LEN.size))
+            self.header = self._unpackb(self._decompressor.decompress(f.read(header_len)))
+        self._data_start = len(MAGIC) + _HEADER_LEN.size + header_len
+        self._mtime = os.stat(path).st_mtime_ns
+        self.employees = self.header.get("employees", {})
+
+    def compatible(self) -> bool:
+        """False if the snapshot was written with other window / decay settings."""
+        return (self.header.get("version") == SNAPSHOT_VERSION
+                and all(self.header.get(k) == v for k, v in _settings().items()))
+
+    def log_size(self, employee_id: str):
+        meta = self.employees.get(employee_id)
+        return meta[2] if meta else None
+
+    def raw_block(self, employee_id: str) -> bytes:
+        """The employee's still-compressed block, or None."""
+        meta = self.employees.get(employee_id)
+        if meta is None:
+            return None
+        offset, length, _ = meta
+        with open(self.path, "rb") as f:
+            if os.fstat(f.fileno()).st_mtime_ns != self._mtime:
+                raise ValueError(f"{self.path} was replaced; reopen it")
+            f.seek(self._data_start + offset)
+            return f.read(length)
+
+    def load(self, employee_id: str) -> dict:
+        """Decodes one employee's block: {"recent": [...], "trend": {...}}, or None."""
+        block = self.raw_block(employee_id)
+        if block is None:
+            return None
+        with self._lock:
+            packed = self._decompressor.decompress(block)
+        return self._unpackb(packed)
+
+
+class SnapshotMemory:
+    """
+    Lazily fills a HistoryIndex and TrendTracker one employee at a time, on
+    their first request: from the snapshot block while it is fresh,
+    otherwise from their LTM log (plus compaction seeds). save() writes a
+    new snapshot, re-encoding only employees touched since the last one.
+    """
+
+    def __init__(self, store, path: str, index, tracker, seeds: dict = None):
+        self.store = store
+        self.path = path
+        self.index = index
+        self.tracker = tracker
+        self.seeds = seeds or {}
+        self._loaded = set()
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self.snapshot_hits = 0
+        self.log_loads = 0
+        self._reader = self._open_reader()
+
+    def _open_reader(self):
+        if not os.path.exists(self.path):
+            return None
+        try:
+            reader = SnapshotReader(self.path)
+        except Exception as e:
+            logger.warning("[Snapshot] ignoring unreadable %s: %s", self.path, e)
+            return None
+        if not reader.compatible():
+            logger.info("[Snapshot] %s was written with other settings; ignoring it.", self.path)
+            return None
+        return reader
+
+    def _lock_for(self, employee_id: str) -> threading.Lock:
+        with self._locks_lock:
+            lock = self._locks.get(employee_id)
+            if lock is None:
+                lock = self._locks[employee_id] = threading.Lock()
+            return lock
+
+    def _read(self, employee_id: str) -> tuple:
+        """Returns (recent, EmployeeTrend, log_size, from_snapshot) for one employee."""
+        # Size first: a write landing after this makes the result look stale, never fresh
+        size = self.store.log_size(employee_id)
+        reader = self._reader
+        if reader is not None and size and reader.log_size(employee_id) == size:
+            try:
+                block = reader.load(employee_id)
+                return block["recent"], EmployeeTrend.from_dict(block["trend"]), size, True
+            except Exception as e:
+                logger.debug("[Snapshot] block for %s unusable (%s); reading the log.", employee_id, e)
+
+        entries = self.store.read_employee(employee_id) if size else []
+        seed = self.seeds.get(employee_id)
+        folded = TrendTracker(window=self.tracker.window, alpha=self.tracker.alpha)
+        folded.build(entries, {employee_id: seed} if seed else None)
+        return entries[-self.index.window:], folded.get(employee_id), size, False
+
+    def ensure(self, employee_id: str):
+        """Loads the employee into the index and tracker if not done yet."""
+        employee_id = str(employee_id)
+        if employee_id in self._loaded:
+            return
+        with self._lock_for(employee_id):
+            if employee_id in self._loaded:
+                return
+            with metrics.LTM_DURATION.time(op="snapshot_load"):
+                recent, trend, _, from_snapshot = self._read(employee_id)
+            self.index.set_window(employee_id, recent)
+            self.tracker.set_trend(employee_id, trend)
+            if from_snapshot:
+                self.snapshot_hits += 1
+            else:
+                self.log_loads += 1
+            self._loaded.add(employee_id)
+
+    def reload_seeds(self, seeds: dict):
+        """New compaction seeds (only used for employees not loaded yet)."""
+        self.seeds = seeds or {}
+
+    def save(self, write_lock) -> dict:
+        """
+        Writes a new snapshot. `write_lock` is the lock the agent holds while
+        appending an entry and updating the index/tracker, so each loaded
+        employee's window, trend and log size are captured consistently.
+        """
+        if not self._save_lock.acquire(blocking=False):
+            return {"employees": 0, "bytes": 0, "skipped": True}
+        try:
+            reader = self._reader
+
+            def blocks():
+                for employee_id in self.store.employee_ids():
+                    if employee_id in self._loaded:
+                        with write_lock:
+                            size = self.store.log_size(employee_id)
+                            recent = self.index.recent(employee_id)
+                            trend = self.tracker.get(employee_id).to_dict()
+                        yield employee_id, encode_block(recent, trend), size
+                        continue
+                    size = self.store.log_size(employee_id)
+                    block = None
+                    if reader is not None and reader.log_size(employee_id) == size:
+                        try:
+                            block = reader.raw_block(employee_id)
+                        except (OSError, ValueError):
+                            block = None
+                    if block is None:
+                        recent, trend, size, _ = self._read(employee_id)
+                        block = encode_block(recent, trend.to_dict())
+                    yield employee_id, block, size
+
+            result = write_snapshot(self.path, blocks())
+            self._reader = self._open_reader()
+            result["skipped"] = False
+            return result
+        finally:
+            self._save_lock.release()
+
+    def stats(self) -> dict:
+        return {
+            "employees_loaded": len(self._loaded),
+            "snapshot_hits": self.snapshot_hits,
+            "log_loads": self.log_loads,
+            "snapshot_employees": len(self._reader.employees) if self._reader else 0,
+        }
@@ -0,0 +1,196 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+from agents import config
+from agents.ltm_store import entry_employee_id
+
+logger = logging.getLogger(__name__)
+
+# --- SQL (kept as constants so sqlite3's statement cache reuses them) ---
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ltm_entries (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    employee_id TEXT NOT NULL,
+    timestamp   TEXT NOT NULL,
+    entry       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ltm_employee_ts
+    ON ltm_entries (employee_id, timestamp, id);
+"""
+INSERT_ENTRY = "INSERT INTO ltm_entries (employee_id, timestamp, entry) VALUES (?, ?, ?)"
+SELECT_EMPLOYEE = "SELECT entry FROM ltm_entries WHERE employee_id = ? ORDER BY timestamp, id"
+SELECT_RECENT = (
+    "SELECT entry FROM ltm_entries WHERE employee_id = ? "
+    "ORDER BY timestamp DESC, id DESC LIMIT ?"
+)
+SELECT_EMPLOYEES = "SELECT DISTINCT employee_id FROM ltm_entries ORDER BY employee_id"
+COUNT_ENTRIES = "SELECT COUNT(*) FROM ltm_entries"
+DELETE_EMPLOYEE = "DELETE FROM ltm_entries WHERE employee_id = ?"
+DELETE_OLDEST = (
+    "DELETE FROM ltm_entries WHERE id IN ("
+    "SELECT id FROM ltm_entries WHERE employee_id = ? ORDER BY timestamp, id LIMIT ?)"
+)
+
+
+class SqliteLTMStore:
+    """
+    Long-Term Memory in a single SQLite database (WAL mode).
+
+    Safe to share between several worker processes on one host: SQLite's
+    locking serializes writers, readers never block, and each process opens
+    its own connection (re-opened automatically after a fork).
+    Same interface as JsonlLTMStore.
+    """
+
+    # Other processes write here too, so in-process caches can go stale
+    shared = True
+
+    def __init__(self, root: str, filename: str = None, busy_timeout: float = None):
+        self.root = root
+        self.path = os.path.join(root, filename or config.LTM_SQLITE_FILE)
+        self.busy_timeout = busy_timeout if busy_timeout is not None else config.LTM_SQLITE_BUSY_TIMEOUT
+        self._lock = threading.RLock()
+        self._conn_obj = None
+        self._pid = None
+        os.makedirs(self.root, exist_ok=True)
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per process; threads share it under self._lock."""
+        if self._conn_obj is None or self._pid != os.getpid():
+            conn = sqlite3.connect(
+                self.path,
+                timeout=self.busy_timeout,
+                check_same_thread=False,
+                isolation_level=None,  # explicit BEGIN/COMMIT below
+                cached_statements=64,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn_obj = conn
+            self._pid = os.getpid()
+        return self._conn_obj
+
+    # --- Writes ---
+
+    @staticmethod
+    def _row(entry: dict) -> tuple:
+        return (
+            entry_employee_id(entry),
+            str(entry.get('timestamp', '')),
+            json.dumps(entry, separators=(",", ":")),
+        )
+
+    def append(self, entry: dict):
+        with self._lock:
+            self._conn().execute(INSERT_ENTRY, self._row(entry))
+
+    def append_many(self, entries: list):
+        """Inserts all entries in one transaction."""
+        with self._lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(INSERT_ENTRY, [self._row(entry) for entry in entries])
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def drop_oldest(self, employee_id: str, count: int) -> int:
+        """Removes the employee's `count` oldest entries (used by compaction)."""
+        if count <= 0:
+            return 0
+        with self._lock:
+            return self._conn().execute(DELETE_OLDEST, (str(employee_id), count)).rowcount
+
+    def remove_employee(self, employee_id: str) -> int:
+        """Deletes all of the employee's entries (shard handoff). Returns how many."""
+        with self._lock:
+            return self._conn().execute(DELETE_EMPLOYEE, (str(employee_id),)).rowcount
+
+    def flush(self):
+        """Each statement already commits; WAL + synchronous=NORMAL handles durability."""
+
+    def close(self):
+        with self._lock:
+            if self._conn_obj is not None and self._pid == os.getpid():
+                self._conn_obj.close()
+            self._conn_obj = None
+
+    # --- Reads ---
+
+    def employee_ids(self) -> list:
+        with self._lock:
+            return [row[0] for row in self._conn().execute(SELECT_EMPLOYEES)]
+
+    def read_employee(self, employee_id: str) -> list:
+        with self._lock:
+            rows = self._conn().execute(SELECT_EMPLOYEE, (str(employee_id),)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def recent(self, employee_id: str, limit: int) -> list:
+        """Latest `limit` entries for one employee, oldest first (index lookup)."""
+        with self._lock:
+            rows = self._conn().execute(SELECT_RECENT, (str(employee_id), limit)).fetchall()
+        return [json.loads(row[0]) for row in reversed(rows)]
+
+    def iter_all(self):
+        for employee_id in self.employee_ids():
+            yield from self.read_employee(employee_id)
+
+    def read_all(self) -> list:
+        return list(self.iter_all())
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn().execute(COUNT_ENTRIES).fetchone()[0]
+
+    # --- One-time migration ---
+
+    def migrate_legacy(self, legacy_path: str) -> int:
+        """
+        Imports existing history into an empty database: the legacy
+        memory.json if present, otherwise the JSON-lines logs.
+        The emptiness check and the import share one IMMEDIATE transaction,
+        so when several workers start together exactly one imports and the
+        rest find the rows already there. A crash leaves the database empty
+        and the import simply runs again on the next start.
+        """
+        from agents.ltm_store import JsonlLTMStore
+
+        with self._lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute(COUNT_ENTRIES).fetchone()[0] > 0:
+                    conn.execute("ROLLBACK")
+                    return 0
+                try:
+                    with open(legacy_path, "r") as f:
+                        entries = json.load(f)
+                    source = legacy_path
+                except FileNotFoundError:
+                    # No memory.json (or another worker already migrated and renamed it)
+                    jsonl = JsonlLTMStore(self.root)
+                    entries = jsonl.read_all()
+                    source = jsonl.log_dir
+                if not entries:
+                    conn.execute("ROLLBACK")
+                    return 0
+                conn.executemany(INSERT_ENTRY, [self._row(entry) for entry in entries])
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+            if source == legacy_path:
+                try:
+                    os.replace(legacy_path, legacy_path + ".migrated")
+                except FileNotFoundError:
+                    pass  # renamed by another process meanwhile: already migrated
+            logger.info("[LTM] Migrated %d entries from %s into %s.", len(entries), source, self.path)
+            return len(entries)
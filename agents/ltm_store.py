@@ -0,0 +1,349 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import quote, unquote
+
+from agents import config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EMPLOYEE = "unknown_user"
+MIGRATION_MARKER = ".migrated_from_memory_json"
+
+
+def entry_employee_id(entry: dict) -> str:
+    """Returns the employee an LTM entry belongs to."""
+    employee_id = entry.get('input_data', {}).get('employee_id')
+    if employee_id in (None, ""):
+        return DEFAULT_EMPLOYEE
+    return str(employee_id)
+
+
+class JsonlLTMStore:
+    """
+    Append-only Long-Term Memory.
+
+    Every employee gets their own JSON-lines file under <root>/employees/.
+    A write is a single append of one line, so its cost does not depend on
+    how much history already exists. fsync is batched (every N records or
+    every T seconds; a background thread covers the T seconds when no
+    further write comes) and a torn trailing line left by a crash is
+    dropped the next time the file is opened.
+    """
+
+    # Only this process writes these files, so in-process caches stay valid
+    shared = False
+
+    def __init__(self, root: str, fsync_every: int = None, fsync_interval: float = None,
+                 max_open_files: int = None):
+        self.root = root
+        self.log_dir = os.path.join(root, "employees")
+        self.fsync_every = fsync_every or config.LTM_FSYNC_EVERY
+        self.fsync_interval = fsync_interval if fsync_interval is not None else config.LTM_FSYNC_INTERVAL
+        self.max_open_files = max_open_files or config.LTM_MAX_OPEN_FILES
+
+        self._lock = threading.RLock()
+        self._handles = OrderedDict()  # employee_id -> open file (LRU order)
+        self._dirty = set()
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._flusher = None  # (thread, stop event), started by the first write
+
+        os.makedirs(self.root, exist_ok=True)
+
+    # --- Paths ---
+
+    def _path(self, employee_id: str) -> str:
+        # quote() keeps the mapping reversible and filesystem-safe
+        return os.path.join(self.log_dir, quote(employee_id, safe="") + ".jsonl")
+
+    def employee_ids(self) -> list:
+        if not os.path.isdir(self.log_dir):
+            return []
+        return sorted(
+            unquote(name[:-len(".jsonl")])
+            for name in os.listdir(self.log_dir)
+            if name.endswith(".jsonl")
+        )
+
+    # --- Writes ---
+
+    def _recover(self, path: str):
+        """Truncates a partial last record left behind by a crash mid-write."""
+        size = os.path.getsize(path)
+        if size == 0:
+            return
+        with open(path, "rb+") as f:
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+            # Walk back to the last complete line
+            pos = size
+            chunk = 4096
+            while pos > 0:
+                start = max(0, pos - chunk)
+                f.seek(start)
+                block = f.read(pos - start)
+                idx = block.rfind(b"\n")
+                if idx != -1:
+                    f.truncate(start + idx + 1)
+                    break
+                pos = start
+            else:
+                f.truncate(0)
+            logger.warning("[LTM] Recovered torn record in %s", path)
+
+    def _handle(self, employee_id: str):
+        handle = self._handles.get(employee_id)
+        if handle is not None:
+            self._handles.move_to_end(employee_id)
+            return handle
+
+        os.makedirs(self.log_dir, exist_ok=True)
+        path = self._path(employee_id)
+        if os.path.exists(path):
+            self._recover(path)
+        # Unbuffered: one record == one write() call
+        handle = open(path, "ab", buffering=0)
+        self._handles[employee_id] = handle
+
+        while len(self._handles) > self.max_open_files:
+            old_id, old_handle = self._handles.popitem(last=False)
+            if old_id in self._dirty:
+                os.fsync(old_handle.fileno())
+                self._dirty.discard(old_id)
+            old_handle.close()
+        return handle
+
+    def _write(self, entry: dict):
+        employee_id = entry_employee_id(entry)
+        line = json.dumps(entry, separators=(",", ":")).encode("utf-8") + b"\n"
+        self._handle(employee_id).write(line)
+        self._dirty.add(employee_id)
+        self._pending += 1
+        if self._flusher is None and self.fsync_interval > 0:
+            self._start_flusher()
+
+    def _start_flusher(self):
+        stop = threading.Event()
+        thread = threading.Thread(target=self._flush_loop, args=(stop,), name="ltm-fsync", daemon=True)
+        self._flusher = (thread, stop)
+        thread.start()
+
+    def _flush_loop(self, stop: threading.Event):
+        """Syncs records still pending fsync_interval after the last sync, even if no write follows."""
+        while not stop.wait(self.fsync_interval):
+            with self._lock:
+                if not self._dirty or time.monotonic() - self._last_sync < self.fsync_interval:
+                    continue
+                try:
+                    self._sync()
+                except OSError as e:
+                    logger.warning("[LTM] background fsync failed: %s", e)
+
+    def _maybe_sync(self):
+        now = time.monotonic()
+        if self._pending >= self.fsync_every or now - self._last_sync >= self.fsync_interval:
+            self._sync()
+
+    def _sync(self):
+        for employee_id in self._dirty:
+            handle = self._handles.get(employee_id)
+            if handle is not None:
+                os.fsync(handle.fileno())
+        self._dirty.clear()
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def append(self, entry: dict):
+        """Appends one entry to its employee's log. O(1) in history size."""
+        with self._lock:
+            self._write(entry)
+            self._maybe_sync()
+
+    def append_many(self, entries: list):
+        """Appends several entries with a single fsync decision."""
+        with self._lock:
+            for entry in entries:
+                self._write(entry)
+            self._maybe_sync()
+
+    def flush(self):
+        """Forces every pending record to disk."""
+        with self._lock:
+            self._sync()
+
+    def close(self):
+        with self._lock:
+            if self._flusher is not None:
+                self._flusher[1].set()
+                self._flusher = None
+            self._sync()
+            for handle in self._handles.values():
+                handle.close()
+            self._handles.clear()
+
+    def drop_oldest(self, employee_id: str, count: int) -> int:
+        """
+        Removes the employee's `count` oldest entries (used by compaction).
+        The remaining lines are written to a temp file that replaces the log
+        with a rename. Returns how many entries were removed.
+        """
+        employee_id = str(employee_id)
+        with self._lock:
+            path = self._path(employee_id)
+            if count <= 0 or not os.path.exists(path):
+                return 0
+            handle = self._handles.pop(employee_id, None)
+            if handle is not None:
+                if employee_id in self._dirty:
+                    os.fsync(handle.fileno())
+                    self._dirty.discard(employee_id)
+                handle.close()
+            self._recover(path)
+
+            with open(path, "rb") as f:
+                lines = f.readlines()
+            # Count only lines that parse, matching what the readers return
+            cut = dropped = 0
+            for line in lines:
+                if dropped == count:
+                    break
+                cut += 1
+                try:
+                    json.loads(line)
+                    dropped += 1
+                except ValueError:
+                    continue
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.writelines(lines[cut:])
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+            return dropped
+
+    def remove_employee(self, employee_id: str) -> int:
+        """Deletes the employee's log (shard handoff). Returns how many entries it held."""
+        employee_id = str(employee_id)
+        with self._lock:
+            path = self._path(employee_id)
+            if not os.path.exists(path):
+                return 0
+            handle = self._handles.pop(employee_id, None)
+            if handle is not None:
+                handle.close()
+                self._dirty.discard(employee_id)
+            removed = len(self._read_path(path))
+            os.remove(path)
+            return removed
+
+    # --- Reads ---
+
+    def _read_path(self, path: str) -> list:
+        entries = []
+        if not os.path.exists(path):
+            return entries
+        with open(path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn tail, not yet recovered
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+        return entries
+
+    def read_employee(self, employee_id: str) -> list:
+        """Returns one employee's entries, oldest first."""
+        with self._lock:
+            return self._read_path(self._path(str(employee_id)))
+
+    def log_size(self, employee_id: str) -> int:
+        """Bytes in the employee's log (0 if none); changes on every write or compaction."""
+        with self._lock:
+            try:
+                return os.path.getsize(self._path(str(employee_id)))
+            except OSError:
+                return 0
+
+    def total_size(self) -> int:
+        """Bytes across every employee log; saved rollups are checked against it."""
+        with self._lock:
+            return sum(self.log_size(employee_id) for employee_id in self.employee_ids())
+
+    def recent(self, employee_id: str, limit: int) -> list:
+        """Latest `limit` entries for one employee, oldest first."""
+        return self.read_employee(employee_id)[-limit:]
+
+    def iter_all(self):
+        """Yields every entry one employee at a time (oldest first within each)."""
+        for employee_id in self.employee_ids():
+            yield from self.read_employee(employee_id)
+
+    def read_all(self) -> list:
+        """Returns every entry, grouped by employee (oldest first within each)."""
+        return list(self.iter_all())
+
+    # --- One-time migration from the legacy memory.json ---
+
+    def migrate_legacy(self, legacy_path: str) -> int:
+        """
+        Splits the old single-file memory.json into per-employee logs.
+        The new logs are built in a temp folder and swapped in with a rename,
+        so a crash part-way through never leaves half-imported history.
+        Returns the number of migrated entries.
+        """
+        if not os.path.exists(legacy_path):
+            return 0
+
+        with self._lock:
+            done_path = legacy_path + ".migrated"
+            if os.path.exists(os.path.join(self.log_dir, MIGRATION_MARKER)):
+                # Crashed between the two renames last time; finish the job
+                os.replace(legacy_path, done_path)
+                return 0
+            if os.path.isdir(self.log_dir):
+                logger.warning("[LTM] Skipping migration: %s already has data.", self.log_dir)
+                return 0
+
+            with open(legacy_path, "r") as f:
+                history = json.load(f)
+
+            tmp_dir = self.log_dir + ".tmp"
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir)
+
+            grouped = OrderedDict()
+            for entry in history:
+                grouped.setdefault(entry_employee_id(entry), []).append(entry)
+
+            for employee_id, entries in grouped.items():
+                path = os.path.join(tmp_dir, quote(employee_id, safe="") + ".jsonl")
+                with open(path, "wb") as f:
+                    for entry in entries:
+                        f.write(json.dumps(entry, separators=(",", ":")).encode("utf-8") + b"\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            with open(os.path.join(tmp_dir, MIGRATION_MARKER), "w") as f:
+                f.write(legacy_path)
+
+            os.replace(tmp_dir, self.log_dir)
+            os.replace(legacy_path, done_path)
+            logger.info("[LTM] Migrated %d entries from %s.", len(history), legacy_path)
+            return len(history)
+
+
+def create_ltm_store(root: str):
+    """Returns the LTM backend selected by BURNOUT_LTM_BACKEND."""
+    if config.LTM_BACKEND == "sqlite":
+        from agents.ltm_sqlite import SqliteLTMStore
+        return SqliteLTMStore(root)
+    if config.LTM_BACKEND != "jsonl":
+        logger.warning("[LTM] Unknown backend '%s', using jsonl.", config.LTM_BACKEND)
+    return JsonlLTMStore(root)
@@ -0,0 +1,332 @@
+import functools
+import inspect
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Latency buckets in milliseconds (Prometheus "le" bounds)
+DEFAULT_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+# Recent samples kept per series for live percentiles in /api/v1/status
+RESERVOIR_SIZE = 2048
+
+
+def _label_key(label_names: tuple, labels: dict) -> tuple:
+    return tuple(str(labels.get(name, "")) for name in label_names)
+
+
+def _format_labels(label_names: tuple, key: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in zip(label_names, key)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name, self.help, self.label_names = name, help_text, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def values(self) -> dict:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.values().items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    def set(self, value: float, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def render(self) -> list:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+def nearest_rank(count: int, pct: float) -> int:
+    """Index of the nearest-rank pct percentile among `count` sorted samples."""
+    # Multiplying first keeps pct * count exact, so whole ranks don't round up
+    return max(0, min(count - 1, math.ceil(pct * count / 100.0) - 1))
+
+
+def percentile(samples: list, pct: float) -> float:
+    """Nearest-rank percentile of a list of numbers (0 for an empty list)."""
+    if not samples:
+        return 0.0
+    return sorted(samples)[nearest_rank(len(samples), pct)]
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS_MS):
+        self.name, self.help, self.label_names = name, help_text, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # key -> [bucket_counts, sum, count, reservoir]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0, deque(maxlen=RESERVOIR_SIZE)]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+            series[3].append(value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observes the wrapped block's duration in milliseconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe((time.perf_counter() - start) * 1000, **labels)
+
+    def percentiles(self, pcts=(50, 95, 99)) -> dict:
+        """{label value(s): {"p50": .., "p95": .., "p99": .., "count": ..}} over recent samples."""
+        with self._lock:
+            snapshot = {key: (list(s[3]), s[2]) for key, s in self._series.items()}
+        out = {}
+        for key, (samples, count) in snapshot.items():
+            samples.sort()
+            stats = {"count": count}
+            for pct in pcts:
+                stats[f"p{pct}"] = round(samples[nearest_rank(len(samples), pct)], 3) if samples else 0.0
+            out["/".join(key) or "all"] = stats
+        return out
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: (list(s[0]), s[1], s[2]) for key, s in self._series.items()}
+        for key, (counts, total, count) in sorted(series.items()):
+            for bound, bucket_count in zip(self.buckets, counts):
+                labels = _format_labels(self.label_names, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+            labels = _format_labels(self.label_names, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {round(total, 3)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._callbacks = []  # (name, help, fn) -> fn() returns {stat: value}
+
+    def counter(self, name, help_text, labels=()):
+        metric = Counter(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name, help_text, labels=()):
+        metric = Gauge(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS_MS):
+        metric = Histogram(name, help_text, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_callback(self, name: str, help_text: str, fn):
+        """Exports fn()'s numeric stats as gauges {name}{stat="..."} at scrape time."""
+        self._callbacks.append((name, help_text, fn))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, help_text, fn in self._callbacks:
+            try:
+                stats = fn() or {}
+            except Exception:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for stat, value in sorted(stats.items()):
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f'{name}{{stat="{stat}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# --- Metric Definitions ---
+NODE_DURATION = REGISTRY.histogram(
+    "burnout_node_duration_ms", "Time spent in each LangGraph node.", ("node",))
+PATH_TOTAL = REGISTRY.counter(
+    "burnout_path_total", "Requests routed to the fast (template) or deep (LLM) path.", ("path",))
+LLM_CALLS = REGISTRY.counter(
+    "burnout_llm_calls_total", "LLM calls by outcome.", ("outcome",))
+LLM_DURATION = REGISTRY.histogram(
+    "burnout_llm_duration_ms", "Wall time of LLM calls.")
+LLM_TOKENS = REGISTRY.counter(
+    "burnout_llm_tokens_total", "LLM tokens used.", ("kind",))
+LLM_REQUEST_TOKENS = REGISTRY.histogram(
+    "burnout_llm_request_tokens", "Prompt and completion tokens per LLM-answered request.",
+    ("mode", "kind"), buckets=(25, 50, 100, 200, 400, 800, 1600, 3200, 6400))
+LLM_IN_FLIGHT = REGISTRY.gauge(
+    "burnout_llm_in_flight", "LLM calls currently waiting on the model.")
+LTM_DURATION = REGISTRY.histogram(
+    "burnout_ltm_duration_ms", "Long-Term Memory and vector-store operation latency.", ("op",))
+REQUEST_DURATION = REGISTRY.histogram(
+    "burnout_request_duration_ms", "HTTP request latency.", ("endpoint",))
+REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    "burnout_requests_in_flight", "HTTP requests currently being served.", ("endpoint",))
+ADMISSION_WAIT = REGISTRY.histogram(
+    "burnout_admission_wait_ms", "Time admitted tasks waited for a slot.", ("lane", "priority"))
+
+
+# --- Helpers ---
+
+def instrument_node(name: str, fn):
+    """Wraps a graph node (sync or async) so its duration lands in NODE_DURATION."""
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def timed_async(state):
+            with NODE_DURATION.time(node=name):
+                return await fn(state)
+        return timed_async
+
+    @functools.wraps(fn)
+    def timed(state):
+        with NODE_DURATION.time(node=name):
+            return fn(state)
+    return timed
+
+
+def record_token_usage(usage: dict):
+    """Adds a usage_metadata dict ({input_tokens, output_tokens}) to LLM_TOKENS."""
+    if not usage:
+        return
+    LLM_TOKENS.inc(usage.get("input_tokens", 0) or 0, kind="prompt")
+    LLM_TOKENS.inc(usage.get("output_tokens", 0) or 0, kind="completion")
+
+
+def _usages(response):
+    """usage_metadata of every generation in an LLMResult."""
+    for generations in response.generations:
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            usage = getattr(message, "usage_metadata", None)
+            if usage:
+                yield usage
+
+
+_llm_callback = None
+_token_counter_cls = None
+
+def llm_callbacks() -> list:
+    """LangChain callbacks that count LLM calls, latency, in-flight and tokens."""
+    global _llm_callback
+    if _llm_callback is None:
+        from langchain_core.callbacks import BaseCallbackHandler
+
+        class LLMMetricsCallback(BaseCallbackHandler):
+            def __init__(self):
+                self._starts = {}
+
+            def _start(self, run_id):
+                self._starts[run_id] = time.perf_counter()
+                LLM_IN_FLIGHT.inc()
+
+            def _finish(self, run_id, outcome):
+                start = self._starts.pop(run_id, None)
+                LLM_CALLS.inc(outcome=outcome)
+                if start is not None:
+                    LLM_IN_FLIGHT.dec()
+                    LLM_DURATION.observe((time.perf_counter() - start) * 1000)
+
+            def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+                self._start(run_id)
+
+            def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+                self._start(run_id)
+
+            def on_llm_end(self, response, *, run_id, **kwargs):
+                self._finish(run_id, "success")
+                for usage in _usages(response):
+                    record_token_usage(usage)
+
+            def on_llm_error(self, error, *, run_id, **kwargs):
+                self._finish(run_id, "error")
+
+        _llm_callback = LLMMetricsCallback()
+    return [_llm_callback]
+
+
+def token_counter():
+    """
+    A fresh LangChain callback that sums the token usage of the calls it
+    is passed to (one request, hedged calls included): .prompt_tokens,
+    .completion_tokens.
+    """
+    global _token_counter_cls
+    if _token_counter_cls is None:
+        from langchain_core.callbacks import BaseCallbackHandler
+
+        class TokenCounter(BaseCallbackHandler):
+            def __init__(self):
+                self.prompt_tokens = 0
+                self.completion_tokens = 0
+                self._lock = threading.Lock()
+
+            def on_llm_end(self, response, **kwargs):
+                for usage in _usages(response):
+                    with self._lock:
+                        self.prompt_tokens += usage.get("input_tokens", 0) or 0
+                        self.completion_tokens += usage.get("output_tokens", 0) or 0
+
+        _token_counter_cls = TokenCounter
+    return _token_counter_cls()
+
+
+def status_snapshot() -> dict:
+    """Live numbers for /api/v1/status."""
+    paths = PATH_TOTAL.values()
+    fast = paths.get(("fast",), 0)
+    deep = paths.get(("deep",), 0)
+    return {
+        "latency_ms": REQUEST_DURATION.percentiles(),
+        "node_latency_ms": NODE_DURATION.percentiles(),
+        "llm_latency_ms": LLM_DURATION.percentiles(),
+        "ltm_latency_ms": LTM_DURATION.percentiles(),
+        "llm_tokens_per_request": LLM_REQUEST_TOKENS.percentiles(),
+        "admission_wait_ms": ADMISSION_WAIT.percentiles(),
+        "in_flight": {
+            "requests": {"/".join(k): v for k, v in REQUESTS_IN_FLIGHT.values().items()},
+            "llm_calls": LLM_IN_FLIGHT.values().get((), 0),
+        },
+        "paths": {"fast": fast, "deep": deep,
+                  "deep_ratio": round(deep / (fast + deep), 4) if fast + deep else 0.0},
+    }
@@ -0,0 +1,280 @@
+import asyncio
+import atexit
+import copy
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from agents import config
+from agents.ltm_compaction import PeriodicJob
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """One in-progress computation that concurrent callers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ResponseCache:
+    """
+    Bounded LRU + TTL cache for deep-path LLM responses.
+
+    Keys are the normalized (risk, sorted factors) pair. Each key holds up to
+    `max_variants` different responses; until it is full, a lookup asks the
+    LLM for one more variant, afterwards lookups pick a random stored one.
+    Concurrent misses for the same key share a single in-flight call.
+    With persist_path set, the cache is saved every LLM_CACHE_SAVE_INTERVAL
+    seconds from a background thread and at exit, never on a request.
+    """
+
+    def __init__(self, max_entries: int = None, ttl: float = None, max_variants: int = None,
+                 persist_path: str = None, enabled: bool = None):
+        self.max_entries = max_entries or config.LLM_CACHE_MAX_ENTRIES
+        self.ttl = ttl if ttl is not None else config.LLM_CACHE_TTL
+        self.max_variants = max(1, max_variants or config.LLM_CACHE_VARIANTS)
+        self.persist_path = persist_path if persist_path is not None else config.LLM_CACHE_PATH
+        self.enabled = config.LLM_CACHE_ENABLED if enabled is None else enabled
+
+        self._entries = OrderedDict()  # key -> {"variants": [...], "expires": epoch}
+        self._inflight = {}
+        self._ainflight = {}  # async twin of _inflight (asyncio futures)
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._save_job = None
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+        if self.persist_path:
+            self.load()
+            if config.LLM_CACHE_SAVE_INTERVAL > 0:
+                self._save_job = PeriodicJob(self.save, config.LLM_CACHE_SAVE_INTERVAL,
+                                             name="llm-cache-save").start()
+            atexit.register(self.save)
+
+    @staticmethod
+    def make_key(risk: str, factors) -> str:
+        return f"{risk}|{','.join(sorted(set(factors)))}"
+
+    # --- Lookup ---
+
+    def _lookup(self, key: str, now: float):
+        """Returns (variants, needs_fill). Caller must hold the lock."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, True
+        if entry["expires"] <= now:
+            del self._entries[key]
+            return None, True
+        self._entries.move_to_end(key)
+        return entry["variants"], len(entry["variants"]) < self.max_variants
+
+    def lookup(self, risk: str, factors):
+        """
+        Returns a cached response when the key needs no more variants, else
+        None (the caller should compute one and put() it). Used by the
+        streaming path, which can't share a single in-flight result.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            variants, needs_fill = self._lookup(self.make_key(risk, factors), time.time())
+            if variants and not needs_fill:
+                self.hits += 1
+                return copy.deepcopy(random.choice(variants))
+            self.misses += 1
+            return None
+
+    def get_or_compute(self, risk: str, factors, compute, lead: bool = True):
+        """
+        Returns a cached response for (risk, factors), calling compute() on a
+        miss. A caller that can't reach the LLM (lead=False: degraded, or too
+        little budget left) takes any stored variant, and on a miss runs
+        compute() alone, so others never wait on or inherit its failure.
+        """
+        if not self.enabled:
+            return compute()
+
+        key = self.make_key(risk, factors)
+        with self._lock:
+            variants, needs_fill = self._lookup(key, time.time())
+            flight = self._inflight.get(key)
+            if variants and (not needs_fill or flight is not None or not lead):
+                # Full entry, someone is already adding a variant, or this caller can't: serve what we have
+                self.hits += 1
+                return copy.deepcopy(random.choice(variants))
+            if not lead:
+                self.misses += 1
+                flight = None
+            elif flight is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                self.misses += 1
+                flight = self._inflight[key] = _Flight()
+                leader = True
+
+        if flight is None:
+            result = compute()
+            self.put(key, result)
+            return copy.deepcopy(result)
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return copy.deepcopy(flight.result)
+
+        try:
+            flight.result = compute()
+            self.put(key, flight.result)
+            return copy.deepcopy(flight.result)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    async def aget_or_compute(self, risk: str, factors, acompute, lead: bool = True):
+        """Async get_or_compute: acompute() returns an awaitable."""
+        if not self.enabled:
+            return await acompute()
+
+        key = self.make_key(risk, factors)
+        with self._lock:
+            variants, needs_fill = self._lookup(key, time.time())
+            future = self._ainflight.get(key)
+            if variants and (not needs_fill or future is not None or not lead):
+                self.hits += 1
+                return copy.deepcopy(random.choice(variants))
+            if not lead:
+                self.misses += 1
+                future = None
+            elif future is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                self.misses += 1
+                future = self._ainflight[key] = asyncio.get_running_loop().create_future()
+                leader = True
+
+        if future is None:
+            result = await acompute()
+            self.put(key, result)
+            return copy.deepcopy(result)
+        if not leader:
+            return copy.deepcopy(await asyncio.shield(future))
+
+        try:
+            result = await acompute()
+            self.put(key, result)
+            future.set_result(result)
+            return copy.deepcopy(result)
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody was waiting
+            raise
+        finally:
+            with self._lock:
+                self._ainflight.pop(key, None)
+
+    # --- Storage ---
+
+    def put(self, key: str, value: dict):
+        with self._lock:
+            now = time.time()
+            entry = self._entries.get(key)
+            if entry is None or entry["expires"] <= now:
+                entry = {"variants": [], "expires": now + self.ttl}
+                self._entries[key] = entry
+            if value not in entry["variants"] and len(entry["variants"]) < self.max_variants:
+                # Stored apart from the caller's dict, which it may still change
+                entry["variants"].append(copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._dirty = True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._dirty = True
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "variants": sum(len(e["variants"]) for e in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    # --- Persistence ---
+
+    def save(self):
+        """Writes the cache to persist_path atomically, if it changed. Concurrent callers skip."""
+        if not self.persist_path or not self._save_lock.acquire(blocking=False):
+            return
+        try:
+            with self._lock:
+                if not self._dirty:
+                    return
+                data = json.dumps(self._entries)
+                self._dirty = False
+            directory = os.path.dirname(self.persist_path) or "."
+            try:
+                os.makedirs(directory, exist_ok=True)
+                # A temp name of its own, so another process saving the same file can't clobber it
+                fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(self.persist_path) + ".",
+                                                suffix=".tmp", dir=directory)
+                try:
+                    with os.fdopen(fd, "w") as f:
+                        f.write(data)
+                    os.replace(tmp_path, self.persist_path)
+                except BaseException:
+                    os.unlink(tmp_path)
+                    raise
+            except OSError as e:
+                with self._lock:
+                    self._dirty = True
+                logger.warning("[ResponseCache] could not save cache: %s", e)
+        finally:
+            self._save_lock.release()
+
+    def load(self):
+        if not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("[ResponseCache] could not load cache: %s", e)
+            return
+        now = time.time()
+        with self._lock:
+            for key, entry in data.items():
+                if entry.get("expires", 0) > now and entry.get("variants"):
+                    self._entries[key] = {
+                        "variants": entry["variants"][:self.max_variants],
+                        "expires": entry["expires"],
+                    }
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
@@ -0,0 +1,421 @@
+"""
+Team and organization risk rollups.
+
+Materialized counts of risk levels, trend cases and key factors, per team
+(the optional team_id task parameter; "unassigned" without one) and for
+the whole organization, each as a running total plus one entry per time
+bucket (BURNOUT_ROLLUP_BUCKET: hour, day, week or month; only the newest
+BURNOUT_ROLLUP_MAX_BUCKETS are kept). Every LTM write updates them in
+O(factors), so reading a rollup never touches history.
+
+Rebuild from an existing LTM folder (agent stopped) with:
+    python -m agents.rollups LTM/WorkerAgent_BurnoutPrevention
+
+A rebuild only sees raw LTM entries: history already folded away by
+compaction stays in rollups maintained incrementally, but not in a rebuild.
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+from agents import config
+from agents.ltm_compaction import PeriodicJob
+
+logger = logging.getLogger(__name__)
+
+ROLLUPS_VERSION = 1
+UNASSIGNED_TEAM = "unassigned"
+BUCKET_SIZES = ("hour", "day", "week", "month")
+
+
+def entry_team_id(entry: dict) -> str:
+    team_id = entry.get('input_data', {}).get('team_id')
+    return str(team_id) if team_id not in (None, "") else UNASSIGNED_TEAM
+
+
+def bucket_key(timestamp, size: str = None) -> str:
+    """Bucket label for an ISO timestamp: 2026-10-16T09 / 2026-10-16 / 2026-W42 / 2026-10."""
+    size = size or config.ROLLUP_BUCKET
+    timestamp = str(timestamp or "")
+    if size == "hour":
+        return timestamp[:13]
+    if size == "month":
+        return timestamp[:7]
+    if size == "week":
+        try:
+            year, week, _ = datetime.fromisoformat(timestamp).isocalendar()
+        except ValueError:
+            return ""
+        return f"{year}-W{week:02d}"
+    return timestamp[:10]
+
+
+def _new_counts() -> dict:
+    return {"count": 0, "risk_counts": {}, "trend_count": 0, "factor_counts": {}}
+
+
+def _add(counts: dict, risk: str, is_trend: bool, factors):
+    counts["count"] += 1
+    counts["risk_counts"][risk] = counts["risk_counts"].get(risk, 0) + 1
+    if is_trend:
+        counts["trend_count"] += 1
+    for factor in factors:
+        counts["factor_counts"][factor] = counts["factor_counts"].get(factor, 0) + 1
+
+
+def _merge_counts(counts: dict, other: dict):
+    counts["count"] += other["count"]
+    counts["trend_count"] += other["trend_count"]
+    for field in ("risk_counts", "factor_counts"):
+        for key, n in other[field].items():
+            counts[field][key] = counts[field].get(key, 0) + n
+
+
+def _new_rollup() -> dict:
+    return {"total": _new_counts(), "buckets": {}}
+
+
+def _merge_rollup(rollup: dict, other: dict):
+    _merge_counts(rollup["total"], other["total"])
+    for key, counts in other["buckets"].items():
+        _merge_counts(rollup["buckets"].setdefault(key, _new_counts()), counts)
+
+
+def _with_distribution(counts: dict) -> dict:
+    out = copy.deepcopy(counts)
+    total = counts["count"]
+    out["risk_distribution"] = {
+        risk: round(n / total, 4) for risk, n in counts["risk_counts"].items()} if total else {}
+    return out
+
+
+class RollupStore:
+    """
+    team_id -> {"total", "buckets"} plus the same for the whole org, kept in
+    memory and saved as JSON. After start_autosave() it is saved every
+    ROLLUP_SAVE_INTERVAL seconds from a background thread and at exit, never
+    on a write. Like trend_state.json, only valid for a store this process
+    writes alone. With `ltm_size` (a callable returning the LTM's total log
+    size) the file records that size, and load() refuses a file whose LTM
+    has changed since, e.g. writes after the last save before a crash.
+    """
+
+    def __init__(self, path: str = None, bucket: str = None, max_buckets: int = None,
+                 save_interval: float = None, ltm_size=None):
+        self.path = path
+        self.ltm_size = ltm_size
+        self.bucket = bucket or config.ROLLUP_BUCKET
+        if self.bucket not in BUCKET_SIZES:
+            raise ValueError(f"rollup bucket must be one of {BUCKET_SIZES}, not {self.bucket!r}")
+        self.max_buckets = max_buckets or config.ROLLUP_MAX_BUCKETS
+        self.save_interval = config.ROLLUP_SAVE_INTERVAL if save_interval is None else save_interval
+
+        self._teams = {}
+        self._org = _new_rollup()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._save_job = None
+        self.entries = 0
+
+    # --- Updates ---
+
+    def _trim(self, rollup: dict):
+        buckets = rollup["buckets"]
+        while len(buckets) > self.max_buckets:
+            del buckets[min(buckets)]
+
+    def update(self, entry: dict):
+        """Folds one LTM entry into its team's and the org's rollups."""
+        response = entry.get('final_response', {})
+        risk = response.get('risk_level', 'unknown')
+        is_trend = bool(response.get('is_trend'))
+        factors = response.get('key_factors', [])
+        team_id = entry_team_id(entry)
+        key = bucket_key(entry.get('timestamp'), self.bucket)
+        with self._lock:
+            team = self._teams.get(team_id)
+            if team is None:
+                team = self._teams[team_id] = _new_rollup()
+            for rollup in (team, self._org):
+                _add(rollup["total"], risk, is_trend, factors)
+                bucket = rollup["buckets"].get(key)
+                if bucket is None:
+                    bucket = rollup["buckets"][key] = _new_counts()
+                    self._trim(rollup)
+                _add(bucket, risk, is_trend, factors)
+            self.entries += 1
+            self._dirty = True
+
+    def update_many(self, entries):
+        for entry in entries:
+            self.update(entry)
+
+    def build(self, entries):
+        """(Re)builds every rollup from LTM entries in one vectorized pass."""
+        teams, org, count = build_rollups(entries, self.bucket, self.max_buckets)
+        with self._lock:
+            self._teams = teams
+            self._org = org
+            self.entries = count
+            self._dirty = True
+
+    def merge(self, other: "RollupStore"):
+        """Adds another store's counts to this one (shards being folded together)."""
+        with other._lock:
+            teams = copy.deepcopy(other._teams)
+            org = copy.deepcopy(other._org)
+            entries = other.entries
+        with self._lock:
+            for team_id, rollup in teams.items():
+                _merge_rollup(self._teams.setdefault(team_id, _new_rollup()), rollup)
+            _merge_rollup(self._org, org)
+            for rollup in [self._org, *self._teams.values()]:
+                self._trim(rollup)
+            self.entries += entries
+            self._dirty = True
+
+    # --- Reads ---
+
+    def get(self, team_id: str = None, buckets: int = None) -> dict:
+        """
+        One team's rollup (or the org's when team_id is None), with the
+        newest `buckets` time buckets (all kept ones by default). None for
+        an unknown team.
+        """
+        with self._lock:
+            rollup = self._org if team_id is None else self._teams.get(str(team_id))
+            if rollup is None:
+                return None
+            keys = sorted(rollup["buckets"])
+            if buckets is not None:
+                keys = keys[-buckets:] if buckets > 0 else []
+            out = {
+                "team_id": team_id,
+                "bucket_size": self.bucket,
+                "total": _with_distribution(rollup["total"]),
+                "buckets": [dict(_with_distribution(rollup["buckets"][k]), bucket=k) for k in keys],
+            }
+            if team_id is None:
+                out["teams"] = sorted(self._teams)
+            return out
+
+    def team_ids(self) -> list:
+        with self._lock:
+            return sorted(self._teams)
+
+    def __len__(self):
+        return len(self._teams)
+
+    # --- Persistence ---
+
+    def start_autosave(self):
+        """Saves every save_interval seconds from a background thread, and at exit."""
+        if self.path and self._save_job is None:
+            if self.save_interval > 0:
+                self._save_job = PeriodicJob(self.save, self.save_interval, name="rollups-save").start()
+            atexit.register(self.save)
+        return self
+
+    def close(self):
+        """Stops the background save and writes any pending changes."""
+        if self._save_job is not None:
+            self._save_job.stop()
+            self._save_job = None
+        self.save()
+
+    def save(self, force: bool = False):
+        """Writes the rollups to `path` atomically (unchanged ones only with force). Concurrent callers skip."""
+        if not self.path or not self._save_lock.acquire(blocking=False):
+            return
+        try:
+            with self._lock:
+                if not self._dirty and not force:
+                    return
+                # Measured under the lock: a write not counted yet can only make it look stale
+                data = json.dumps({
+                    "version": ROLLUPS_VERSION,
+                    "bucket": self.bucket,
+                    "ltm_size": self.ltm_size() if self.ltm_size else None,
+                    "entries": self.entries,
+                    "org": self._org,
+                    "teams": self._teams,
+                }, separators=(",", ":"))
+                self._dirty = False
+            tmp_path = self.path + ".tmp"
+            try:
+                with open(tmp_path, "w") as f:
+                    f.write(data)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logger.warning("[Rollups] could not save %s: %s", self.path, e)
+        finally:
+            self._save_lock.release()
+
+    def load(self) -> bool:
+        """Loads saved rollups; False when there are none, they use another bucket size or the LTM changed since."""
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("[Rollups] could not load %s: %s", self.path, e)
+            return False
+        if data.get("version") != ROLLUPS_VERSION or data.get("bucket") != self.bucket:
+            logger.info("[Rollups] %s was built with other settings; rebuilding.", self.path)
+            return False
+        # Files from before ltm_size was recorded are trusted as they are
+        saved_size = data.get("ltm_size")
+        if self.ltm_size and saved_size is not None and saved_size != self.ltm_size():
+            logger.info("[Rollups] %s is older than the LTM; rebuilding.", self.path)
+            return False
+        with self._lock:
+            self._teams = data.get("teams", {})
+            self._org = data.get("org") or _new_rollup()
+            for rollup in [self._org, *self._teams.values()]:
+                self._trim(rollup)
+            self.entries = data.get("entries", 0)
+            self._dirty = False
+        return True
+
+
+def merge_views(views: list, buckets: int = None) -> dict:
+    """Sums get() results from several shards into one (None if no shard knows the team)."""
+    views = [view for view in views if view is not None]
+    if not views:
+        return None
+    total = _new_counts()
+    merged = {}
+    for view in views:
+        _merge_counts(total, view["total"])
+        for bucket in view["buckets"]:
+            _merge_counts(merged.setdefault(bucket["bucket"], _new_counts()), bucket)
+    keys = sorted(merged)
+    if buckets is not None:
+        keys = keys[-buckets:] if buckets > 0 else []
+    out = {
+        "team_id": views[0]["team_id"],
+        "bucket_size": views[0]["bucket_size"],
+        "total": _with_distribution(total),
+        "buckets": [dict(_with_distribution(merged[k]), bucket=k) for k in keys],
+    }
+    if out["team_id"] is None:
+        out["teams"] = sorted({team for view in views for team in view.get("teams", [])})
+    return out
+
+
+# --- Vectorized Rebuild ---
+
+def _group_counts(np, keys, risk_idx, n_risks, trend, factor_rows, factor_idx, n_factors):
+    """Per unique key: (unique keys, risk count matrix, trend counts, factor count matrix)."""
+    unique, inverse = np.unique(keys, return_inverse=True)
+    groups = len(unique)
+    risks = np.bincount(inverse * n_risks + risk_idx, minlength=groups * n_risks).reshape(groups, n_risks)
+    trends = np.bincount(inverse, weights=trend, minlength=groups)
+    factors = np.bincount(inverse[factor_rows] * n_factors + factor_idx,
+                          minlength=groups * n_factors).reshape(groups, n_factors)
+    return unique, risks, trends, factors
+
+
+def _counts_from(risk_row, trend_count, factor_row, risk_names, factor_names) -> dict:
+    return {
+        "count": int(risk_row.sum()),
+        "risk_counts": {risk_names[i]: int(n) for i, n in enumerate(risk_row) if n},
+        "trend_count": int(trend_count),
+        "factor_counts": {factor_names[i]: int(n) for i, n in enumerate(factor_row) if n},
+    }
+
+
+def build_rollups(entries, bucket: str = None, max_buckets: int = None) -> tuple:
+    """
+    Reads entries once into columns, then counts every (team, bucket),
+    team, bucket and org group with NumPy bincounts instead of a dict
+    update per entry. Returns (teams, org, entry_count).
+    """
+    import numpy as np
+
+    bucket = bucket or config.ROLLUP_BUCKET
+    max_buckets = max_buckets or config.ROLLUP_MAX_BUCKETS
+    teams, buckets, risks, trend, factor_rows, factors = [], [], [], [], [], []
+    for row, entry in enumerate(entries):
+        response = entry.get('final_response', {})
+        teams.append(entry_team_id(entry))
+        buckets.append(bucket_key(entry.get('timestamp'), bucket))
+        risks.append(str(response.get('risk_level', 'unknown')))
+        trend.append(bool(response.get('is_trend')))
+        for factor in response.get('key_factors', []):
+            factor_rows.append(row)
+            factors.append(str(factor))
+
+    org = _new_rollup()
+    if not teams:
+        return {}, org, 0
+
+    team_names, team_idx = np.unique(np.array(teams), return_inverse=True)
+    bucket_names, bucket_idx = np.unique(np.array(buckets), return_inverse=True)
+    risk_names, risk_idx = np.unique(np.array(risks), return_inverse=True)
+    trend = np.array(trend, dtype=float)
+    factor_rows = np.array(factor_rows, dtype=np.int64)
+    if factors:
+        factor_names, factor_idx = np.unique(np.array(factors), return_inverse=True)
+    else:
+        factor_names, factor_idx = np.array([], dtype=str), np.zeros(0, dtype=np.int64)
+    n_buckets, n_risks, n_factors = len(bucket_names), len(risk_names), max(1, len(factor_names))
+    risk_names, factor_names = risk_names.tolist(), factor_names.tolist()
+
+    def grouped(keys):
+        return _group_counts(np, keys, risk_idx, n_risks, trend, factor_rows, factor_idx, n_factors)
+
+    def counts(risks_m, trends_v, factors_m, i):
+        return _counts_from(risks_m[i], trends_v[i], factors_m[i], risk_names, factor_names)
+
+    # Only the newest max_buckets buckets survive, per team and for the org
+    result = {name: _new_rollup() for name in team_names.tolist()}
+    keys, r, t, f = grouped(team_idx)
+    for i, key in enumerate(keys.tolist()):
+        result[team_names[key]]["total"] = counts(r, t, f, i)
+    keys, r, t, f = grouped(team_idx.astype(np.int64) * n_buckets + bucket_idx)
+    for i, key in enumerate(keys.tolist()):
+        team, key_bucket = divmod(key, n_buckets)
+        result[team_names[team]]["buckets"][bucket_names[key_bucket]] = counts(r, t, f, i)
+
+    org["total"] = counts(*grouped(np.zeros(len(teams), dtype=np.int64))[1:], 0)
+    keys, r, t, f = grouped(bucket_idx)
+    for i, key in enumerate(keys.tolist()):
+        org["buckets"][bucket_names[key]] = counts(r, t, f, i)
+
+    for rollup in [org, *result.values()]:
+        for key in sorted(rollup["buckets"])[:-max_buckets]:
+            del rollup["buckets"][key]
+    return result, org, len(teams)
+
+
+def rebuild(ltm_dir: str) -> RollupStore:
+    """Rebuilds and saves <ltm_dir>/rollups.json from the LTM in that folder."""
+    from agents.ltm_store import create_ltm_store
+    store = create_ltm_store(ltm_dir)
+    try:
+        rollups = RollupStore(os.path.join(ltm_dir, config.ROLLUP_FILE),
+                              ltm_size=None if store.shared else store.total_size)
+        rollups.build(store.iter_all())
+        rollups.save()
+        return rollups
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit(2)
+    started = time.perf_counter()
+    result = rebuild(sys.argv[1])
+    print(f"Rebuilt rollups for {len(result)} teams from {result.entries} entries "
+          f"in {(time.perf_counter() - started) * 1000:.1f} ms -> {result.path}")
@@ -0,0 +1,769 @@
+"""
+Employee-sharded worker pool.
+
+With BURNOUT_SHARDS=N (or -1 for one per CPU) app.py starts N worker
+processes, each running its own BurnoutPreventionAgent over its own
+partition: LTM under LTM/<agent>/shards/<k>/, vectors under
+<chroma_path>/shard-<k>, logs in agent.shard-<k>.log. A ShardRouter in the
+web process hashes employee_id onto a consistent-hash ring and forwards
+each request to the owning worker, so an employee's history stays hot in
+one process and no file is ever shared between processes.
+
+Changing the shard count moves only the employees whose owner changed.
+That happens automatically when the router starts with a new count, or
+by hand (agent stopped) with:
+    python -m agents.sharding rebalance --shards 8
+
+Team/org rollups and find_cases without an employee are merged across all
+shards; similar-case search only sees the owning shard's vectors.
+"""
+import argparse
+import asyncio
+import atexit
+import bisect
+import contextvars
+import functools
+import hashlib
+import itertools
+import json
+import logging
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Client, Listener
+
+from agents import config, llm_guard, ltm_compaction, metrics
+from agents.Abstract_Class_Worker_Agent import AbstractWorkerAgent
+from agents.idempotency import IdempotencyStore
+from agents.ltm_store import DEFAULT_EMPLOYEE, create_ltm_store, entry_employee_id
+from agents.rollups import RollupStore, merge_views
+from agents.transport import TransportFull, get_transport
+
+logger = logging.getLogger(__name__)
+
+LAYOUT_FILE = "layout.json"
+AUTHKEY_ENV = "BURNOUT_SHARD_AUTHKEY"
+
+SHARD_REQUESTS = metrics.REGISTRY.counter(
+    "burnout_shard_requests_total", "Requests forwarded to shard workers.", ("shard", "method"))
+
+
+class ShardError(RuntimeError):
+    """A shard worker raised while handling a request."""
+
+
+def shard_count(shards: int = None) -> int:
+    """BURNOUT_SHARDS resolved: -1 means one per CPU."""
+    shards = config.SHARDS if shards is None else shards
+    return (os.cpu_count() or 1) if shards < 0 else shards
+
+
+# --- Consistent Hashing ---
+
+def _hash(key: str) -> int:
+    try:
+        import xxhash
+        return xxhash.xxh64_intdigest(key.encode("utf-8"))
+    except ImportError:
+        return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    `vnodes` points per shard on a 64-bit ring; an employee belongs to the
+    first point at or after its hash. Going from N to N+1 shards moves
+    about 1/(N+1) of the employees, all of them to the new shard.
+    """
+
+    def __init__(self, shards: int, vnodes: int = None):
+        if shards < 1:
+            raise ValueError("a hash ring needs at least one shard")
+        self.shards = shards
+        self.vnodes = vnodes or config.SHARD_VNODES
+        points = sorted((_hash(f"{shard}#{v}"), shard) for shard in range(shards) for v in range(self.vnodes))
+        self._keys = [point for point, _ in points]
+        self._owners = [shard for _, shard in points]
+
+    def shard_for(self, employee_id) -> int:
+        employee_id = DEFAULT_EMPLOYEE if employee_id is None else str(employee_id)
+        i = bisect.bisect_left(self._keys, _hash(employee_id))
+        return self._owners[i % len(self._owners)]
+
+
+# --- Layout ---
+
+def shards_root(root: str) -> str:
+    return os.path.join(root, "shards")
+
+
+def shard_dir(root: str, shard: int) -> str:
+    return os.path.join(shards_root(root), str(shard))
+
+
+def shard_chroma_path(chroma_path: str, shard: int) -> str:
+    return os.path.join(chroma_path, f"shard-{shard}")
+
+
+def shard_log_file(shard: int) -> str:
+    base, ext = os.path.splitext(config.LOG_FILE)
+    return f"{base}.shard-{shard}{ext or '.log'}"
+
+
+def load_layout(root: str) -> dict:
+    """{"shards", "vnodes"} the partitions under root were written with, or None."""
+    path = os.path.join(shards_root(root), LAYOUT_FILE)
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning("[Sharding] could not read %s: %s", path, e)
+        return None
+
+
+def save_layout(root: str, shards: int, vnodes: int):
+    path = os.path.join(shards_root(root), LAYOUT_FILE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"shards": shards, "vnodes": vnodes}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def existing_shards(root: str) -> list:
+    base = shards_root(root)
+    if not os.path.isdir(base):
+        return []
+    return sorted(int(name) for name in os.listdir(base)
+                  if name.isdigit() and os.path.isdir(os.path.join(base, name)))
+
+
+# --- Rebalancing ---
+
+def _move_vectors(source_path: str, dest_path: str, employee_id: str) -> int:
+    """Best-effort move of one employee's Chroma records; returns how many moved."""
+    if not config.CHROMA_ENABLED or not os.path.isdir(source_path):
+        return 0
+    try:
+        import chromadb
+        from agents.vector_records import collection_name
+        name = collection_name(config.CHROMA_MODE)
+        kwargs = {"embedding_function": None} if config.CHROMA_MODE == "metadata" else {}
+        source = chromadb.PersistentClient(path=source_path).get_or_create_collection(name=name, **kwargs)
+        records = source.get(where={"user": employee_id}, include=["embeddings", "documents", "metadatas"])
+        if not records["ids"]:
+            return 0
+        dest = chromadb.PersistentClient(path=dest_path).get_or_create_collection(name=name, **kwargs)
+        dest.upsert(ids=records["ids"], embeddings=records["embeddings"],
+                    documents=records["documents"], metadatas=records["metadatas"])
+        source.delete(ids=records["ids"])
+        return len(records["ids"])
+    except Exception as e:
+        logger.warning("[Sharding] could not move vectors of %s: %s", employee_id, e)
+        return 0
+
+
+def rebalance(root: str, shards: int, vnodes: int = None, chroma_path: str = None) -> dict:
+    """
+    Moves every employee whose owner changes to its new shard: raw LTM,
+    compaction aggregates and (best effort) Chroma records. Each move
+    writes the destination before deleting the source, and the layout is
+    written last, so an interrupted run is simply run again. The first
+    run also splits an unsharded LTM at `root` into shards.
+    Run with the agent stopped.
+    """
+    vnodes = vnodes or config.SHARD_VNODES
+    chroma_path = chroma_path or config.CHROMA_PATH
+    ring = HashRing(shards, vnodes)
+    # Source None is the unsharded (pre-sharding) LTM in root itself
+    sources = existing_shards(root)
+    if load_layout(root) is None:
+        sources.insert(0, None)
+
+    def ltm_dir(source):
+        return root if source is None else shard_dir(root, source)
+
+    def vector_path(source):
+        return chroma_path if source is None else shard_chroma_path(chroma_path, source)
+
+    stores = {}
+
+    def store_for(source):
+        if source not in stores:
+            os.makedirs(ltm_dir(source), exist_ok=True)
+            stores[source] = create_ltm_store(ltm_dir(source))
+        return stores[source]
+
+    moved, vectors, touched = 0, 0, set()
+    try:
+        for shard in range(shards):
+            store_for(shard)
+        if None in sources:
+            store_for(None).migrate_legacy(os.path.join(root, "memory.json"))
+        had_rollups = all(os.path.exists(os.path.join(ltm_dir(source), config.ROLLUP_FILE))
+                          for source in sources if store_for(source).employee_ids())
+
+        for source in sources:
+            store = store_for(source)
+            for employee_id in store.employee_ids():
+                owner = ring.shard_for(employee_id)
+                if owner == source:
+                    continue
+                entries = store.read_employee(employee_id)
+                dest = store_for(owner)
+                dest.remove_employee(employee_id)  # leftovers of an interrupted run
+                dest.append_many(entries)
+                dest.flush()
+                vectors += _move_vectors(vector_path(source), vector_path(owner), employee_id)
+                store.remove_employee(employee_id)
+                touched.update((source, owner))
+                moved += 1
+
+        # Aggregates follow their employees (also fixes up an interrupted run)
+        aggregates = {source: ltm_compaction.load_aggregates(ltm_dir(source)) for source in stores}
+        for source in list(aggregates):
+            for employee_id in list(aggregates[source]):
+                owner = ring.shard_for(employee_id)
+                if owner != source:
+                    aggregates[owner][employee_id] = aggregates[source].pop(employee_id)
+                    touched.update((source, owner))
+        for source in touched:
+            ltm_compaction.save_aggregates(ltm_dir(source), aggregates[source])
+    finally:
+        for store in stores.values():
+            store.close()
+
+    # Trend state and snapshots are rebuilt from the moved logs on next start
+    for source in touched:
+        for name in (config.TREND_STATE_FILE, config.LTM_SNAPSHOT_FILE):
+            try:
+                os.remove(os.path.join(ltm_dir(source), name))
+            except FileNotFoundError:
+                pass
+
+    _rebalance_rollups(root, sources, shards, had_rollups, ltm_dir)
+
+    for source in sources:
+        if source is not None and source >= shards:
+            shutil.rmtree(ltm_dir(source), ignore_errors=True)
+    save_layout(root, shards, vnodes)
+    logger.info("[Sharding] rebalanced %s into %d shards: %d employees, %d vectors moved.",
+                root, shards, moved, vectors)
+    return {"shards": shards, "employees_moved": moved, "vectors_moved": vectors}
+
+
+def _rebalance_rollups(root: str, sources: list, shards: int, had_rollups: bool, ltm_dir):
+    """
+    The router sums rollups over all shards, so counts need not live with
+    their employees: retired shards (and the unsharded LTM) are folded into
+    shard 0 and shards without a file start empty. If some source had no
+    saved rollups, every shard rebuilds its own from raw LTM instead.
+    """
+    paths = {shard: os.path.join(ltm_dir(shard), config.ROLLUP_FILE) for shard in range(shards)}
+    if not had_rollups:
+        for source in sources + list(range(shards)):
+            try:
+                os.remove(os.path.join(ltm_dir(source), config.ROLLUP_FILE))
+            except FileNotFoundError:
+                pass
+        return
+    target = RollupStore(paths[0])
+    target.load()
+    for source in sources:
+        if source is None or source >= shards:
+            retired = RollupStore(os.path.join(ltm_dir(source), config.ROLLUP_FILE))
+            if retired.load():
+                target.merge(retired)
+            try:
+                os.remove(retired.path)
+            except FileNotFoundError:
+                pass
+    # Every shard's LTM may have changed: record the new sizes so no shard rebuilds on start
+    for shard in range(shards):
+        rollups = target if shard == 0 else RollupStore(paths[shard])
+        if shard:
+            rollups.load()
+        rollups.ltm_size = functools.partial(_ltm_size, ltm_dir(shard))
+        rollups.save(force=True)
+
+
+def _ltm_size(path: str):
+    store = create_ltm_store(path)
+    try:
+        return None if store.shared else store.total_size()
+    finally:
+        store.close()
+
+
+# --- Worker Process ---
+
+WORKER_METHODS = {
+    "process_task", "process_batch", "stream_task", "write_to_ltm", "write_many_to_ltm",
+    "read_from_ltm", "find_similar_cases", "find_similar_cases_many", "find_cases",
+    "team_rollup", "rebuild_rollups", "compact_ltm", "save_snapshot", "ltm_aggregates",
+    "triage", "process_task_template",
+}
+
+
+def worker_main(shard: int, address: str, root: str, chroma_path: str, agent_id: str, supervisor_id: str):
+    """Runs one shard: an agent over its partition, serving router requests until told to stop."""
+    from agents.burnout_agent import BurnoutPreventionAgent
+    from agents.log_setup import configure_logging
+
+    configure_logging(shard_log_file(shard))
+    agent = BurnoutPreventionAgent(agent_id, supervisor_id, ltm_dir=shard_dir(root, shard),
+                                   chroma_path=shard_chroma_path(chroma_path, shard))
+    if config.WARM_UP != "off":
+        agent.warm_up()
+
+    conn = Client(address, authkey=bytes.fromhex(os.environ[AUTHKEY_ENV]))
+    send_lock = threading.Lock()
+
+    def reply(*message):
+        with send_lock:
+            conn.send(message)
+
+    def run(req_id, method, args, kwargs):
+        try:
+            if method == "status":
+                result = {"shard": shard, "pid": os.getpid(), **agent.runtime_stats(),
+                          **metrics.status_snapshot()}
+            elif method == "stream_task":
+                for item in agent.stream_task(*args, **kwargs):
+                    reply(req_id, "item", item)
+                reply(req_id, "end", None)
+                return
+            elif method == "process_task_template":
+                # A task the router's admission control degraded (see agents/admission.py)
+                reason, *args = args
+                with llm_guard.template_only(reason):
+                    result = agent.process_task(*args, **kwargs)
+            else:
+                result = getattr(agent, method)(*args, **kwargs)
+            reply(req_id, "result", result)
+        except Exception as e:
+            logger.exception("[Shard %d] %s failed: %s", shard, method, e)
+            reply(req_id, "error", f"{type(e).__name__}: {e}")
+
+    reply("hello", shard, os.getpid())
+    logger.info("[Shard %d] worker %d serving %s", shard, os.getpid(), shard_dir(root, shard))
+    with ThreadPoolExecutor(max_workers=config.SHARD_THREADS, thread_name_prefix=f"shard-{shard}") as pool:
+        while True:
+            try:
+                request = conn.recv()
+            except (EOFError, OSError):
+                break
+            if request is None:
+                break
+            req_id, method, args, kwargs = request
+            if method != "status" and method not in WORKER_METHODS:
+                reply(req_id, "error", f"unknown method '{method}'")
+                continue
+            if method == "triage":
+                # Cheap, and must not queue behind the tasks it is admitting
+                run(req_id, method, args, kwargs)
+                continue
+            pool.submit(run, req_id, method, args, kwargs)
+    agent.shutdown()
+    conn.close()
+
+
+# --- Router ---
+
+class _Worker:
+    def __init__(self, shard: int):
+        self.shard = shard
+        self.process = None
+        self.conn = None
+        self.pid = None
+        self.ready = threading.Event()
+        self.send_lock = threading.Lock()
+        # Guards pending, and conn/ready changing with it
+        self.pending_lock = threading.Lock()
+        self.pending = {}  # req_id -> reply queue
+        self.started = 0.0
+        self.backoff = 0.0
+
+
+class ShardRouter(AbstractWorkerAgent):
+    """
+    Stands in for BurnoutPreventionAgent in the web process: same methods,
+    each forwarded to the worker that owns the employee (or to all of them
+    and merged). Workers that die are restarted; their in-flight requests
+    fail with ConnectionError.
+    """
+
+    def __init__(self, agent_id: str, supervisor_id: str, shards: int = None, root: str = None,
+                 chroma_path: str = None):
+        super().__init__(agent_id, supervisor_id)
+        self.shards = shard_count(shards)
+        if self.shards < 1:
+            raise ValueError("ShardRouter needs at least one shard")
+        self._root = root or os.path.join(config.LTM_DIR, agent_id)
+        self._chroma_path = chroma_path or config.CHROMA_PATH
+        self._ring = HashRing(self.shards)
+        self._idempotency = None
+        if config.IDEMPOTENCY_ENABLED:
+            self._idempotency = IdempotencyStore(os.path.join(self._root, config.IDEMPOTENCY_FILE))
+            metrics.REGISTRY.register_callback(
+                "burnout_idempotency", "Tasks executed vs. answered from stored reports.", self._idempotency.stats)
+
+        layout = load_layout(self._root)
+        if layout != {"shards": self.shards, "vnodes": self._ring.vnodes}:
+            logger.info("[%s] shard layout changed (%s -> %d shards); rebalancing.",
+                        self._id, layout and layout.get("shards"), self.shards)
+            rebalance(self._root, self.shards, self._ring.vnodes, self._chroma_path)
+
+        self._authkey = os.urandom(32)
+        self._listener = Listener(authkey=self._authkey)
+        self._ids = itertools.count()
+        self._closing = False
+        self._executor = ThreadPoolExecutor(max_workers=config.SHARD_THREADS * self.shards,
+                                            thread_name_prefix="shard-router")
+        self._workers = [_Worker(shard) for shard in range(self.shards)]
+        threading.Thread(target=self._accept_loop, name="shard-accept", daemon=True).start()
+        for worker in self._workers:
+            self._spawn(worker)
+        for worker in self._workers:
+            if not worker.ready.wait(config.SHARD_START_TIMEOUT):
+                raise TimeoutError(f"shard {worker.shard} did not start within {config.SHARD_START_TIMEOUT}s")
+        atexit.register(self.shutdown)
+        logger.info("[%s] routing across %d shard workers.", self._id, self.shards)
+
+    # --- Worker Management ---
+
+    def _spawn(self, worker: _Worker):
+        worker.ready.clear()
+        env = dict(os.environ, **{AUTHKEY_ENV: self._authkey.hex()})
+        worker.process = subprocess.Popen(
+            [sys.executable, "-m", "agents.sharding", "worker", "--shard", str(worker.shard),
+             "--address", self._listener.address, "--root", self._root, "--chroma-path", self._chroma_path,
+             "--agent-id", self._id, "--supervisor-id", self._supervisor_id],
+            env=env)
+        worker.started = time.monotonic()
+
+    @staticmethod
+    def _restart_delay(worker: _Worker) -> float:
+        """No pause after a worker that ran a while; otherwise doubling up to SHARD_RESTART_BACKOFF_MAX."""
+        limit = config.SHARD_RESTART_BACKOFF_MAX
+        if time.monotonic() - worker.started >= limit:
+            worker.backoff = 0.0
+        else:
+            worker.backoff = min(limit, max(0.5, worker.backoff * 2))
+        return worker.backoff
+
+    def _accept_loop(self):
+        while not self._closing:
+            try:
+                conn = self._listener.accept()
+                _, shard, pid = conn.recv()
+            except Exception as e:
+                if not self._closing:
+                    logger.warning("[%s] shard worker handshake failed: %s", self._id, e)
+                continue
+            worker = self._workers[shard]
+            threading.Thread(target=self._read_loop, args=(worker, conn),
+                             name=f"shard-{shard}-reader", daemon=True).start()
+            with worker.pending_lock:
+                worker.conn, worker.pid = conn, pid
+                worker.ready.set()
+
+    def _read_loop(self, worker: _Worker, conn):
+        while True:
+            try:
+                req_id, kind, payload = conn.recv()
+            except (EOFError, OSError):
+                break
+            with worker.pending_lock:
+                replies = worker.pending.get(req_id)
+            if replies is not None:
+                replies.put((kind, payload))
+
+        with worker.pending_lock:
+            worker.ready.clear()
+            pending, worker.pending = worker.pending, {}
+        for replies in pending.values():
+            replies.put(("lost", f"shard {worker.shard} worker exited"))
+        if self._closing:
+            return
+        delay = self._restart_delay(worker)
+        logger.error("[%s] shard %d worker (pid %s) exited; restarting in %.1fs.",
+                     self._id, worker.shard, worker.pid, delay)
+        time.sleep(delay)
+        if not self._closing:
+            self._spawn(worker)
+
+    def _request(self, shard: int, method: str, *args, **kwargs) -> tuple:
+        """Sends one request; returns (worker, req_id, reply queue)."""
+        worker = self._workers[shard]
+        req_id = next(self._ids)
+        replies = queue.Queue()
+        deadline = time.monotonic() + config.SHARD_START_TIMEOUT
+        while True:
+            if not worker.ready.wait(max(0.0, deadline - time.monotonic())):
+                raise ConnectionError(f"shard {shard} worker is not running")
+            with worker.pending_lock:
+                # Registered on the live connection, or failed by its reader when it goes
+                if worker.ready.is_set():
+                    worker.pending[req_id] = replies
+                    conn = worker.conn
+                    break
+        SHARD_REQUESTS.inc(shard=str(shard), method=method)
+        try:
+            with worker.send_lock:
+                conn.send((req_id, method, args, kwargs))
+        except (OSError, ValueError) as e:
+            with worker.pending_lock:
+                worker.pending.pop(req_id, None)
+            raise ConnectionError(f"shard {shard} worker is unreachable: {e}") from e
+        return worker, req_id, replies
+
+    @staticmethod
+    def _reply(worker: _Worker, req_id: int, replies: queue.Queue):
+        try:
+            kind, payload = replies.get(timeout=config.SHARD_TIMEOUT)
+        except queue.Empty:
+            raise TimeoutError(f"shard {worker.shard} did not answer within {config.SHARD_TIMEOUT}s") from None
+        finally:
+            with worker.pending_lock:
+                worker.pending.pop(req_id, None)
+        if kind == "error":
+            raise ShardError(payload)
+        if kind == "lost":
+            raise ConnectionError(payload)
+        return payload
+
+    def _call(self, shard: int, method: str, *args, **kwargs):
+        return self._reply(*self._request(shard, method, *args, **kwargs))
+
+    def _fan_out(self, calls: dict) -> dict:
+        """{shard: (method, args, kwargs)} sent together; returns {shard: result}."""
+        sent = {shard: self._request(shard, method, *args, **kwargs)
+                for shard, (method, args, kwargs) in calls.items()}
+        return {shard: self._reply(*request) for shard, request in sent.items()}
+
+    def _broadcast(self, method: str, *args, **kwargs) -> list:
+        results = self._fan_out({shard: (method, args, kwargs) for shard in range(self.shards)})
+        return [results[shard] for shard in range(self.shards)]
+
+    @property
+    def idempotency(self):
+        """Completed reports by message_id, kept by the router (see agents/idempotency.py)."""
+        return self._idempotency
+
+    def shard_for(self, employee_id) -> int:
+        return self._ring.shard_for(employee_id)
+
+    def _task_shard(self, task_data: dict) -> int:
+        return self.shard_for(task_data.get('employee_id', DEFAULT_EMPLOYEE))
+
+    def _group(self, items: list, key) -> dict:
+        """shard -> [index into items, ...]"""
+        groups = {}
+        for i, item in enumerate(items):
+            groups.setdefault(key(item), []).append(i)
+        return groups
+
+    # --- Agent Interface ---
+
+    def warm_up(self, pre_fork: bool = False):
+        """Workers warm themselves up when they start."""
+
+    def triage(self, task_data: dict) -> tuple:
+        """Admission lane and priority, from the shard that holds the employee's trend state."""
+        return tuple(self._call(self._task_shard(task_data), "triage", task_data))
+
+    def process_task(self, task_data: dict, deadline: float = None) -> dict:
+        reason = llm_guard.skip_reason()
+        if reason is not None:
+            return self._call(self._task_shard(task_data), "process_task_template", reason, task_data, deadline)
+        return self._call(self._task_shard(task_data), "process_task", task_data, deadline)
+
+    async def aprocess_task(self, task_data: dict, deadline: float = None) -> dict:
+        loop = asyncio.get_running_loop()
+        # Carries llm_guard.template_only() into the executor thread
+        call = functools.partial(contextvars.copy_context().run, self.process_task, task_data, deadline)
+        return await loop.run_in_executor(self._executor, call)
+
+    def stream_task(self, task_data: dict):
+        worker, req_id, replies = self._request(self._task_shard(task_data), "stream_task", task_data)
+        try:
+            while True:
+                try:
+                    kind, payload = replies.get(timeout=config.SHARD_TIMEOUT)
+                except queue.Empty:
+                    raise TimeoutError(f"shard {worker.shard} stopped streaming") from None
+                if kind == "end":
+                    return
+                if kind == "error":
+                    raise ShardError(payload)
+                if kind == "lost":
+                    raise ConnectionError(payload)
+                yield payload
+        finally:
+            with worker.pending_lock:
+                worker.pending.pop(req_id, None)
+
+    def process_batch(self, task_list: list) -> list:
+        """Each shard scores its part of the batch; results come back in input order."""
+        groups = self._group(task_list, self._task_shard)
+        results = self._fan_out({shard: ("process_batch", ([task_list[i] for i in indices],), {})
+                                 for shard, indices in groups.items()})
+        ordered = [None] * len(task_list)
+        for shard, indices in groups.items():
+            for i, result in zip(indices, results[shard]):
+                ordered[i] = result
+        return ordered
+
+    def write_to_ltm(self, entry: dict) -> bool:
+        return self._call(self.shard_for(entry_employee_id(entry)), "write_to_ltm", entry)
+
+    def write_many_to_ltm(self, entries: list) -> bool:
+        groups = self._group(entries, lambda entry: self.shard_for(entry_employee_id(entry)))
+        results = self._fan_out({shard: ("write_many_to_ltm", ([entries[i] for i in indices],), {})
+                                 for shard, indices in groups.items()})
+        return all(results.values())
+
+    def read_from_ltm(self, employee_id: str = None) -> any:
+        if employee_id is not None:
+            return self._call(self.shard_for(employee_id), "read_from_ltm", employee_id)
+        parts = self._broadcast("read_from_ltm")
+        return None if any(part is None for part in parts) else [e for part in parts for e in part]
+
+    def ltm_aggregates(self, employee_id: str) -> dict:
+        return self._call(self.shard_for(employee_id), "ltm_aggregates", employee_id)
+
+    def find_similar_cases(self, employee_id: str, k: int = 5, other_employees: bool = False,
+                           **filters) -> list:
+        return self._call(self.shard_for(employee_id), "find_similar_cases", employee_id, k,
+                          other_employees, **filters)
+
+    def find_similar_cases_many(self, employee_ids: list, k: int = 5, **filters) -> dict:
+        groups = self._group([str(eid) for eid in employee_ids], self.shard_for)
+        results = self._fan_out({shard: ("find_similar_cases_many",
+                                         ([str(employee_ids[i]) for i in indices], k), filters)
+                                 for shard, indices in groups.items()})
+        merged = {}
+        for part in results.values():
+            merged.update(part)
+        return merged
+
+    def find_cases(self, employee_id: str = None, risk: str = None, since: float = None,
+                   until: float = None, limit: int = 100) -> list:
+        if employee_id is not None:
+            return self._call(self.shard_for(employee_id), "find_cases", employee_id, risk, since, until, limit)
+        parts = self._broadcast("find_cases", None, risk, since, until, limit)
+        return [case for part in parts for case in part][:limit]
+
+    def team_rollup(self, team_id: str = None, buckets: int = None) -> dict:
+        return merge_views(self._broadcast("team_rollup", team_id, buckets), buckets)
+
+    def rebuild_rollups(self) -> dict:
+        parts = self._broadcast("rebuild_rollups")
+        return {"entries": sum(part["entries"] for part in parts), "shards": parts}
+
+    def compact_ltm(self, keep_raw: int = None, max_age_days: float = None) -> dict:
+        return {"shards": self._broadcast("compact_ltm", keep_raw, max_age_days)}
+
+    def save_snapshot(self) -> dict:
+        return {"shards": self._broadcast("save_snapshot")}
+
+    def runtime_stats(self) -> dict:
+        workers = []
+        for worker in self._workers:
+            try:
+                workers.append(self._call(worker.shard, "status"))
+            except Exception as e:
+                workers.append({"shard": worker.shard, "pid": worker.pid, "error": str(e)})
+        stats = {"shards": self.shards, "workers": workers}
+        if self._idempotency is not None:
+            stats["idempotency"] = self._idempotency.stats()
+        return stats
+
+    # --- Required Methods ---
+
+    @property
+    def transport(self):
+        """The process-wide transport picked by BURNOUT_TRANSPORT, or None (log only)."""
+        return get_transport()
+
+    def listen(self, transport=None):
+        super().listen(transport or self.transport)
+
+    def send_message(self, recipient: str, message_obj: dict) -> bool:
+        """Publishes through the transport; returns False if it was not handed over."""
+        logger.info("[%s] sending message to %s", self._id, recipient, extra={"outgoing_message": message_obj})
+        transport = self.transport
+        if transport is None:
+            return False
+        try:
+            return transport.publish(recipient, message_obj)
+        except (TransportFull, ConnectionError, TimeoutError) as e:
+            logger.warning("[%s] could not publish to %s: %s", self._id, recipient, e)
+            return False
+
+    def shutdown(self, timeout: float = 30.0):
+        """Stops every worker (each flushes its LTM, vectors and snapshots). Safe to call more than once."""
+        if self._closing:
+            return
+        self._closing = True
+        for worker in self._workers:
+            try:
+                with worker.send_lock:
+                    worker.conn.send(None)
+            except Exception:
+                pass
+        for worker in self._workers:
+            if worker.process is None:
+                continue
+            try:
+                worker.process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                logger.warning("[%s] shard %d did not stop; killing it.", self._id, worker.shard)
+                worker.process.kill()
+        self._listener.close()
+        self._executor.shutdown(wait=False)
+        if self._idempotency is not None:
+            self._idempotency.close()
+
+
+# --- CLI ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebalance_cmd = commands.add_parser("rebalance", help="move employees to a new shard count (agent stopped)")
+    rebalance_cmd.add_argument("--shards", type=int, required=True)
+    rebalance_cmd.add_argument("--vnodes", type=int, default=None)
+    rebalance_cmd.add_argument("--root", default=os.path.join(config.LTM_DIR, "WorkerAgent_BurnoutPrevention"))
+    rebalance_cmd.add_argument("--chroma-path", default=config.CHROMA_PATH)
+
+    worker_cmd = commands.add_parser("worker", help="run one shard (started by ShardRouter)")
+    worker_cmd.add_argument("--shard", type=int, required=True)
+    worker_cmd.add_argument("--address", required=True)
+    worker_cmd.add_argument("--root", required=True)
+    worker_cmd.add_argument("--chroma-path", required=True)
+    worker_cmd.add_argument("--agent-id", required=True)
+    worker_cmd.add_argument("--supervisor-id", required=True)
+    args = parser.parse_args(argv)
+
+    if args.command == "worker":
+        worker_main(args.shard, args.address, args.root, args.chroma_path, args.agent_id, args.supervisor_id)
+        return
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    result = rebalance(args.root, shard_count(args.shards), args.vnodes, args.chroma_path)
+    print(f"Rebalanced into {result['shards']} shards: {result['employees_moved']} employees, "
+          f"{result['vectors_moved']} vectors moved.")
+
+
+if __name__ == "__main__":
+    main()
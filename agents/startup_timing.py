@@ -0,0 +1,52 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# component name -> seconds spent building/importing it (first build only)
+_timings = OrderedDict()
+_lock = threading.Lock()
+
+
+@contextmanager
+def timed(component: str):
+    """Records how long the wrapped import/initialization took."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(component, time.perf_counter() - start)
+
+
+def record(component: str, seconds: float):
+    with _lock:
+        _timings[component] = _timings.get(component, 0.0) + seconds
+
+
+def report() -> dict:
+    """Returns {component: milliseconds} in the order components were built."""
+    with _lock:
+        return {name: round(seconds * 1000, 2) for name, seconds in _timings.items()}
+
+
+def format_report() -> str:
+    timings = report()
+    if not timings:
+        return "No startup timings recorded."
+    width = max(len(name) for name in timings)
+    lines = ["--- Startup Timing Report ---"]
+    for name, ms in timings.items():
+        lines.append(f"{name.ljust(width)}  {ms:10.2f} ms")
+    lines.append(f"{'total'.ljust(width)}  {sum(timings.values()):10.2f} ms")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # python -m agents.startup_timing  -> cold-start breakdown of a full warm-up
+    with timed("import:agents.burnout_agent"):
+        from agents.burnout_agent import BurnoutPreventionAgent
+    agent = BurnoutPreventionAgent(agent_id="WorkerAgent_BurnoutPrevention",
+                                   supervisor_id="SupervisorAgent_Main")
+    agent.warm_up()
+    print(format_report())
+    agent.shutdown()
@@ -0,0 +1,632 @@
+"""
+Message transport between co-located supervisor and worker agents.
+
+Two interchangeable implementations of the same small interface:
+
+  InProcessTransport   asyncio queues on a background loop, for a supervisor
+                       and workers in one process (messages stay Python dicts)
+  UnixSocketTransport  client of a UnixSocketBroker, for several local
+                       processes (length-prefixed msgpack frames)
+
+Both batch deliveries (up to batch_size messages, or whatever arrived within
+batch_interval), apply backpressure (a full mailbox blocks publish() for up
+to publish_timeout, then raises TransportFull) and retry un-acked batches
+with exponential backoff before dead-lettering them. A subscriber's handler
+acks a batch by returning normally; raising is a nack.
+
+A delivered batch holds a lease of ack_timeout seconds, which the subscriber
+renews every ack_timeout / 3 while its handler is still running. Only a batch
+whose lease runs out (a subscriber that died or hung up) is redelivered, so a
+slow handler is never handed its own batch a second time.
+
+Run a broker with:
+    python -m agents.transport broker --socket /tmp/burnout-broker.sock
+"""
+import argparse
+import asyncio
+import atexit
+import inspect
+import itertools
+import json
+import logging
+import os
+import struct
+import threading
+import time
+from collections import deque
+
+from agents import config
+
+logger = logging.getLogger(__name__)
+
+_FRAME_LEN = struct.Struct(">I")
+DEAD_LETTER_KEEP = 100
+
+
+class TransportFull(Exception):
+    """publish() could not hand a message over within publish_timeout."""
+
+
+# --- Wire Format (Unix socket only) ---
+
+try:
+    import ormsgpack
+
+    def _encode(obj) -> bytes:
+        return ormsgpack.packb(obj)
+
+    def _decode(data: bytes):
+        return ormsgpack.unpackb(data)
+except ImportError:  # plain JSON frames still work, just bigger and slower
+    def _encode(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+    def _decode(data: bytes):
+        return json.loads(data)
+
+
+async def _write_frame(writer, obj):
+    payload = _encode(obj)
+    writer.write(_FRAME_LEN.pack(len(payload)) + payload)
+    await writer.drain()
+
+
+async def _read_frame(reader):
+    header = await reader.readexactly(_FRAME_LEN.size)
+    (length,) = _FRAME_LEN.unpack(header)
+    return _decode(await reader.readexactly(length))
+
+
+# --- Shared Machinery ---
+
+class _LoopThread:
+    """An asyncio event loop running on its own daemon thread."""
+
+    def __init__(self, name: str):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call(self, coro, timeout: float = None):
+        return self.submit(coro).result(timeout)
+
+    def stop(self):
+        """Cancels whatever is still running on the loop, then stops it."""
+        async def cancel_all():
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if self._thread.is_alive():
+            try:
+                self.call(cancel_all(), timeout=5.0)
+            except Exception:
+                pass
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(5.0)
+
+
+class _Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.values = {"published": 0, "sent": 0, "delivered": 0, "batches": 0, "retries": 0,
+                       "dead_lettered": 0, "rejected": 0}
+        self.dead_letters = deque(maxlen=DEAD_LETTER_KEEP)
+
+    def add(self, name: str, amount: int = 1):
+        with self._lock:
+            self.values[name] += amount
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.values)
+
+
+async def _next_batch(queue: asyncio.Queue, batch_size: int, batch_interval: float) -> list:
+    """Waits for one message, then gathers up to batch_size within batch_interval."""
+    batch = [await queue.get()]
+    deadline = time.monotonic() + batch_interval
+    while len(batch) < batch_size:
+        try:
+            batch.append(queue.get_nowait())
+            continue
+        except asyncio.QueueEmpty:
+            pass
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(queue.get(), remaining))
+        except asyncio.TimeoutError:
+            break
+    return batch
+
+
+class _Lease:
+    """Deadline for the ack of one in-flight batch, pushed back by renew()."""
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self.expires = time.monotonic() + timeout
+
+    def renew(self):
+        self.expires = time.monotonic() + self.timeout
+
+
+async def _await_ack(future, lease: _Lease):
+    """The result of `future`; raises TimeoutError once `lease` expires without being renewed."""
+    while True:
+        remaining = lease.expires - time.monotonic()
+        if remaining <= 0:
+            raise asyncio.TimeoutError(f"no ack or lease renewal within {lease.timeout}s")
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), remaining)
+        except asyncio.TimeoutError:
+            continue  # renewed meanwhile?
+
+
+async def _run_renewing(deliver, msgs: list, renew, interval: float):
+    """Awaits deliver(msgs), calling `await renew()` every `interval` seconds until it finishes."""
+    task = asyncio.ensure_future(deliver(msgs))
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=interval)
+            if done:
+                return task.result()
+            await renew()
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+
+
+async def _deliver_with_retry(deliver, batch: list, max_retries: int, stats: _Stats, name: str,
+                              counter: str = "delivered") -> bool:
+    """Calls deliver(batch) until it succeeds or max_retries is spent."""
+    for attempt in range(max_retries + 1):
+        try:
+            await deliver(batch)
+            stats.add(counter, len(batch))
+            if counter == "delivered":
+                stats.add("batches")
+            return True
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if attempt == max_retries:
+                logger.error("[Transport] dead-lettered %d messages for %s: %s", len(batch), name, e)
+                stats.add("dead_lettered", len(batch))
+                stats.dead_letters.append({"recipient": name, "error": str(e), "messages": batch})
+                return False
+            stats.add("retries")
+            await asyncio.sleep(min(2.0, 0.05 * (2 ** attempt)))
+
+
+def _as_async(handler):
+    """Sync handlers run in a worker thread so they never block the loop."""
+    if inspect.iscoroutinefunction(handler):
+        return handler
+
+    async def call(batch):
+        return await asyncio.to_thread(handler, batch)
+    return call
+
+
+# --- In-Process Transport ---
+
+class InProcessTransport:
+    """Per-recipient bounded asyncio queues on a background event loop."""
+
+    def __init__(self, queue_size: int = None, batch_size: int = None, batch_interval: float = None,
+                 publish_timeout: float = None, ack_timeout: float = None, max_retries: int = None):
+        self.queue_size = queue_size or config.TRANSPORT_QUEUE_SIZE
+        self.batch_size = batch_size or config.TRANSPORT_BATCH_SIZE
+        self.batch_interval = config.TRANSPORT_BATCH_INTERVAL if batch_interval is None else batch_interval
+        self.publish_timeout = config.TRANSPORT_PUBLISH_TIMEOUT if publish_timeout is None else publish_timeout
+        self.ack_timeout = ack_timeout or config.TRANSPORT_ACK_TIMEOUT
+        self.max_retries = config.TRANSPORT_MAX_RETRIES if max_retries is None else max_retries
+        self._loop = _LoopThread("transport-inprocess")
+        self._mailboxes = {}
+        self._consumers = []
+        self._stats = _Stats()
+
+    def _mailbox(self, recipient: str) -> asyncio.Queue:
+        # Only touched on the loop thread
+        queue = self._mailboxes.get(recipient)
+        if queue is None:
+            queue = self._mailboxes[recipient] = asyncio.Queue(maxsize=self.queue_size)
+        return queue
+
+    async def _put(self, recipient: str, messages: list) -> int:
+        queue = self._mailbox(recipient)
+        for count, message in enumerate(messages):
+            try:
+                await asyncio.wait_for(queue.put(message), self.publish_timeout)
+            except asyncio.TimeoutError:
+                self._stats.add("rejected", len(messages) - count)
+                raise TransportFull(f"mailbox '{recipient}' is full")
+        return len(messages)
+
+    def publish(self, recipient: str, message: dict) -> bool:
+        return self.publish_many(recipient, [message]) == 1
+
+    def publish_many(self, recipient: str, messages: list) -> int:
+        """Queues messages for `recipient`; blocks while the mailbox is full (backpressure)."""
+        accepted = self._loop.call(self._put(str(recipient), list(messages)))
+        self._stats.add("published", accepted)
+        return accepted
+
+    def subscribe(self, recipient: str, handler):
+        """Delivers batches for `recipient` to handler(messages) (sync or async)."""
+        recipient = str(recipient)
+        deliver = _as_async(handler)
+
+        async def deliver_leased(msgs):
+            # Same lease rules as the broker: the running handler renews it
+            lease = _Lease(self.ack_timeout)
+
+            async def renew():
+                lease.renew()
+
+            task = asyncio.ensure_future(_run_renewing(deliver, msgs, renew, self.ack_timeout / 3))
+            try:
+                await _await_ack(task, lease)
+            except asyncio.TimeoutError:
+                task.cancel()
+                raise
+
+        async def consume():
+            queue = self._mailbox(recipient)
+            while True:
+                batch = await _next_batch(queue, self.batch_size, self.batch_interval)
+                await _deliver_with_retry(deliver_leased, batch, self.max_retries, self._stats, recipient)
+
+        self._consumers.append(self._loop.submit(consume()))
+
+    def close(self):
+        self._loop.stop()
+
+    def stats(self) -> dict:
+        stats = self._stats.snapshot()
+        stats["queue_depth"] = sum(queue.qsize() for queue in list(self._mailboxes.values()))
+        return stats
+
+    @property
+    def dead_letters(self) -> list:
+        return list(self._stats.dead_letters)
+
+
+# --- Unix Socket Broker ---
+
+class UnixSocketBroker:
+    """
+    Local message broker on a Unix domain socket.
+
+    Frames (msgpack maps):
+      client -> broker  {"op": "pub", "seq", "to", "msgs"}  -> {"op": "ack"|"nack", "seq"}
+      client -> broker  {"op": "sub", "name"}
+      broker -> client  {"op": "deliver", "id", "msgs"}     -> {"op": "ack"|"nack", "id"}
+      client -> broker  {"op": "touch", "id"}               (renews the delivery's lease)
+    A "pub" is accepted whole or refused (nack "full") when the mailbox has
+    no room for it. Several subscribers to one name share its queue. A
+    delivery is retried once its lease (ack_timeout) runs out untouched.
+    """
+
+    def __init__(self, path: str = None, queue_size: int = None, batch_size: int = None,
+                 batch_interval: float = None, ack_timeout: float = None, max_retries: int = None):
+        self.path = path or config.TRANSPORT_SOCKET
+        self.queue_size = queue_size or config.TRANSPORT_QUEUE_SIZE
+        self.batch_size = batch_size or config.TRANSPORT_BATCH_SIZE
+        self.batch_interval = config.TRANSPORT_BATCH_INTERVAL if batch_interval is None else batch_interval
+        self.ack_timeout = ack_timeout or config.TRANSPORT_ACK_TIMEOUT
+        self.max_retries = config.TRANSPORT_MAX_RETRIES if max_retries is None else max_retries
+        self._mailboxes = {}
+        self._stats = _Stats()
+        self._server = None
+        self._delivery_ids = itertools.count(1)
+
+    def _mailbox(self, name: str) -> asyncio.Queue:
+        queue = self._mailboxes.get(name)
+        if queue is None:
+            queue = self._mailboxes[name] = asyncio.Queue(maxsize=self.queue_size)
+        return queue
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._client, path=self.path)
+        logger.info("[Broker] listening on %s", self.path)
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def _client(self, reader, writer):
+        pending_acks = {}
+        consumers = []
+        write_lock = asyncio.Lock()
+
+        async def send(frame):
+            async with write_lock:
+                await _write_frame(writer, frame)
+
+        async def consume(name: str):
+            queue = self._mailbox(name)
+            while True:
+                batch = await _next_batch(queue, self.batch_size, self.batch_interval)
+
+                async def deliver(msgs):
+                    delivery_id = next(self._delivery_ids)
+                    future = asyncio.get_running_loop().create_future()
+                    lease = _Lease(self.ack_timeout)
+                    pending_acks[delivery_id] = (future, lease)
+                    try:
+                        await send({"op": "deliver", "id": delivery_id, "msgs": msgs})
+                        ok = await _await_ack(future, lease)
+                    finally:
+                        pending_acks.pop(delivery_id, None)
+                    if not ok:
+                        raise RuntimeError("subscriber nacked the batch")
+
+                try:
+                    await _deliver_with_retry(deliver, batch, self.max_retries, self._stats, name)
+                except asyncio.CancelledError:
+                    # Subscriber went away mid-delivery: hand the batch to the next one
+                    for message in batch:
+                        if queue.full():
+                            self._stats.add("dead_lettered")
+                            continue
+                        queue.put_nowait(message)
+                    raise
+
+        try:
+            while True:
+                frame = await _read_frame(reader)
+                op = frame.get("op")
+                if op == "pub":
+                    queue = self._mailbox(frame["to"])
+                    msgs = frame.get("msgs", [])
+                    if self.queue_size - queue.qsize() < len(msgs):
+                        self._stats.add("rejected", len(msgs))
+                        await send({"op": "nack", "seq": frame["seq"], "reason": "full"})
+                        continue
+                    for message in msgs:
+                        queue.put_nowait(message)
+                    self._stats.add("published", len(msgs))
+                    await send({"op": "ack", "seq": frame["seq"]})
+                elif op == "sub":
+                    consumers.append(asyncio.ensure_future(consume(frame["name"])))
+                elif op in ("ack", "nack"):
+                    future, _ = pending_acks.get(frame.get("id"), (None, None))
+                    if future is not None and not future.done():
+                        future.set_result(op == "ack")
+                elif op == "touch":
+                    _, lease = pending_acks.get(frame.get("id"), (None, None))
+                    if lease is not None:
+                        lease.renew()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for consumer in consumers:
+                consumer.cancel()
+            writer.close()
+
+    def stats(self) -> dict:
+        stats = self._stats.snapshot()
+        stats["queue_depth"] = sum(queue.qsize() for queue in list(self._mailboxes.values()))
+        return stats
+
+
+# --- Unix Socket Client ---
+
+class UnixSocketTransport:
+    """
+    Talks to a UnixSocketBroker. publish() drops messages into a bounded
+    local outbox (backpressure when full); a flusher sends them in batches
+    and retries any batch the broker doesn't ack.
+    """
+
+    def __init__(self, path: str = None, queue_size: int = None, batch_size: int = None,
+                 batch_interval: float = None, publish_timeout: float = None,
+                 ack_timeout: float = None, max_retries: int = None):
+        self.path = path or config.TRANSPORT_SOCKET
+        self.queue_size = queue_size or config.TRANSPORT_QUEUE_SIZE
+        self.batch_size = batch_size or config.TRANSPORT_BATCH_SIZE
+        self.batch_interval = config.TRANSPORT_BATCH_INTERVAL if batch_interval is None else batch_interval
+        self.publish_timeout = config.TRANSPORT_PUBLISH_TIMEOUT if publish_timeout is None else publish_timeout
+        self.ack_timeout = ack_timeout or config.TRANSPORT_ACK_TIMEOUT
+        self.max_retries = config.TRANSPORT_MAX_RETRIES if max_retries is None else max_retries
+
+        self._loop = _LoopThread("transport-unix")
+        self._stats = _Stats()
+        self._outboxes = {}
+        self._flushers = []
+        self._subscribers = []
+        self._conn = None
+        self._conn_lock = None
+        self._ack_reader = None
+        self._pending = {}
+        self._seq = itertools.count(1)
+
+    # --- Publishing ---
+
+    async def _connection(self):
+        if self._conn_lock is None:
+            self._conn_lock = asyncio.Lock()
+        async with self._conn_lock:
+            if self._conn is None:
+                reader, writer = await asyncio.open_unix_connection(self.path)
+                self._conn = (reader, writer, asyncio.Lock())
+                self._ack_reader = asyncio.ensure_future(self._read_acks(reader))
+            return self._conn
+
+    async def _read_acks(self, reader):
+        try:
+            while True:
+                frame = await _read_frame(reader)
+                future = self._pending.get(frame.get("seq"))
+                if future is not None and not future.done():
+                    future.set_result(frame.get("op") == "ack")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        self._conn = None
+        for future in list(self._pending.values()):
+            if not future.done():
+                future.set_result(False)
+
+    async def _send_batch(self, recipient: str, batch: list):
+        try:
+            _, writer, write_lock = await self._connection()
+        except OSError as e:
+            raise ConnectionError(f"broker unavailable at {self.path}: {e}")
+        seq = next(self._seq)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[seq] = future
+        try:
+            async with write_lock:
+                await _write_frame(writer, {"op": "pub", "seq": seq, "to": recipient, "msgs": batch})
+            ok = await asyncio.wait_for(future, self.ack_timeout)
+        finally:
+            self._pending.pop(seq, None)
+        if not ok:
+            raise RuntimeError("broker refused the batch (full or disconnected)")
+
+    def _outbox(self, recipient: str) -> asyncio.Queue:
+        queue = self._outboxes.get(recipient)
+        if queue is None:
+            queue = self._outboxes[recipient] = asyncio.Queue(maxsize=self.queue_size)
+
+            async def flush():
+                while True:
+                    batch = await _next_batch(queue, self.batch_size, self.batch_interval)
+                    await _deliver_with_retry(lambda msgs: self._send_batch(recipient, msgs),
+                                              batch, self.max_retries, self._stats, recipient, "sent")
+
+            self._flushers.append(asyncio.ensure_future(flush()))
+        return queue
+
+    async def _put(self, recipient: str, messages: list) -> int:
+        queue = self._outbox(recipient)
+        for count, message in enumerate(messages):
+            try:
+                await asyncio.wait_for(queue.put(message), self.publish_timeout)
+            except asyncio.TimeoutError:
+                self._stats.add("rejected", len(messages) - count)
+                raise TransportFull(f"outbox for '{recipient}' is full")
+        return len(messages)
+
+    def publish(self, recipient: str, message: dict) -> bool:
+        return self.publish_many(recipient, [message]) == 1
+
+    def publish_many(self, recipient: str, messages: list) -> int:
+        accepted = self._loop.call(self._put(str(recipient), list(messages)))
+        self._stats.add("published", accepted)
+        return accepted
+
+    # --- Subscribing ---
+
+    def subscribe(self, recipient: str, handler):
+        """Receives batches for `recipient` on a dedicated connection; reconnects on failure."""
+        recipient = str(recipient)
+        deliver = _as_async(handler)
+
+        async def listen():
+            while True:
+                try:
+                    reader, writer = await asyncio.open_unix_connection(self.path)
+                    await _write_frame(writer, {"op": "sub", "name": recipient})
+                    while True:
+                        frame = await _read_frame(reader)
+                        if frame.get("op") != "deliver":
+                            continue
+
+                        async def renew(delivery_id=frame["id"]):
+                            await _write_frame(writer, {"op": "touch", "id": delivery_id})
+
+                        try:
+                            await _run_renewing(deliver, frame["msgs"], renew, self.ack_timeout / 3)
+                            reply = "ack"
+                            self._stats.add("delivered", len(frame["msgs"]))
+                            self._stats.add("batches")
+                        except Exception as e:
+                            logger.warning("[Transport] handler for %s failed: %s", recipient, e)
+                            reply = "nack"
+                        await _write_frame(writer, {"op": reply, "id": frame["id"]})
+                except asyncio.CancelledError:
+                    raise
+                except (OSError, asyncio.IncompleteReadError) as e:
+                    logger.warning("[Transport] subscription %s lost (%s); reconnecting.", recipient, e)
+                    await asyncio.sleep(1.0)
+
+        self._subscribers.append(self._loop.submit(listen()))
+
+    # --- Lifecycle ---
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Waits until every outbox is empty (sent and acked or dead-lettered)."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if all(queue.empty() for queue in list(self._outboxes.values())) and not self._pending:
+                return True
+            time.sleep(0.01)
+        return False
+
+    def close(self):
+        self.flush(timeout=2.0)
+        self._loop.stop()
+
+    def stats(self) -> dict:
+        stats = self._stats.snapshot()
+        stats["queue_depth"] = sum(queue.qsize() for queue in list(self._outboxes.values()))
+        return stats
+
+    @property
+    def dead_letters(self) -> list:
+        return list(self._stats.dead_letters)
+
+
+# --- Process-wide Transport ---
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    """The transport selected by BURNOUT_TRANSPORT ("inprocess", "unix"), or None."""
+    global _transport
+    if _transport is None and config.TRANSPORT in ("inprocess", "unix"):
+        with _transport_lock:
+            if _transport is None:
+                _transport = InProcessTransport() if config.TRANSPORT == "inprocess" else UnixSocketTransport()
+                atexit.register(_transport.close)
+                from agents import metrics
+                metrics.REGISTRY.register_callback(
+                    "burnout_transport", "Supervisor/worker message transport counters.", _transport.stats)
+    return _transport
+
+
+def current_transport():
+    """The transport if get_transport() has built one, else None (never builds it)."""
+    return _transport
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    broker = sub.add_parser("broker", help="run a Unix-socket broker")
+    broker.add_argument("--socket", default=config.TRANSPORT_SOCKET)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(UnixSocketBroker(args.socket).serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
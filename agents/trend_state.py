@@ -0,0 +1,288 @@
+"""
+Incremental per-employee trend state.
+
+Each employee gets a small rolling summary of their LTM: the last
+TREND_WINDOW risk levels, an EWMA of stress / work hours / sleep, and a
+counter of consecutive medium-or-high results. It is updated in O(1) as
+each task completes, so the trend rule never has to walk history.
+
+Rebuild from an existing LTM folder with:
+    python -m agents.trend_state LTM/WorkerAgent_BurnoutPrevention
+"""
+import atexit
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+from agents import config
+from agents.ltm_store import entry_employee_id
+
+logger = logging.getLogger(__name__)
+
+ELEVATED_RISKS = ("medium", "high")
+STATE_VERSION = 1
+
+
+def _number(value, default: float) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class EmployeeTrend:
+    """Rolling state for one employee."""
+
+    __slots__ = ("recent_risks", "ewma_stress", "ewma_hours", "ewma_sleep",
+                 "consecutive_elevated", "count", "last_timestamp")
+
+    def __init__(self, window: int = None):
+        self.recent_risks = deque(maxlen=window or config.TREND_WINDOW)
+        self.ewma_stress = None
+        self.ewma_hours = None
+        self.ewma_sleep = None
+        self.consecutive_elevated = 0
+        self.count = 0
+        self.last_timestamp = None
+
+    def update(self, input_data: dict, risk: str, timestamp: str = None, alpha: float = None):
+        """Folds one completed task into the state."""
+        alpha = config.TREND_EWMA_ALPHA if alpha is None else alpha
+        samples = (
+            ("ewma_stress", _number(input_data.get('stress'), 0.0)),
+            ("ewma_hours", _number(input_data.get('work_hours'), 0.0)),
+            ("ewma_sleep", _number(input_data.get('sleep_hours'), 7.0)),
+        )
+        for name, value in samples:
+            previous = getattr(self, name)
+            setattr(self, name, value if previous is None else alpha * value + (1 - alpha) * previous)
+
+        self.recent_risks.append(risk)
+        self.consecutive_elevated = self.consecutive_elevated + 1 if risk in ELEVATED_RISKS else 0
+        self.count += 1
+        if timestamp:
+            self.last_timestamp = timestamp
+
+    def update_from_entry(self, entry: dict, alpha: float = None):
+        self.update(entry.get('input_data', {}),
+                    entry.get('final_response', {}).get('risk_level'),
+                    entry.get('timestamp'), alpha)
+
+    def copy(self) -> "EmployeeTrend":
+        clone = EmployeeTrend(self.recent_risks.maxlen)
+        clone.recent_risks.extend(self.recent_risks)
+        for name in self.__slots__[1:]:
+            setattr(clone, name, getattr(self, name))
+        return clone
+
+    def to_dict(self) -> dict:
+        out = {name: getattr(self, name) for name in self.__slots__[1:]}
+        out["recent_risks"] = list(self.recent_risks)
+        return out
+
+    @classmethod
+    def from_dict(cls, data: dict, window: int = None) -> "EmployeeTrend":
+        trend = cls(window)
+        trend.recent_risks.extend(data.get("recent_risks", []))
+        for name in cls.__slots__[1:]:
+            if name in data:
+                setattr(trend, name, data[name])
+        return trend
+
+
+def trend_from_entries(entries, window: int = None, alpha: float = None) -> EmployeeTrend:
+    """Builds an EmployeeTrend by folding entries (oldest first)."""
+    trend = EmployeeTrend(window)
+    for entry in entries:
+        trend.update_from_entry(entry, alpha)
+    return trend
+
+
+def trend_detected(trend: EmployeeTrend, window: int = None) -> bool:
+    """
+    The trend rule: the last `window` results were all medium or high, or
+    (when BURNOUT_TREND_EWMA_STRESS is set) smoothed stress has stayed at
+    or above that level over at least `window` reports.
+    """
+    if trend is None:
+        return False
+    window = window or config.TREND_WINDOW
+    if trend.consecutive_elevated >= window:
+        return True
+    threshold = config.TREND_EWMA_STRESS
+    return bool(threshold) and trend.count >= window and (trend.ewma_stress or 0) >= threshold
+
+
+class TrendTracker:
+    """
+    employee_id -> EmployeeTrend for a whole LTM, kept in memory, updated on
+    every write and saved as JSON. After start_autosave() it is saved every
+    TREND_SAVE_INTERVAL seconds from a background thread and at exit, never
+    on a write. Only valid for stores written by this process alone.
+    """
+
+    def __init__(self, path: str = None, window: int = None, alpha: float = None,
+                 save_interval: float = None):
+        self.path = path
+        self.window = window or config.TREND_WINDOW
+        self.alpha = config.TREND_EWMA_ALPHA if alpha is None else alpha
+        self.save_interval = config.TREND_SAVE_INTERVAL if save_interval is None else save_interval
+
+        self._trends = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._save_job = None
+        self.entries = 0  # LTM entries folded in so far
+
+    def build(self, entries, seeds: dict = None):
+        """
+        (Re)builds every employee's state from LTM entries, oldest first.
+        `seeds` holds the state of entries already compacted out of the LTM
+        (see agents/ltm_compaction.py); raw entries are folded on top.
+        """
+        trends = {}
+        count = 0
+        for entry in entries:
+            employee_id = entry_employee_id(entry)
+            trend = trends.get(employee_id)
+            if trend is None:
+                seed = (seeds or {}).get(employee_id)
+                trend = trends[employee_id] = (
+                    EmployeeTrend.from_dict(seed.to_dict(), self.window) if seed else EmployeeTrend(self.window))
+            trend.update_from_entry(entry, self.alpha)
+            count += 1
+        for employee_id, seed in (seeds or {}).items():
+            if employee_id not in trends:
+                trends[employee_id] = EmployeeTrend.from_dict(seed.to_dict(), self.window)
+        with self._lock:
+            self._trends = trends
+            self.entries = count
+            self._dirty = True
+
+    def update(self, entry: dict):
+        employee_id = entry_employee_id(entry)
+        with self._lock:
+            trend = self._trends.get(employee_id)
+            if trend is None:
+                trend = self._trends[employee_id] = EmployeeTrend(self.window)
+            trend.update_from_entry(entry, self.alpha)
+            self.entries += 1
+            self._dirty = True
+
+    def set_trend(self, employee_id: str, trend: EmployeeTrend):
+        """Installs an employee's state loaded elsewhere (e.g. a snapshot), unless already present."""
+        with self._lock:
+            if employee_id not in self._trends:
+                self._trends[employee_id] = EmployeeTrend.from_dict(trend.to_dict(), self.window)
+
+    def compacted(self, removed: int):
+        """Records that `removed` raw entries were folded out of the LTM."""
+        with self._lock:
+            self.entries -= removed
+            self._dirty = True
+
+    def get(self, employee_id: str) -> EmployeeTrend:
+        """Returns a copy of the employee's state (empty if they have no history)."""
+        with self._lock:
+            trend = self._trends.get(str(employee_id))
+            return trend.copy() if trend else EmployeeTrend(self.window)
+
+    def __len__(self):
+        return len(self._trends)
+
+    # --- Persistence ---
+
+    def start_autosave(self):
+        """Saves every save_interval seconds from a background thread, and at exit."""
+        if self.path and self._save_job is None:
+            if self.save_interval > 0:
+                from agents.ltm_compaction import PeriodicJob  # ltm_compaction imports this module
+                self._save_job = PeriodicJob(self.save, self.save_interval, name="trend-state-save").start()
+            atexit.register(self.save)
+        return self
+
+    def close(self):
+        """Stops the background save and writes any pending changes."""
+        if self._save_job is not None:
+            self._save_job.stop()
+            self._save_job = None
+        self.save()
+
+    def save(self):
+        """Writes the state to `path` atomically. Concurrent callers skip."""
+        if not self.path or not self._save_lock.acquire(blocking=False):
+            return
+        try:
+            with self._lock:
+                if not self._dirty:
+                    return
+                snapshot = {
+                    "version": STATE_VERSION,
+                    "window": self.window,
+                    "alpha": self.alpha,
+                    "entries": self.entries,
+                    "employees": {eid: trend.to_dict() for eid, trend in self._trends.items()},
+                }
+                self._dirty = False
+            tmp_path = self.path + ".tmp"
+            try:
+                with open(tmp_path, "w") as f:
+                    json.dump(snapshot, f, separators=(",", ":"))
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logger.warning("[TrendState] could not save %s: %s", self.path, e)
+        finally:
+            self._save_lock.release()
+
+    def load(self) -> bool:
+        """
+        Loads a saved state. Returns False (leaving the tracker empty) when
+        there is none or it was written with a different window or decay.
+        """
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("[TrendState] could not load %s: %s", self.path, e)
+            return False
+        if (data.get("version") != STATE_VERSION or data.get("window") != self.window
+                or data.get("alpha") != self.alpha):
+            logger.info("[TrendState] %s was built with other settings; rebuilding.", self.path)
+            return False
+        with self._lock:
+            self._trends = {eid: EmployeeTrend.from_dict(d, self.window)
+                            for eid, d in data.get("employees", {}).items()}
+            self.entries = data.get("entries", 0)
+            self._dirty = False
+        return True
+
+
+def rebuild(ltm_dir: str) -> TrendTracker:
+    """Rebuilds and saves <ltm_dir>/trend_state.json from the LTM in that folder."""
+    from agents.ltm_compaction import load_trend_seeds
+    from agents.ltm_store import create_ltm_store
+    store = create_ltm_store(ltm_dir)
+    try:
+        tracker = TrendTracker(os.path.join(ltm_dir, config.TREND_STATE_FILE))
+        tracker.build(store.iter_all(), load_trend_seeds(ltm_dir))
+        tracker.save()
+        return tracker
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit(2)
+    started = time.perf_counter()
+    result = rebuild(sys.argv[1])
+    print(f"Rebuilt trend state for {len(result)} employees from {result.entries} entries "
+          f"in {(time.perf_counter() - started) * 1000:.1f} ms -> {result.path}")
@@ -0,0 +1,129 @@
+import json
+import uuid
+from datetime import datetime
+
+from agents.ltm_store import entry_employee_id
+
+# BURNOUT_CHROMA_MODE -> collection. Modes store different kinds of vectors,
+# so each gets its own collection.
+COLLECTIONS = {
+    "full": "burnout_memory",       # whole entry as JSON, embedded (original layout)
+    "summary": "burnout_summaries",  # short factors + suggestion text, embedded
+    "metadata": "burnout_features",  # no text; a small numeric vector, no embedding model
+}
+RISK_SCORES = {"low": 0, "medium": 1, "high": 2}
+NEGATIVE_MOODS = ("anxious", "frustrated")
+
+
+def collection_name(mode: str) -> str:
+    return COLLECTIONS.get(mode, COLLECTIONS["summary"])
+
+
+def _number(value, default: float) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _epoch(timestamp) -> float:
+    try:
+        return datetime.fromisoformat(str(timestamp)).timestamp()
+    except ValueError:
+        return 0.0
+
+
+def summary_text(entry: dict) -> str:
+    """The short text embedded in "summary" mode: risk, factors and suggestion."""
+    response = entry.get('final_response', {})
+    factors = ", ".join(sorted(response.get('key_factors', [])))
+    return (f"risk: {response.get('risk_level', 'unknown')}; factors: {factors}; "
+            f"suggestion: {response.get('empathetic_suggestion', '')}")
+
+
+def feature_vector(entry: dict) -> list:
+    """Numeric stand-in for an embedding: inputs plus risk, comparable by L2 distance."""
+    data = entry.get('input_data', {})
+    response = entry.get('final_response', {})
+    return [
+        _number(data.get('stress'), 0.0),
+        _number(data.get('work_hours'), 0.0),
+        _number(data.get('sleep_hours'), 7.0),
+        1.0 if data.get('mood') in NEGATIVE_MOODS else 0.0,
+        float(RISK_SCORES.get(response.get('risk_level'), 0)),
+    ]
+
+
+def record_metadata(entry: dict) -> dict:
+    """Filterable fields (Chroma metadata only takes str / int / float / bool)."""
+    data = entry.get('input_data', {})
+    response = entry.get('final_response', {})
+    timestamp = entry.get('timestamp', "")
+    return {
+        "risk": response.get('risk_level', 'unknown'),
+        "user": entry_employee_id(entry),
+        "stress": _number(data.get('stress'), 0.0),
+        "work_hours": _number(data.get('work_hours'), 0.0),
+        "sleep_hours": _number(data.get('sleep_hours'), 7.0),
+        "mood": str(data.get('mood', 'ok')),
+        "is_trend": bool(response.get('is_trend', False)),
+        "factors": ",".join(sorted(response.get('key_factors', []))),
+        "timestamp": str(timestamp),
+        "ts": _epoch(timestamp),
+    }
+
+
+def new_entry_id() -> str:
+    """Id given to each LTM entry when it is written; also its Chroma record id."""
+    return str(uuid.uuid4())
+
+
+def build_record(entry: dict, mode: str) -> tuple:
+    """Returns the (document, metadata, id, embedding) stored for an LTM entry."""
+    metadata = record_metadata(entry)
+    # The entry's own id (see new_entry_id), so a query can recognise its source record
+    doc_id = str(entry.get('id') or uuid.uuid4())
+    if mode == "full":
+        return json.dumps(entry), metadata, doc_id, None
+    if mode == "metadata":
+        return None, metadata, doc_id, feature_vector(entry)
+    return summary_text(entry), metadata, doc_id, None
+
+
+def where_clause(employee_id: str = None, exclude_employee: str = None, risk: str = None,
+                 since: float = None, until: float = None) -> dict:
+    """Builds a Chroma `where` filter from the given conditions (None = no filter)."""
+    conditions = []
+    if employee_id is not None:
+        conditions.append({"user": str(employee_id)})
+    if exclude_employee is not None:
+        conditions.append({"user": {"$ne": str(exclude_employee)}})
+    if risk is not None:
+        conditions.append({"risk": risk})
+    if since is not None:
+        conditions.append({"ts": {"$gte": float(since)}})
+    if until is not None:
+        conditions.append({"ts": {"$lt": float(until)}})
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+
+def to_case(metadata: dict, document: str = None, distance: float = None) -> dict:
+    """Turns a stored record back into a plain result dict."""
+    case = {
+        "employee_id": metadata.get("user"),
+        "risk_level": metadata.get("risk"),
+        "key_factors": [f for f in metadata.get("factors", "").split(",") if f],
+        "stress": metadata.get("stress"),
+        "work_hours": metadata.get("work_hours"),
+        "sleep_hours": metadata.get("sleep_hours"),
+        "mood": metadata.get("mood"),
+        "is_trend": metadata.get("is_trend"),
+        "timestamp": metadata.get("timestamp"),
+    }
+    if distance is not None:
+        case["distance"] = round(float(distance), 6)
+    if document and not document.startswith("{"):
+        case["summary"] = document
+    return case
@@ -0,0 +1,168 @@
+import logging
+import queue
+import threading
+import time
+
+from agents import config, metrics
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class ChromaBatchWriter:
+    """
+    Moves ChromaDB writes off the request path.
+
+    Requests drop (document, metadata, id[, embedding]) records into a bounded queue; a
+    background thread groups them and calls collection.add() once per batch
+    (when batch_size is reached or flush_interval elapses). A full queue
+    blocks the caller for up to put_timeout seconds (backpressure) and the
+    record is dropped after that rather than stalling the request forever.
+    """
+
+    def __init__(self, collection, max_queue: int = None, batch_size: int = None,
+                 flush_interval: float = None, put_timeout: float = None):
+        self.collection = collection
+        self.batch_size = batch_size or config.CHROMA_BATCH_SIZE
+        self.flush_interval = flush_interval or config.CHROMA_FLUSH_INTERVAL
+        self.put_timeout = put_timeout if put_timeout is not None else config.CHROMA_PUT_TIMEOUT
+        self._queue = queue.Queue(maxsize=max_queue or config.CHROMA_QUEUE_SIZE)
+
+        self._stats_lock = threading.Lock()
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.max_depth = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="chroma-writer", daemon=True)
+        self._thread.start()
+
+    # --- Producer side ---
+
+    def submit(self, document: str, metadata: dict, doc_id: str, embedding: list = None) -> bool:
+        """
+        Queues one record. Returns False if it was dropped (queue full or closed).
+        With an embedding, Chroma stores it as-is instead of running its
+        embedding function (document may then be None).
+        """
+        if self._closed:
+            return False
+        try:
+            self._queue.put((document, metadata, doc_id, embedding), timeout=self.put_timeout)
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+            logger.warning("[ChromaWriter] queue full, dropped a vector write.")
+            return False
+        with self._stats_lock:
+            self.enqueued += 1
+            self.max_depth = max(self.max_depth, self._queue.qsize())
+        return True
+
+    def submit_many(self, records: list) -> int:
+        """Queues several (document, metadata, id[, embedding]) records. Returns how many were accepted."""
+        return sum(self.submit(*record) for record in records)
+
+    # --- Consumer side ---
+
+    def _run(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                self._write(batch)
+                self._queue.task_done()
+                return
+
+            if item is not None:
+                if isinstance(item, threading.Event):
+                    # flush() request: write what we have, then wake the caller
+                    self._write(batch)
+                    batch, deadline = [], None
+                    item.set()
+                    self._queue.task_done()
+                    continue
+                batch.append(item)
+                self._queue.task_done()
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._write(batch)
+                batch, deadline = [], None
+
+    def _write(self, batch: list):
+        if not batch:
+            return
+        start = time.perf_counter()
+        try:
+            kwargs = {
+                "metadatas": [meta for _, meta, _, _ in batch],
+                "ids": [doc_id for _, _, doc_id, _ in batch],
+            }
+            if any(doc is not None for doc, _, _, _ in batch):
+                kwargs["documents"] = [doc or "" for doc, _, _, _ in batch]
+            if batch[0][3] is not None:
+                kwargs["embeddings"] = [embedding for _, _, _, embedding in batch]
+            self.collection.add(**kwargs)
+            ok = True
+        except Exception as e:
+            ok = False
+            logger.error("[ChromaWriter] ERROR writing batch of %d: %s", len(batch), e)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        metrics.LTM_DURATION.observe(elapsed_ms, op="chroma_add")
+        with self._stats_lock:
+            if ok:
+                self.written += len(batch)
+            else:
+                self.failed += len(batch)
+            self.batches += 1
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self._total_flush_ms += elapsed_ms
+
+    # --- Lifecycle ---
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Blocks until everything queued so far has been written."""
+        if self._closed:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 10.0):
+        """Writes the remaining records and stops the worker thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self.max_depth,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "batches": self.batches,
+                "last_flush_ms": round(self.last_flush_ms, 3),
+                "max_flush_ms": round(self.max_flush_ms, 3),
+                "avg_flush_ms": round(self._total_flush_ms / self.batches, 3) if self.batches else 0.0,
+            }
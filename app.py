@@ -1,24 +1,61 @@
 import logging
-from flask import Flask, jsonify, request, render_template
-from agents.burnout_agent import BurnoutPreventionAgent
+import time
+from flask import Flask, Response, g, jsonify, request, render_template, stream_with_context
+from agents import config, llm_guard, metrics, startup_timing
+from agents.admission import AdmissionController, Overloaded
+from agents.idempotency import IdempotencyConflict
+from agents.log_setup import configure_logging
+from agents.startup_timing import timed
+with timed("import:agents.burnout_agent"):
+    from agents.burnout_agent import BurnoutPreventionAgent
 import uuid
 import json
 from datetime import datetime
 
 # --- 1. Setup Logging (Rubric: Logging & Health Check) ---
-# This configures the system to save logs to 'agent.log'
-logging.basicConfig(
-    filename='agent.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+# Structured JSON lines in 'agent.log' (size-rotated), written by a
+# background thread so request handlers never block on log I/O.
+configure_logging()
 
 app = Flask(__name__)
 
 # --- 2. Initialize Agent ---
 SUPERVISOR_ID = "SupervisorAgent_Main"
 AGENT_ID = "WorkerAgent_BurnoutPrevention"
-agent = BurnoutPreventionAgent(agent_id=AGENT_ID, supervisor_id=SUPERVISOR_ID)
+with timed("init:agent"):
+    if config.SHARDS:
+        # Worker processes each own a partition of employees (see agents/sharding.py)
+        from agents.sharding import ShardRouter
+        agent = ShardRouter(agent_id=AGENT_ID, supervisor_id=SUPERVISOR_ID)
+    else:
+        agent = BurnoutPreventionAgent(agent_id=AGENT_ID, supervisor_id=SUPERVISOR_ID)
+
+# Build the lazy components now instead of on the first request
+if config.WARM_UP in ("full", "pre_fork"):
+    agent.warm_up(pre_fork=(config.WARM_UP == "pre_fork"))
+    logging.info("Startup timing:\n%s", startup_timing.format_report())
+
+# Also take task assignments over the supervisor/worker transport, if one is configured
+if agent.transport is not None:
+    agent.listen()
+
+# Bounded, prioritised fast/deep lanes in front of process_task (see agents/admission.py)
+admission = AdmissionController() if config.ADMISSION_ENABLED else None
+
+# --- Request Instrumentation ---
+@app.before_request
+def _start_timer():
+    g.endpoint_label = request.url_rule.rule if request.url_rule else "unmatched"
+    g.start_time = time.perf_counter()
+    metrics.REQUESTS_IN_FLIGHT.inc(endpoint=g.endpoint_label)
+
+@app.teardown_request
+def _stop_timer(exc):
+    if "start_time" not in g:
+        return
+    metrics.REQUESTS_IN_FLIGHT.dec(endpoint=g.endpoint_label)
+    metrics.REQUEST_DURATION.observe(
+        (time.perf_counter() - g.start_time) * 1000, endpoint=g.endpoint_label)
 
 @app.route("/")
 def home():
@@ -35,10 +72,34 @@ def get_status():
         "agent_name": AGENT_ID,
         "timestamp": datetime.now().isoformat()
     }
+    status_info.update(agent.runtime_stats())
+    status_info.update(metrics.status_snapshot())
+    if admission is not None:
+        status_info["admission"] = admission.stats()
+    status_info["startup_ms"] = startup_timing.report()
     # Log the health check
-    logging.info(f"Health check requested. Status: {status_info['status']}")
+    logging.info("Health check requested. Status: %s", status_info['status'])
     return jsonify(status_info), 200
 
+def build_report(related_msg_id, status, results):
+    """Wraps agent results in the MAS completion_report envelope."""
+    return {
+        "message_id": str(uuid.uuid4()),
+        "sender": AGENT_ID,
+        "recipient": SUPERVISOR_ID,
+        "type": "completion_report",
+        "related_message_id": related_msg_id,
+        "status": status,
+        "results": results,
+        "timestamp": datetime.now().isoformat()
+    }
+
+# --- Metrics Endpoint (Prometheus text format) ---
+@app.route("/metrics", methods=['GET'])
+def get_metrics():
+    """Node, LLM, LTM and request metrics for Prometheus to scrape."""
+    return Response(metrics.REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
 # --- Main Task Endpoint ---
 @app.route("/task", methods=['POST'])
 @app.route("/api/v1/task", methods=['POST'])
@@ -49,55 +110,151 @@ def handle_task():
     """
     try:
         task_message = request.json
+        # deadline_ms counts from arrival, before any time spent queued in Flask
+        deadline = llm_guard.parse_deadline(task_message)
         
         # Log the incoming request
-        logging.info(f"Received Task: {json.dumps(task_message)}")
+        logging.info("Received Task", extra={"task_message": task_message})
 
         task_params = task_message.get("task", {}).get("parameters", {})
         related_msg_id = task_message.get("message_id")
 
-        # Run the agent logic
-        results = agent.process_task(task_params)
-        status = "SUCCESS"
-
-        # Create report
-        report = {
-            "message_id": str(uuid.uuid4()),
-            "sender": AGENT_ID,
-            "recipient": SUPERVISOR_ID,
-            "type": "completion_report",
-            "related_message_id": related_msg_id,
-            "status": status,
-            "results": results,
-            "timestamp": datetime.now().isoformat()
-        }
+        def run():
+            # Run the agent logic and create the report
+            if admission is None:
+                results = agent.process_task(task_params, deadline=deadline)
+            else:
+                lane, priority = agent.triage(task_params)
+                results = admission.run(
+                    lane, priority, lambda: agent.process_task(task_params, deadline=deadline), deadline)
+            return build_report(related_msg_id, "SUCCESS", results)
+
+        # A retried message_id gets its original report (see agents/idempotency.py)
+        store = agent.idempotency
+        if store is not None and related_msg_id:
+            report, replayed = store.run(related_msg_id, run, task_params)
+        else:
+            report, replayed = run(), False
+        if replayed:
+            logging.info("Duplicate message_id %s answered with its stored report", related_msg_id)
 
         # Log the successful completion
-        logging.info(f"Task Completed. Result Risk: {results.get('risk_level')}")
+        logging.info("Task Completed. Result Risk: %s", report['results'].get('risk_level'))
         
         return jsonify(report), 200
 
+    except IdempotencyConflict as e:
+        logging.warning("Task Rejected: %s", e)
+        return jsonify({"status": "FAILURE", "error": str(e)}), 409
+
+    except Overloaded as e:
+        logging.warning("Task Shed: %s", e)
+        return jsonify({"status": "FAILURE", "error": str(e)}), 429, {"Retry-After": str(e.retry_after)}
+
     except Exception as e:
         error_msg = str(e)
-        logging.error(f"Task Failed: {error_msg}")
-        import traceback
-        logging.error(traceback.format_exc())
+        logging.exception("Task Failed: %s", error_msg)
         return jsonify({"status": "FAILURE", "error": error_msg}), 500
 
+# --- Batch Task Endpoint ---
+@app.route("/api/v1/tasks/batch", methods=['POST'])
+def handle_task_batch():
+    """
+    Receives many task messages at once, e.g. a whole department.
+    Body: {"tasks": [<task message>, ...]} (or just the list).
+    Returns a list of completion reports in input order.
+    """
+    try:
+        body = request.json
+        task_messages = body.get("tasks", []) if isinstance(body, dict) else body
+
+        logging.info("Received Batch: %d tasks", len(task_messages))
+
+        task_params = [m.get("task", {}).get("parameters", {}) for m in task_messages]
+        results = agent.process_batch(task_params)
+
+        reports = [
+            build_report(message.get("message_id"), "SUCCESS", result)
+            for message, result in zip(task_messages, results)
+        ]
+
+        logging.info("Batch Completed. %d reports.", len(reports))
+        return jsonify(reports), 200
+
+    except Exception as e:
+        error_msg = str(e)
+        logging.exception("Batch Failed: %s", error_msg)
+        return jsonify({"status": "FAILURE", "error": error_msg}), 500
+
+# --- Similar Cases Endpoint ---
+@app.route("/api/v1/employees/<employee_id>/similar", methods=['GET'])
+def get_similar_cases(employee_id):
+    """Past cases closest to the employee's latest entry (?k=5&others=1&risk=high)."""
+    try:
+        cases = agent.find_similar_cases(
+            employee_id,
+            k=request.args.get("k", 5, type=int),
+            other_employees=request.args.get("others", "0") in ("1", "true"),
+            **({"risk": request.args["risk"]} if "risk" in request.args else {})
+        )
+        return jsonify({"employee_id": employee_id, "cases": cases}), 200
+    except Exception as e:
+        logging.exception("Similar Cases Error: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+# --- Team / Org Rollups Endpoint ---
+@app.route("/api/v1/rollups", methods=['GET'])
+def get_rollups():
+    """Precomputed risk rollups for the org, or one team (?team_id=eng&buckets=7)."""
+    try:
+        team_id = request.args.get("team_id")
+        rollup = agent.team_rollup(team_id, buckets=request.args.get("buckets", type=int))
+        if rollup is None:
+            return jsonify({"error": f"unknown team_id '{team_id}'"}), 404
+        return jsonify(rollup), 200
+    except Exception as e:
+        logging.exception("Rollups Error: %s", e)
+        return jsonify({"error": str(e)}), 500
+
 # --- Demo Endpoint ---
 @app.route("/demo", methods=['POST'])
 def run_demo():
     """Endpoint specifically for the HTML frontend."""
     try:
         data = request.json
-        logging.info(f"Demo Request: {data.get('employee_id')}")
+        logging.info("Demo Request: %s", data.get('employee_id'))
         results = agent.process_task(data)
         return jsonify(results), 200
     except Exception as e:
-        logging.error(f"Demo Error: {e}")
+        logging.exception("Demo Error: %s", e)
         return jsonify({"error": str(e)}), 500
 
+# --- Streaming Demo Endpoint (Server-Sent Events) ---
+@app.route("/demo/stream", methods=['POST'])
+def run_demo_stream():
+    """
+    Same input as /demo, but streams the result as SSE events:
+    'analysis' (risk + factors), 'token' (response text chunks), 'final'.
+    """
+    data = request.json
+    logging.info("Demo Stream Request: %s", data.get('employee_id'))
+
+    def events():
+        try:
+            for event, payload in agent.stream_task(data):
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        except Exception as e:
+            logging.exception("Demo Stream Error: %s", e)
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 if __name__ == '__main__':
     print("--- Burnout Prevention Agent Started on Port 5001 ---")
     print("--- Logs are being saved to 'agent.log' ---")
-    app.run(debug=True, port=5001)
\ No newline at end of file
+    # The reloader would start a second router with its own shard workers
+    app.run(debug=True, port=5001, use_reloader=not config.SHARDS)
\ No newline at end of file
@@ -0,0 +1,180 @@
+"""
+Async (ASGI) serving mode for the Burnout Prevention Agent.
+
+Same task protocol as app.py, but each request is a coroutine: the graph
+runs through ainvoke(), Gemini calls are awaited (capped by
+BURNOUT_LLM_MAX_CONCURRENCY) and LTM writes happen in a worker thread.
+A handful of slow LLM responses no longer pins the server's threads.
+
+Run with:
+    uvicorn asgi:app --port 5001
+"""
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+
+from agents import llm_guard, metrics
+from agents.admission import Overloaded
+from agents.idempotency import IdempotencyConflict
+
+# Reuse the Flask app's agent instance, admission lanes and report envelope
+from app import admission, agent, build_report, AGENT_ID
+
+
+async def _read_body(receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body", False):
+            return body
+
+
+async def _send_json(send, status: int, payload, headers: dict = None):
+    body = json.dumps(payload).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ] + [(name.lower().encode(), str(value).encode()) for name, value in (headers or {}).items()],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_text(send, status: int, text: str, content_type: bytes):
+    body = text.encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", content_type),
+            (b"content-length", str(len(body)).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+# --- Handlers ---
+
+async def get_status(body: bytes):
+    """Returns the health status of the agent."""
+    status_info = {
+        "status": "online",
+        "agent_name": AGENT_ID,
+        "mode": "asgi",
+        "timestamp": datetime.now().isoformat()
+    }
+    status_info.update(agent.runtime_stats())
+    status_info.update(metrics.status_snapshot())
+    if admission is not None:
+        status_info["admission"] = admission.stats()
+    logging.info("Health check requested. Status: %s", status_info['status'])
+    return 200, status_info
+
+
+async def handle_task(body: bytes):
+    """Async twin of app.handle_task."""
+    try:
+        task_message = json.loads(body or b"{}")
+        deadline = llm_guard.parse_deadline(task_message)
+        logging.info("Received Task", extra={"task_message": task_message})
+
+        task_params = task_message.get("task", {}).get("parameters", {})
+        related_msg_id = task_message.get("message_id")
+
+        async def run():
+            if admission is None:
+                results = await agent.aprocess_task(task_params, deadline=deadline)
+            else:
+                # May load the employee's trend state (or ask a shard for it)
+                lane, priority = await asyncio.to_thread(agent.triage, task_params)
+                results = await admission.arun(
+                    lane, priority, lambda: agent.aprocess_task(task_params, deadline=deadline), deadline)
+            return build_report(related_msg_id, "SUCCESS", results)
+
+        store = agent.idempotency
+        if store is not None and related_msg_id:
+            report, replayed = await store.arun(related_msg_id, run, task_params)
+        else:
+            report, replayed = await run(), False
+        if replayed:
+            logging.info("Duplicate message_id %s answered with its stored report", related_msg_id)
+
+        logging.info("Task Completed. Result Risk: %s", report['results'].get('risk_level'))
+        return 200, report
+
+    except IdempotencyConflict as e:
+        logging.warning("Task Rejected: %s", e)
+        return 409, {"status": "FAILURE", "error": str(e)}
+
+    except Overloaded as e:
+        logging.warning("Task Shed: %s", e)
+        return 429, {"status": "FAILURE", "error": str(e)}, {"Retry-After": e.retry_after}
+
+    except Exception as e:
+        error_msg = str(e)
+        logging.exception("Task Failed: %s", error_msg)
+        return 500, {"status": "FAILURE", "error": error_msg}
+
+
+async def run_demo(body: bytes):
+    """Async twin of app.run_demo."""
+    try:
+        data = json.loads(body or b"{}")
+        logging.info("Demo Request: %s", data.get('employee_id'))
+        results = await agent.aprocess_task(data)
+        return 200, results
+    except Exception as e:
+        logging.exception("Demo Error: %s", e)
+        return 500, {"error": str(e)}
+
+
+ROUTES = {
+    ("GET", "/status"): get_status,
+    ("GET", "/api/v1/status"): get_status,
+    ("POST", "/task"): handle_task,
+    ("POST", "/api/v1/task"): handle_task,
+    ("POST", "/demo"): run_demo,
+}
+
+
+# --- ASGI Entry Point ---
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                agent.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    if scope["type"] != "http":
+        return
+
+    if scope["method"] == "GET" and scope["path"] == "/metrics":
+        await _send_text(send, 200, metrics.REGISTRY.render(), b"text/plain; version=0.0.4")
+        return
+
+    handler = ROUTES.get((scope["method"], scope["path"]))
+    if handler is None:
+        await _send_json(send, 404, {"error": f"No route for {scope['method']} {scope['path']}"})
+        return
+
+    endpoint = scope["path"]
+    start = time.perf_counter()
+    metrics.REQUESTS_IN_FLIGHT.inc(endpoint=endpoint)
+    try:
+        body = await _read_body(receive)
+        # Handlers return (status, payload) or (status, payload, headers)
+        status, payload, *headers = await handler(body)
+        await _send_json(send, status, payload, *headers)
+    finally:
+        metrics.REQUESTS_IN_FLIGHT.dec(endpoint=endpoint)
+        metrics.REQUEST_DURATION.observe((time.perf_counter() - start) * 1000, endpoint=endpoint)
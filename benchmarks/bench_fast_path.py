@@ -0,0 +1,140 @@
+"""
+Graph-free fast path benchmark.
+
+Runs the same task states through the workflow twice: through the full
+LangGraph app (BURNOUT_FAST_PATH_DIRECT=0) and through the direct path,
+first checking that every final_response serializes to identical bytes,
+then timing both for low-risk-only and mixed workloads. Uses the stub LLM,
+so it needs no network and no API key.
+
+Usage:
+    python -m benchmarks.bench_fast_path --requests 5000
+    python -m benchmarks.bench_fast_path --mix 0.3 --json fast_path.json
+"""
+import argparse
+import copy
+import json
+import os
+import random
+import sys
+import time
+
+# Must be set before the agents package reads its config
+os.environ.setdefault("BURNOUT_CHROMA_ENABLED", "0")
+os.environ.setdefault("BURNOUT_WARM_UP", "off")
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+from agents import config  # noqa: E402
+from agents import burnout_graph  # noqa: E402
+from agents.burnout_graph import BurnoutState  # noqa: E402
+from benchmarks.harness import make_task, quiet, summarize  # noqa: E402
+from benchmarks.stub_llm import install_stub  # noqa: E402
+
+
+def low_risk_task(rng: random.Random, employees: int) -> dict:
+    """Parameters that trip none of the risk rules."""
+    return {
+        "employee_id": f"bench_emp_{rng.randrange(employees)}",
+        "stress": rng.randint(1, 4),
+        "work_hours": rng.randint(4, 8),
+        "sleep_hours": rng.randint(6, 9),
+        "mood": rng.choice(["happy", "ok", "tired"]),
+    }
+
+
+def make_state(task: dict) -> BurnoutState:
+    return BurnoutState(
+        input_data=task,
+        history=[],
+        trend=None,
+        deadline=None,
+        burnout_risk="unknown",
+        is_trend=False,
+        key_factors=[],
+        empathetic_response="",
+        actionable_steps=[],
+        conversation_starter="",
+        recommendation="",
+        final_response={},
+        response_meta={}
+    )
+
+
+def run_mode(direct: bool, tasks: list) -> tuple:
+    """Returns (per-request latencies in ms, serialized final_responses)."""
+    config.FAST_PATH_DIRECT = direct
+    latencies, outputs = [], []
+    for task in tasks:
+        state = make_state(copy.deepcopy(task))
+        start = time.perf_counter()
+        final_state = burnout_graph.run_workflow(state)
+        latencies.append((time.perf_counter() - start) * 1000)
+        outputs.append(json.dumps(final_state['final_response']).encode("utf-8"))
+    return latencies, outputs
+
+
+def bench(name: str, tasks: list, warmup: int) -> dict:
+    # Build both graphs and fill the response cache before timing
+    run_mode(False, tasks[:warmup])
+    run_mode(True, tasks[:warmup])
+
+    graph_ms, graph_out = run_mode(False, tasks)
+    direct_ms, direct_out = run_mode(True, tasks)
+    mismatches = sum(a != b for a, b in zip(graph_out, direct_out))
+
+    graph_total, direct_total = sum(graph_ms), sum(direct_ms)
+    return {
+        "workload": name,
+        "requests": len(tasks),
+        "identical_output": mismatches == 0,
+        "mismatches": mismatches,
+        "graph": {**summarize(graph_ms), "throughput_rps": round(len(tasks) / (graph_total / 1000), 1)},
+        "direct": {**summarize(direct_ms), "throughput_rps": round(len(tasks) / (direct_total / 1000), 1)},
+        "speedup": round(graph_total / direct_total, 2) if direct_total else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per workload")
+    parser.add_argument("--employees", type=int, default=1000)
+    parser.add_argument("--mix", type=float, default=0.5,
+                        help="fraction of random (mostly deep-path) tasks in the mixed workload")
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="stub LLM latency in seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    install_stub(latency=args.llm_latency, seed=args.seed)
+    rng = random.Random(args.seed)
+    low = [low_risk_task(rng, args.employees) for _ in range(args.requests)]
+    mixed = [make_task(rng, args.employees) if rng.random() < args.mix else low_risk_task(rng, args.employees)
+             for _ in range(args.requests)]
+
+    results = []
+    with quiet():
+        for name, tasks in (("low_risk", low), ("mixed", mixed)):
+            results.append(bench(name, tasks, min(args.warmup, len(tasks))))
+
+    for result in results:
+        print(f"\n=== {result['workload']} | requests={result['requests']} | "
+              f"identical_output={result['identical_output']} ===")
+        print(f"{'mode':8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>10}")
+        for mode in ("graph", "direct"):
+            stats = result[mode]
+            print(f"{mode:8} {stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9} "
+                  f"{stats['throughput_rps']:>10}")
+        print(f"speedup: {result['speedup']}x")
+    sys.stdout.flush()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.json}")
+    if not all(result["identical_output"] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import contextlib
+import functools
+import inspect
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# One percentile definition for benchmark reports, /metrics and /api/v1/status
+from agents.metrics import percentile  # noqa: E402,F401
+
+MOODS = ["happy", "ok", "tired", "anxious", "frustrated"]
+
+
+# --- Stats ---
+
+def summarize(samples_ms: list) -> dict:
+    return {
+        "count": len(samples_ms),
+        "p50_ms": round(percentile(samples_ms, 50), 3),
+        "p95_ms": round(percentile(samples_ms, 95), 3),
+        "p99_ms": round(percentile(samples_ms, 99), 3),
+        "max_ms": round(max(samples_ms), 3) if samples_ms else 0.0,
+    }
+
+
+# --- Memory ---
+
+def current_rss_mb() -> float:
+    """Resident set size right now (Linux /proc; falls back to the peak)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / 1024 if os.uname().sysname != "Darwin" else peak / (1024 * 1024)
+
+
+# --- Recording ---
+
+class Recorder:
+    """Thread-safe collection of latency samples and RSS readings per operation."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.rss = {}
+
+    def add(self, name: str, elapsed_ms: float, rss_mb: float = None):
+        with self._lock:
+            self.samples.setdefault(name, []).append(elapsed_ms)
+            if rss_mb is not None:
+                self.rss[name] = max(self.rss.get(name, 0.0), rss_mb)
+
+    def wrap(self, name: str, fn, track_rss: bool = False):
+        """Returns fn wrapped so every call is timed under `name`."""
+        @functools.wraps(fn)
+        def timed_call(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(name, (time.perf_counter() - start) * 1000,
+                         current_rss_mb() if track_rss else None)
+        return timed_call
+
+    def report(self) -> dict:
+        with self._lock:
+            out = {}
+            for name, samples in self.samples.items():
+                out[name] = summarize(samples)
+                if name in self.rss:
+                    out[name]["peak_rss_mb"] = round(self.rss[name], 1)
+            return out
+
+
+def instrument_graph_nodes(recorder: Recorder):
+    """
+    Wraps the graph's node functions with timers. Must run before the graph
+    is first built (it is built lazily), since nodes are bound at build time.
+    """
+    from agents import burnout_graph
+    for name in ("analyze_risk_and_factors", "generate_ai_response",
+                 "agenerate_ai_response", "generate_quick_response", "format_response"):
+        fn = getattr(burnout_graph, name)
+        if inspect.iscoroutinefunction(fn):  # async twin, recorded under the sync name
+            async def timed_async(state, _fn=fn, _name=f"node:{name[1:]}"):
+                start = time.perf_counter()
+                try:
+                    return await _fn(state)
+                finally:
+                    recorder.add(_name, (time.perf_counter() - start) * 1000, current_rss_mb())
+            setattr(burnout_graph, name, functools.wraps(fn)(timed_async))
+        else:
+            setattr(burnout_graph, name, recorder.wrap(f"node:{name}", fn, track_rss=True))
+
+
+def instrument_storage(agent, recorder: Recorder):
+    """Times LTM and vector-store operations on an agent instance."""
+    ltm = agent.ltm
+    ltm.append = recorder.wrap("ltm:append", ltm.append)
+    ltm.append_many = recorder.wrap("ltm:append_many", ltm.append_many)
+    index = agent.history_index
+    index.recent = recorder.wrap("ltm:recent", index.recent)
+    index.add = recorder.wrap("ltm:index_add", index.add)
+    if agent.vector_writer:
+        writer = agent.vector_writer
+        writer.submit = recorder.wrap("chroma:submit", writer.submit)
+
+
+# --- Workload ---
+
+def make_task(rng: random.Random, employees: int) -> dict:
+    """One random task's parameters, spread over `employees` employee ids."""
+    return {
+        "employee_id": f"bench_emp_{rng.randrange(employees)}",
+        "stress": rng.randint(1, 10),
+        "work_hours": rng.randint(4, 14),
+        "sleep_hours": rng.randint(3, 9),
+        "mood": rng.choice(MOODS),
+    }
+
+
+def make_entry(task: dict) -> dict:
+    """A realistic-sized LTM entry for seeding history."""
+    risky = task["stress"] > 4 or task["work_hours"] > 8
+    return {
+        "timestamp": "2025-01-01T00:00:00",
+        "input_data": task,
+        "final_response": {
+            "risk_level": "medium" if risky else "low",
+            "empathetic_suggestion": "Seeded benchmark history entry. " * 6,
+            "key_factors": ["medium_stress"] if risky else ["healthy_habits"],
+            "actionable_steps": ["Take a short walk.", "Drink some water.", "Stop work on time."],
+            "conversation_starter": "Hi [Manager], could we talk about my workload?",
+            "is_trend": False,
+            "analysis_complete": True,
+        },
+    }
+
+
+def seed_history(store, entries: int, employees: int, seed: int = 1, chunk: int = 10000):
+    """Writes `entries` synthetic LTM entries straight into a store."""
+    rng = random.Random(seed)
+    written = 0
+    while written < entries:
+        size = min(chunk, entries - written)
+        store.append_many([make_entry(make_task(rng, employees)) for _ in range(size)])
+        written += size
+    store.flush()
+
+
+# --- Driving Load ---
+
+def run_concurrent(fn, payloads: list, concurrency: int, recorder: Recorder, name: str) -> dict:
+    """Calls fn(payload) for every payload with `concurrency` threads."""
+    errors = 0
+    errors_lock = threading.Lock()
+
+    def one(payload):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            fn(payload)
+        except Exception:
+            with errors_lock:
+                errors += 1
+        finally:
+            recorder.add(name, (time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, payloads))
+    wall = time.perf_counter() - start
+    return {
+        "requests": len(payloads),
+        "errors": errors,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(payloads) / wall, 1) if wall else 0.0,
+    }
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silences the agent's per-request prints while load is running."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
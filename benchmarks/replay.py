@@ -0,0 +1,416 @@
+"""
+Traffic replay and load generator.
+
+Pulls task messages out of recorded traffic: JSON-lines files (task
+messages, or log records with a task_message field), agent.log ("Received
+Task: {...}" lines and JSON records) and test_requests.txt (the -Body /
+-d payloads). Replays them, or tasks synthesized from distributions
+fitted to them, against process_task, the Flask /api/v1/task endpoint or
+a running server, with the stub LLM for local targets.
+
+Arrival patterns:
+    closed    --concurrency workers send back to back
+    fixed     one request every 1/rate seconds (open loop)
+    poisson   exponential inter-arrival times at `rate` (open loop)
+    recorded  the recorded gaps between requests, divided by --speed
+
+In open loop a request is sent at its scheduled time whether or not
+earlier ones have finished, and latency counts from that time, so queueing
+behind a saturated target shows up in the percentiles. With several
+--rates the report names the saturation point: the highest offered rate
+whose throughput kept up (>= 90%), error rate stayed under --max-errors
+and p99 under --slo-ms.
+
+Usage:
+    python -m benchmarks.replay --source agent.log --source test_requests.txt --rates 5,10,20,40
+    python -m benchmarks.replay --synthesize 2000 --pattern fixed --rates 50,100,200 --target flask
+    python -m benchmarks.replay --pattern recorded --speed 10 --target http --url http://127.0.0.1:5001
+"""
+import argparse
+import collections
+import copy
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Must be set before the agents package reads its config
+os.environ.setdefault("BURNOUT_CHROMA_ENABLED", "0")
+os.environ.setdefault("BURNOUT_WARM_UP", "off")
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+from benchmarks.harness import make_task, percentile, quiet, summarize  # noqa: E402
+
+DEFAULT_SOURCES = ("requests.jsonl", "agent.log", "test_requests.txt")
+NUMERIC_FIELDS = ("stress", "work_hours", "sleep_hours")
+AGENT_ID = "WorkerAgent_BurnoutPrevention"
+SUPERVISOR_ID = "SupervisorAgent_Main"
+
+_LOG_TIME = re.compile(r"^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)[,.](\d{3})")
+_QUOTED_JSON = re.compile(r"'(\{.*?\})'")
+
+
+# --- Extracting Recorded Traffic ---
+
+def task_parameters(message) -> dict:
+    """The task parameters of a task message, or of bare parameters; None if neither."""
+    if not isinstance(message, dict):
+        return None
+    params = message.get("task", {}).get("parameters") if isinstance(message.get("task"), dict) else message
+    if isinstance(params, dict) and "employee_id" in params and any(f in params for f in NUMERIC_FIELDS):
+        return params
+    return None
+
+
+def _epoch(value) -> float:
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def _parse_line(line: str) -> tuple:
+    """(task message, recorded epoch time or None) for one line, or (None, None)."""
+    line = line.strip()
+    candidates = []
+    if line.startswith("{"):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        if isinstance(record, dict):
+            # JSON log record (agents/log_setup.py) or a bare message
+            message = record.get("task_message", record)
+            return (message, _epoch(record.get("ts"))) if task_parameters(message) else (None, None)
+    if "Received Task:" in line:
+        candidates.append(line.split("Received Task:", 1)[1].strip())
+    candidates.extend(_QUOTED_JSON.findall(line))
+    for candidate in candidates:
+        try:
+            message = json.loads(candidate)
+        except ValueError:
+            continue
+        if task_parameters(message):
+            match = _LOG_TIME.match(line)
+            recorded = _epoch(f"{match.group(1)}.{match.group(2)}") if match else None
+            return message, recorded
+    return None, None
+
+
+def load_traffic(paths: list) -> list:
+    """[(task message, recorded time or None), ...] from every readable source, in order."""
+    traffic = []
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        found = 0
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                message, recorded = _parse_line(line)
+                if message is not None:
+                    if "task" not in message:
+                        message = {"type": "task_assignment",
+                                   "task": {"name": "analyze_wellbeing", "parameters": message}}
+                    traffic.append((message, recorded))
+                    found += 1
+        print(f"{path}: {found} task messages")
+    return traffic
+
+
+def recorded_gaps(traffic: list) -> list:
+    """Seconds between consecutive recorded requests (None where a time is unknown)."""
+    gaps = [None]
+    for (_, before), (_, after) in zip(traffic, traffic[1:]):
+        gaps.append(max(0.0, after - before) if before is not None and after is not None else None)
+    return gaps
+
+
+# --- Synthesizing Traffic ---
+
+def fit(traffic: list) -> dict:
+    """
+    Empirical distributions of the recorded parameters: each numeric field
+    and mood on its own, the share of other keys (team_id, ...), and how
+    often a request comes from an employee seen before.
+    """
+    params = [task_parameters(message) for message, _ in traffic]
+    seen, repeats = set(), 0
+    for p in params:
+        employee_id = str(p["employee_id"])
+        repeats += employee_id in seen
+        seen.add(employee_id)
+    extras = collections.defaultdict(collections.Counter)
+    for p in params:
+        for key, value in p.items():
+            if key not in NUMERIC_FIELDS + ("employee_id", "mood") and isinstance(value, (str, int, float)):
+                extras[key][value] += 1
+    return {
+        "requests": len(params),
+        "fields": {field: collections.Counter(p[field] for p in params if field in p)
+                   for field in NUMERIC_FIELDS + ("mood",)},
+        "extras": dict(extras),
+        "repeat_rate": repeats / len(params) if params else 0.0,
+    }
+
+
+def _draw(rng: random.Random, counts: collections.Counter):
+    values = list(counts)
+    return rng.choices(values, weights=[counts[v] for v in values])[0]
+
+
+def synthesize(model: dict, count: int, rng: random.Random) -> list:
+    """`count` task messages drawn from a fit() model (random tasks if it is empty)."""
+    messages, employees = [], []
+    for _ in range(count):
+        if not model["requests"]:
+            params = make_task(rng, 1000)
+        else:
+            if employees and rng.random() < model["repeat_rate"]:
+                employee_id = rng.choice(employees)
+            else:
+                employee_id = f"replay_emp_{len(employees)}"
+                employees.append(employee_id)
+            params = {"employee_id": employee_id}
+            for field, counts in model["fields"].items():
+                if counts:
+                    params[field] = _draw(rng, counts)
+            for key, counts in model["extras"].items():
+                if rng.random() < sum(counts.values()) / model["requests"]:
+                    params[key] = _draw(rng, counts)
+        messages.append(({"type": "task_assignment",
+                          "task": {"name": "analyze_wellbeing", "parameters": params}}, None))
+    return messages
+
+
+# --- Targets ---
+
+def agent_target(agent):
+    def send(message):
+        agent.process_task(copy.deepcopy(task_parameters(message)))
+    return send
+
+
+def flask_target(agent):
+    import app as flask_app
+    flask_app.agent = agent
+    client = flask_app.app.test_client()
+
+    def send(message):
+        response = client.post("/api/v1/task", json=dict(message, message_id=str(uuid.uuid4())))
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}")
+    return send
+
+
+def http_target(url: str, timeout: float):
+    endpoint = url.rstrip("/") + "/api/v1/task"
+
+    def send(message):
+        body = json.dumps(dict(message, message_id=str(uuid.uuid4()))).encode("utf-8")
+        request = urllib.request.Request(endpoint, data=body, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                response.read()
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(f"HTTP {e.code}") from e
+    return send
+
+
+# --- Driving Load ---
+
+def schedule(pattern: str, count: int, rate: float, gaps: list, speed: float, rng: random.Random) -> list:
+    """Send offsets in seconds from the start of the run (None for closed loop)."""
+    if pattern == "closed":
+        return None
+    offsets, t = [], 0.0
+    for i in range(count):
+        if i:
+            if pattern == "fixed":
+                t += 1.0 / rate
+            elif pattern == "poisson":
+                t += rng.expovariate(rate)
+            else:  # recorded; unknown gaps fall back to `rate`
+                gap = gaps[i % len(gaps)]
+                t += gap / speed if gap is not None else 1.0 / rate
+        offsets.append(t)
+    return offsets
+
+
+def run_load(send, messages: list, offsets: list, concurrency: int, max_in_flight: int) -> dict:
+    """
+    Sends every message, at its offset (open loop) or back to back from
+    `concurrency` threads (closed loop). Returns latency and error stats.
+    """
+    latencies, errors = [], collections.Counter()
+    lock = threading.Lock()
+
+    def one(message, intended):
+        error = None
+        try:
+            send(message)
+        except Exception as e:
+            # "HTTP 500" etc. from the HTTP targets, the exception type otherwise
+            error = str(e) if str(e).startswith("HTTP ") else type(e).__name__
+        elapsed = (time.perf_counter() - intended) * 1000
+        with lock:
+            latencies.append(elapsed)
+            if error:
+                errors[error] += 1
+
+    start = time.perf_counter()
+    if offsets is None:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for message in messages:
+                pool.submit(lambda m=message: one(m, time.perf_counter()))
+    else:
+        with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+            for message, offset in zip(messages, offsets):
+                delay = start + offset - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(one, message, start + offset)
+    wall = time.perf_counter() - start
+    sent = len(messages)
+    return {
+        "requests": sent,
+        "errors": sum(errors.values()),
+        "error_rate": round(sum(errors.values()) / sent, 4) if sent else 0.0,
+        "error_kinds": dict(errors),
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(sent / wall, 1) if wall else 0.0,
+        "latency": {**summarize(latencies), "p90_ms": round(percentile(latencies, 90), 3),
+                    "mean_ms": round(sum(latencies) / len(latencies), 3) if latencies else 0.0},
+    }
+
+
+def saturation_point(steps: list, slo_ms: float, max_errors: float) -> dict:
+    """Highest offered rate the target kept up with, and the first one it did not."""
+    sustained, broke = None, None
+    for step in steps:
+        ok = (step["offered_rps"] is None or step["throughput_rps"] >= 0.9 * step["offered_rps"]) \
+            and step["error_rate"] <= max_errors and step["latency"]["p99_ms"] <= slo_ms
+        if ok and broke is None:
+            sustained = step["offered_rps"]
+        elif not ok and broke is None:
+            broke = step["offered_rps"]
+    return {"sustained_rps": sustained, "saturated_at_rps": broke, "slo_p99_ms": slo_ms, "max_error_rate": max_errors}
+
+
+# --- Main ---
+
+def _float_list(value: str) -> list:
+    return [float(v) for v in value.split(",") if v.strip()]
+
+
+def build_local_agent(ltm_root: str):
+    from agents import config
+    from agents.burnout_agent import BurnoutPreventionAgent
+    config.LTM_DIR = ltm_root
+    return BurnoutPreventionAgent(agent_id=AGENT_ID, supervisor_id=SUPERVISOR_ID)
+
+
+def print_step(step: dict):
+    lat = step["latency"]
+    offered = f"{step['offered_rps']:g}" if step["offered_rps"] is not None else "closed"
+    print(f"{offered:>8} {step['throughput_rps']:>9} {lat['p50_ms']:>9} {lat['p95_ms']:>9} "
+          f"{lat['p99_ms']:>9} {lat['max_ms']:>9} {step['error_rate'] * 100:>7.2f}%")
+    sys.stdout.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", action="append", help=f"recorded traffic (default: {', '.join(DEFAULT_SOURCES)})")
+    parser.add_argument("--synthesize", type=int, default=0,
+                        help="send this many tasks drawn from distributions fitted to the sources")
+    parser.add_argument("--requests", type=int, default=0,
+                        help="requests per step (default: all recorded/synthesized; recorded traffic is cycled)")
+    parser.add_argument("--target", choices=["agent", "flask", "http"], default="agent")
+    parser.add_argument("--url", default="http://127.0.0.1:5001", help="server for --target http")
+    parser.add_argument("--timeout", type=float, default=30.0, help="HTTP timeout in seconds")
+    parser.add_argument("--pattern", choices=["closed", "fixed", "poisson", "recorded"], default="poisson")
+    parser.add_argument("--rates", type=_float_list, default=[5.0, 10.0, 20.0, 40.0],
+                        help="comma-separated offered rates (req/s), one step each")
+    parser.add_argument("--speed", type=float, default=1.0, help="recorded pattern: replay this many times faster")
+    parser.add_argument("--concurrency", type=int, default=8, help="closed pattern: client threads")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="open loop: concurrent requests cap")
+    parser.add_argument("--slo-ms", type=float, default=2000.0, help="p99 latency the target must stay under")
+    parser.add_argument("--max-errors", type=float, default=0.01, help="error rate the target must stay under")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="stub LLM latency in seconds")
+    parser.add_argument("--llm-jitter", type=float, default=0.1, help="extra random stub latency in seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    traffic = load_traffic(args.source or list(DEFAULT_SOURCES))
+    if args.synthesize:
+        traffic_model = fit(traffic)
+        traffic = synthesize(traffic_model, args.synthesize, rng)
+    if not traffic:
+        parser.error("no task messages found; pass --source or --synthesize")
+    count = args.requests or len(traffic)
+    messages = [traffic[i % len(traffic)][0] for i in range(count)]
+    gaps = recorded_gaps(traffic)
+    rates = [None] if args.pattern == "closed" else args.rates
+    if args.pattern == "recorded":
+        rates = rates[:1]  # the rate only fills in unknown gaps
+
+    local = args.target != "http"
+    if local:
+        from benchmarks.stub_llm import install_stub
+        install_stub(latency=args.llm_latency, jitter=args.llm_jitter, seed=args.seed)
+
+    print(f"\n=== {args.target} | pattern={args.pattern} | requests/step={count} ===")
+    print(f"{'offered':>8} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'errors':>8}")
+    steps = []
+    for rate in rates:
+        tmp = tempfile.mkdtemp(prefix="burnout-replay-") if local else None
+        agent = None
+        try:
+            with quiet():
+                if local:
+                    agent = build_local_agent(tmp)
+                    send = agent_target(agent) if args.target == "agent" else flask_target(agent)
+                else:
+                    send = http_target(args.url, args.timeout)
+                offsets = schedule(args.pattern, count, rate or 1.0, gaps, args.speed, rng)
+                run = run_load(send, messages, offsets, args.concurrency, args.max_in_flight)
+        finally:
+            if agent is not None:
+                agent.shutdown()
+            if tmp:
+                shutil.rmtree(tmp, ignore_errors=True)
+        step = {"offered_rps": rate if args.pattern in ("fixed", "poisson") else None, **run}
+        steps.append(step)
+        print_step(step)
+
+    report = {
+        "target": args.target,
+        "pattern": args.pattern,
+        "sources": args.source or list(DEFAULT_SOURCES),
+        "synthesized": bool(args.synthesize),
+        "steps": steps,
+    }
+    if args.pattern in ("fixed", "poisson"):
+        report["saturation"] = saturation_point(steps, args.slo_ms, args.max_errors)
+        sat = report["saturation"]
+        print(f"sustained: {sat['sustained_rps']} req/s | saturated at: {sat['saturated_at_rps']} req/s "
+              f"(p99 <= {args.slo_ms:g} ms, errors <= {args.max_errors:.0%})")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Offline benchmark for the Burnout Prevention Agent.
+
+Swaps Gemini for a deterministic local stub, seeds synthetic LTM history,
+then drives BurnoutPreventionAgent.process_task and/or the Flask
+/api/v1/task endpoint under configurable concurrency. Reports p50/p95/p99
+latency and throughput per target, per graph node and per storage
+operation, plus peak RSS. Needs no network and no API key.
+
+Usage:
+    python -m benchmarks.run_benchmark --history 1000,100000 --concurrency 1,8
+    python -m benchmarks.run_benchmark --history 1000000 --target agent --json bench.json
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+# Must be set before the agents package reads its config
+os.environ.setdefault("BURNOUT_CHROMA_ENABLED", "0")
+os.environ.setdefault("BURNOUT_WARM_UP", "off")
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+from agents import config  # noqa: E402
+from agents import burnout_graph, metrics  # noqa: E402
+from agents.burnout_agent import BurnoutPreventionAgent  # noqa: E402
+from benchmarks.harness import (  # noqa: E402
+    Recorder, instrument_graph_nodes, instrument_storage, make_task,
+    peak_rss_mb, quiet, run_concurrent, seed_history,
+)
+from benchmarks.stub_llm import install_stub  # noqa: E402
+
+AGENT_ID = "WorkerAgent_BurnoutPrevention"
+SUPERVISOR_ID = "SupervisorAgent_Main"
+
+
+def _int_list(value: str) -> list:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def build_agent(ltm_root: str, history: int, employees: int, recorder: Recorder):
+    """Creates an agent on a fresh LTM folder seeded with `history` entries."""
+    config.LTM_DIR = ltm_root
+    agent = BurnoutPreventionAgent(agent_id=AGENT_ID, supervisor_id=SUPERVISOR_ID)
+
+    start = time.perf_counter()
+    seed_history(agent.ltm, history, employees)
+    recorder.add("setup:seed_history", (time.perf_counter() - start) * 1000)
+    start = time.perf_counter()
+    if agent.history_index is not None and agent.save_snapshot() is not None:
+        recorder.add("setup:write_snapshot", (time.perf_counter() - start) * 1000)
+
+    # Drop the store so the index load below is a real cold start
+    agent.shutdown()
+    agent = BurnoutPreventionAgent(agent_id=AGENT_ID, supervisor_id=SUPERVISOR_ID)
+    start = time.perf_counter()
+    agent.history_index
+    recorder.add("ltm:load_index", (time.perf_counter() - start) * 1000)
+
+    instrument_storage(agent, recorder)
+    return agent
+
+
+def bench_agent(agent, payloads, concurrency, recorder):
+    return run_concurrent(agent.process_task, payloads, concurrency, recorder, "target:process_task")
+
+
+def bench_flask(agent, payloads, concurrency, recorder):
+    import app as flask_app
+    flask_app.agent = agent
+
+    def post(params):
+        client = flask_app.app.test_client()
+        response = client.post("/api/v1/task", json={
+            "message_id": "bench",
+            "type": "task_assignment",
+            "task": {"name": "analyze_wellbeing", "parameters": params},
+        })
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}")
+
+    return run_concurrent(post, payloads, concurrency, recorder, "target:POST /api/v1/task")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--history", type=_int_list, default=[1000, 10000],
+                        help="comma-separated LTM sizes to seed (e.g. 1000,100000,1000000)")
+    parser.add_argument("--employees", type=int, default=1000, help="distinct employee ids")
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 8], help="comma-separated thread counts")
+    parser.add_argument("--target", choices=["agent", "flask", "both"], default="both")
+    parser.add_argument("--backend", choices=["jsonl", "sqlite"], default=config.LTM_BACKEND)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="stub LLM latency in seconds")
+    parser.add_argument("--llm-jitter", type=float, default=0.0, help="extra random stub latency in seconds")
+    parser.add_argument("--no-llm-cache", action="store_true", help="disable the response cache")
+    parser.add_argument("--output-mode", choices=["parser", "structured"], default=config.LLM_OUTPUT_MODE,
+                        help="deep-path prompt/output format (see BURNOUT_LLM_OUTPUT_MODE)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="also write the full report to this file")
+    args = parser.parse_args(argv)
+
+    config.LTM_BACKEND = args.backend
+    config.LLM_OUTPUT_MODE = args.output_mode
+    install_stub(latency=args.llm_latency, jitter=args.llm_jitter, seed=args.seed)
+    if args.no_llm_cache:
+        burnout_graph.get_response_cache().enabled = False
+
+    targets = ["agent", "flask"] if args.target == "both" else [args.target]
+    runners = {"agent": bench_agent, "flask": bench_flask}
+    node_recorder = Recorder()
+    instrument_graph_nodes(node_recorder)
+
+    results = []
+    for history in args.history:
+        for concurrency in args.concurrency:
+            for target in targets:
+                tmp = tempfile.mkdtemp(prefix="burnout-bench-")
+                recorder = Recorder()
+                node_recorder.samples.clear()
+                node_recorder.rss.clear()
+                burnout_graph.get_response_cache().clear()
+                try:
+                    with quiet():
+                        agent = build_agent(tmp, history, args.employees, recorder)
+                        rng = random.Random(args.seed)
+                        payloads = [make_task(rng, args.employees) for _ in range(args.requests)]
+                        run = runners[target](agent, payloads, concurrency, recorder)
+                        agent.shutdown()
+                finally:
+                    shutil.rmtree(tmp, ignore_errors=True)
+
+                scenario = {
+                    "target": target,
+                    "backend": args.backend,
+                    "history": history,
+                    "concurrency": concurrency,
+                    **run,
+                    "peak_rss_mb": round(peak_rss_mb(), 1),
+                    "operations": {**recorder.report(), **node_recorder.report()},
+                    "llm_cache": burnout_graph.get_response_cache().stats(),
+                    "llm_tokens_per_request": metrics.LLM_REQUEST_TOKENS.percentiles(),
+                }
+                results.append(scenario)
+                print_scenario(scenario)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.json}")
+
+
+def print_scenario(scenario: dict):
+    print(f"\n=== {scenario['target']} | backend={scenario['backend']} | history={scenario['history']:,} "
+          f"| concurrency={scenario['concurrency']} ===")
+    print(f"requests={scenario['requests']} errors={scenario['errors']} wall={scenario['wall_s']}s "
+          f"throughput={scenario['throughput_rps']} req/s peak_rss={scenario['peak_rss_mb']} MB")
+    for kind, stats in sorted(scenario["llm_tokens_per_request"].items()):
+        print(f"tokens/request {kind}: p50={stats['p50']} p95={stats['p95']} (since start, n={stats['count']})")
+    print(f"{'operation':32} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'rss MB':>8}")
+    for name, stats in sorted(scenario["operations"].items()):
+        print(f"{name:32} {stats['count']:>7} {stats['p50_ms']:>9} {stats['p95_ms']:>9} "
+              f"{stats['p99_ms']:>9} {stats.get('peak_rss_mb', ''):>8}")
+    sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
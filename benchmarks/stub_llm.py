@@ -0,0 +1,92 @@
+import asyncio
+import json
+import random
+import time
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# Same fields the real prompt asks Gemini for
+STUB_RESPONSE = {
+    "empathetic_response": (
+        "It sounds like you have been carrying a lot lately, and that is completely understandable. "
+        "Let's find a few small ways to ease the load this week."
+    ),
+    "actionable_steps": [
+        "Block 15 minutes on your calendar for a short walk.",
+        "Pick one task to delegate or postpone today.",
+        "Set a firm stop-work time this evening.",
+    ],
+    "conversation_starter": "Hi [Manager], could we find 15 minutes to talk about my current workload?",
+}
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Deterministic, offline stand-in for ChatGoogleGenerativeAI.
+    Always answers with STUB_RESPONSE as JSON after `latency` seconds
+    (plus up to `jitter` seconds, from a seeded RNG), and reports rough
+    token usage so token metrics have something to count.
+    """
+
+    latency: float = 0.05
+    jitter: float = 0.0
+    seed: int = 0
+    stream_chunk_chars: int = 16
+
+    _rng: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "burnout-stub"
+
+    def _delay(self) -> float:
+        if self._rng is None:
+            self._rng = random.Random(self.seed)
+        return self.latency + (self._rng.random() * self.jitter if self.jitter else 0.0)
+
+    def _message(self, messages: List[BaseMessage]) -> AIMessage:
+        text = json.dumps(STUB_RESPONSE)
+        prompt_chars = sum(len(str(m.content)) for m in messages)
+        input_tokens = prompt_chars // 4
+        output_tokens = len(text) // 4
+        return AIMessage(
+            content=text,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+        )
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self._delay())
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self._delay())
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs):
+        text = self._message(messages).content
+        pieces = [text[i:i + self.stream_chunk_chars] for i in range(0, len(text), self.stream_chunk_chars)]
+        per_piece = self._delay() / max(1, len(pieces))
+        for piece in pieces:
+            time.sleep(per_piece)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece))
+            if run_manager:
+                run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
+
+
+def install_stub(latency: float = 0.05, jitter: float = 0.0, seed: int = 0) -> StubChatModel:
+    """Replaces the graph's Gemini client with a StubChatModel."""
+    from agents import burnout_graph
+    stub = StubChatModel(latency=latency, jitter=jitter, seed=seed)
+    burnout_graph.set_llm(stub)
+    return stub
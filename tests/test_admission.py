@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+from agents import llm_guard
+from agents.admission import HIGH, LOW, MEDIUM, AdmissionController, Lane, Overloaded
+
+
+def occupy(controller, lane, priority=HIGH):
+    """Starts a task that holds a slot until the returned event is set."""
+    release, started = threading.Event(), threading.Event()
+
+    def compute():
+        started.set()
+        release.wait(5.0)
+
+    thread = threading.Thread(target=controller.run, args=(lane, priority, compute))
+    thread.start()
+    started.wait(5.0)
+    return release, thread
+
+
+def test_freed_slot_goes_to_the_best_waiter():
+    lane = Lane("deep", workers=1, capacity=3, service_s=1.0)
+    assert lane.enter(HIGH).state == "running"
+    low, medium, high = lane.enter(LOW), lane.enter(MEDIUM), lane.enter(HIGH)
+    lane.release()
+    assert (high.state, medium.state, low.state) == ("running", "queued", "queued")
+    lane.release()
+    assert medium.state == "running"
+
+
+def test_full_queue_evicts_its_lowest_priority_waiter():
+    lane = Lane("deep", workers=1, capacity=1, service_s=1.0)
+    lane.enter(HIGH)
+    low = lane.enter(LOW)
+    high = lane.enter(HIGH)
+    assert low.state == "evicted" and low.event.is_set()
+    assert high.state == "queued"
+    assert lane.enter(MEDIUM).state == "rejected"
+
+
+def test_shed_medium_deep_work_is_degraded_to_a_template():
+    controller = AdmissionController(fast_workers=2, fast_queue=0, deep_workers=1, deep_queue=0,
+                                     max_wait=0.1, degrade=True)
+    release, thread = occupy(controller, "deep")
+    try:
+        assert controller.run("deep", MEDIUM, llm_guard.skip_reason) == "shed"
+        assert llm_guard.skip_reason() is None
+    finally:
+        release.set()
+        thread.join(5.0)
+
+
+def test_shed_work_that_cannot_degrade_is_overloaded():
+    controller = AdmissionController(fast_workers=1, fast_queue=0, deep_workers=1, deep_queue=0,
+                                     max_wait=0.1, degrade=True)
+    release, thread = occupy(controller, "deep")
+    try:
+        with pytest.raises(Overloaded) as excinfo:
+            controller.run("deep", HIGH, lambda: "ran")
+        assert excinfo.value.lane == "deep"
+        assert 1 <= excinfo.value.retry_after <= 60
+    finally:
+        release.set()
+        thread.join(5.0)
+
+
+def test_queued_task_runs_when_a_slot_frees():
+    controller = AdmissionController(fast_workers=1, fast_queue=1, deep_workers=1, deep_queue=1, max_wait=5.0)
+    release, thread = occupy(controller, "fast", LOW)
+    threading.Timer(0.05, release.set).start()
+    started = time.monotonic()
+    assert controller.run("fast", LOW, lambda: "ran") == "ran"
+    assert time.monotonic() - started < 5.0
+    thread.join(5.0)
+    assert controller.lanes["fast"].stats()["running"] == 0
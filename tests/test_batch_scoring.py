@@ -0,0 +1,65 @@
+import pytest
+
+pytest.importorskip("langgraph")
+
+from agents import burnout_graph, config
+from agents.burnout_agent import BurnoutPreventionAgent
+
+TASKS = [
+    {"employee_id": "e1", "stress": 6, "work_hours": 9, "sleep_hours": 7, "mood": "ok"},
+    {"employee_id": "e1", "stress": "5", "work_hours": "8.5", "sleep_hours": "6.5", "mood": "tired"},
+    {"employee_id": "e1", "stress": 5, "mood": "anxious"},
+    {"employee_id": "e2", "stress": "9", "work_hours": 12, "sleep_hours": 4, "mood": "frustrated"},
+    {"employee_id": "e3", "stress": 2, "work_hours": 7, "sleep_hours": 8, "mood": "happy"},
+    {"employee_id": "e3"},
+    {"employee_id": "e4", "stress": "n/a", "work_hours": None, "sleep_hours": "5"},
+    {"employee_id": "e1", "stress": 1, "work_hours": 6, "sleep_hours": 8, "mood": "ok"},
+]
+
+
+def stub_llm(risk, factors, tokens=None):
+    return {
+        "empathetic_response": f"{risk}: {', '.join(sorted(factors))}",
+        "actionable_steps": ["Take a break."],
+        "conversation_starter": "Hi [Manager], can we talk?",
+    }
+
+
+@pytest.fixture
+def make_agent(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CHROMA_ENABLED", False)
+    monkeypatch.setattr(burnout_graph, "_invoke_llm", stub_llm)
+    agents = []
+
+    def make(name):
+        agent = BurnoutPreventionAgent(name, "supervisor", ltm_dir=str(tmp_path / name))
+        agents.append(agent)
+        return agent
+
+    yield make
+    for agent in agents:
+        agent.shutdown()
+
+
+def report(response):
+    return (response["risk_level"], sorted(response["key_factors"]), response["is_trend"],
+            response["empathetic_suggestion"])
+
+
+def test_batch_matches_sequential_tasks(make_agent):
+    sequential = [make_agent("sequential").process_task(dict(task)) for task in TASKS]
+    batch = make_agent("batch").process_batch([dict(task) for task in TASKS])
+    assert [report(r) for r in batch] == [report(r) for r in sequential]
+    # The third e1 row is elevated by the trend on both paths
+    assert report(batch[2])[:3] == ("high", ["consistent_stress_trend", "medium_stress", "negative_mood"], True)
+
+
+def test_rules_coerce_numeric_strings_and_missing_fields():
+    from agents.batch_scoring import RISK_MAP, score_rules
+
+    scores, factors = score_rules(TASKS)
+    for task, score, row_factors in zip(TASKS, scores, factors):
+        state = burnout_graph.analyze_risk_and_factors(
+            {"input_data": task, "history": [], "trend": None})
+        assert state["burnout_risk"] == RISK_MAP[int(score)]
+        assert sorted(state["key_factors"]) == sorted(row_factors)
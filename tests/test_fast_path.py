@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("langgraph")
+
+from agents import burnout_graph, config
+from agents.trend_state import trend_from_entries
+
+LOW_RISK = [
+    {"employee_id": "e1", "stress": 2, "work_hours": 7, "sleep_hours": 8, "mood": "happy"},
+    {"employee_id": "e2", "stress": "4", "work_hours": "8", "sleep_hours": "6", "mood": "ok"},
+    {"employee_id": "e3"},
+]
+HISTORY = [
+    {"input_data": {"employee_id": "e1", "stress": 6}, "final_response": {"risk_level": "medium"}},
+    {"input_data": {"employee_id": "e1", "stress": 8}, "final_response": {"risk_level": "high"}},
+]
+
+
+def initial_state(task):
+    return burnout_graph.BurnoutState(
+        input_data=dict(task), history=list(HISTORY), trend=trend_from_entries(HISTORY), deadline=None,
+        burnout_risk="unknown", is_trend=False, key_factors=[], empathetic_response="",
+        actionable_steps=[], conversation_starter="", recommendation="", final_response={},
+        response_meta={})
+
+
+def both_paths(monkeypatch, run):
+    results = {}
+    for direct in (True, False):
+        monkeypatch.setattr(config, "FAST_PATH_DIRECT", direct)
+        results[direct] = [run(initial_state(task)) for task in LOW_RISK]
+    return results[True], results[False]
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_direct_fast_path_matches_the_graph(monkeypatch, mode):
+    if mode == "sync":
+        run = burnout_graph.run_workflow
+    else:
+        def run(state):
+            return asyncio.run(burnout_graph.arun_workflow(state))
+
+    direct, graph = both_paths(monkeypatch, run)
+    for direct_state, graph_state in zip(direct, graph):
+        assert direct_state["final_response"]["risk_level"] == "low"
+        assert direct_state["final_response"] == graph_state["final_response"]
+        assert direct_state.get("response_meta") == graph_state.get("response_meta")
@@ -0,0 +1,206 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from agents.idempotency import IdempotencyConflict, IdempotencyStore, SqliteIdempotencyStore
+
+PARAMS = {"employee_id": "e1", "stress_level": 8}
+
+
+class Counter:
+    def __init__(self, report=None, gate: threading.Event = None):
+        self.calls = 0
+        self.report = report or {"status": "SUCCESS"}
+        self.gate = gate
+        self.started = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        if self.gate is not None:
+            self.gate.wait(5.0)
+        return dict(self.report, call=self.calls)
+
+
+def test_retry_replays_the_stored_report(tmp_path):
+    store = IdempotencyStore(str(tmp_path / "idempotency.jsonl"))
+    compute = Counter()
+    assert store.run("m1", compute, PARAMS) == ({"status": "SUCCESS", "call": 1}, False)
+    assert store.run("m1", compute, PARAMS) == ({"status": "SUCCESS", "call": 1}, True)
+    assert compute.calls == 1
+    store.close()
+
+    # Journaled, so a restart still recognises the retry
+    reloaded = IdempotencyStore(str(tmp_path / "idempotency.jsonl"))
+    assert reloaded.run("m1", compute, PARAMS) == ({"status": "SUCCESS", "call": 1}, True)
+    assert compute.calls == 1
+    reloaded.close()
+
+
+def test_duplicate_waits_for_the_running_original():
+    store = IdempotencyStore()
+    gate = threading.Event()
+    compute = Counter(gate=gate)
+    results = []
+    original = threading.Thread(target=lambda: results.append(store.run("m1", compute, PARAMS)))
+    original.start()
+    compute.started.wait(5.0)
+    duplicate = threading.Thread(target=lambda: results.append(store.run("m1", compute, PARAMS)))
+    duplicate.start()
+    time.sleep(0.05)
+    gate.set()
+    original.join(5.0)
+    duplicate.join(5.0)
+    assert compute.calls == 1
+    assert sorted(replayed for _, replayed in results) == [False, True]
+    assert results[0][0] == results[1][0]
+    assert store.stats()["waited"] == 1
+
+
+def test_duplicate_gives_up_after_wait_timeout():
+    store = IdempotencyStore(wait_timeout=0.05)
+    gate = threading.Event()
+    compute = Counter(gate=gate)
+    original = threading.Thread(target=store.run, args=("m1", compute, PARAMS))
+    original.start()
+    compute.started.wait(5.0)
+    with pytest.raises(IdempotencyConflict):
+        store.run("m1", compute, PARAMS)
+    gate.set()
+    original.join(5.0)
+
+
+def test_reused_message_id_with_other_params_conflicts():
+    store = IdempotencyStore()
+    store.run("m1", Counter(), PARAMS)
+    with pytest.raises(IdempotencyConflict):
+        store.run("m1", Counter(), dict(PARAMS, stress_level=2))
+    # A new deadline is not a different task
+    assert store.run("m1", Counter(), dict(PARAMS, deadline_ms=500))[1]
+    assert store.stats()["conflicts"] == 1
+
+
+def test_expired_and_failed_reports_run_again():
+    store = IdempotencyStore(ttl=0.05)
+    compute = Counter()
+    store.run("m1", compute, PARAMS)
+    time.sleep(0.1)
+    assert store.run("m1", compute, PARAMS) == ({"status": "SUCCESS", "call": 2}, False)
+
+    def broken():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        store.run("m2", broken, PARAMS)
+    assert store.run("m2", compute, PARAMS) == ({"status": "SUCCESS", "call": 3}, False)
+
+
+def test_async_duplicate_waits_without_running_again():
+    store = IdempotencyStore()
+    calls = []
+
+    async def acompute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"status": "SUCCESS"}
+
+    async def main():
+        return await asyncio.gather(store.arun("m1", acompute, PARAMS), store.arun("m1", acompute, PARAMS))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert sorted(replayed for _, replayed in results) == [False, True]
+
+
+def test_async_store_io_runs_off_the_event_loop(tmp_path):
+    store = SqliteIdempotencyStore(str(tmp_path / "memory.db"))
+    threads = []
+    for name in ("_claim", "_finish"):
+        method = getattr(store, name)
+
+        def recorded(*args, _method=method, **kwargs):
+            threads.append(threading.current_thread())
+            return _method(*args, **kwargs)
+
+        setattr(store, name, recorded)
+
+    async def acompute():
+        return {"status": "SUCCESS"}
+
+    assert asyncio.run(store.arun("m1", acompute, PARAMS)) == ({"status": "SUCCESS"}, False)
+    assert len(threads) == 2 and threading.main_thread() not in threads
+    store.close()
+
+
+def test_async_caller_cancelled_while_claiming_releases_the_claim():
+    store = IdempotencyStore(wait_timeout=1.0)
+    gate = threading.Event()
+    claim = store._claim
+    store._claim = lambda *args: gate.wait(5.0) and claim(*args)
+
+    async def acompute():
+        return {"status": "SUCCESS"}
+
+    async def main():
+        task = asyncio.ensure_future(store.arun("m1", acompute, PARAMS))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        gate.set()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        deadline = time.monotonic() + 5.0
+        while store._in_flight and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        return await store.arun("m1", acompute, PARAMS)
+
+    assert asyncio.run(main()) == ({"status": "SUCCESS"}, False)
+
+
+def test_sqlite_store_is_shared_between_processes(tmp_path):
+    db_path = str(tmp_path / "ltm.sqlite3")
+    first, second = SqliteIdempotencyStore(db_path), SqliteIdempotencyStore(db_path)
+    compute = Counter()
+    assert first.run("m1", compute, PARAMS) == ({"status": "SUCCESS", "call": 1}, False)
+    assert second.run("m1", compute, PARAMS) == ({"status": "SUCCESS", "call": 1}, True)
+    with pytest.raises(IdempotencyConflict):
+        second.run("m1", compute, dict(PARAMS, stress_level=1))
+    assert compute.calls == 1 and len(second) == 1
+    first.close()
+    second.close()
+
+
+def test_sqlite_duplicate_waits_for_another_process(tmp_path):
+    db_path = str(tmp_path / "ltm.sqlite3")
+    first, second = SqliteIdempotencyStore(db_path), SqliteIdempotencyStore(db_path)
+    gate = threading.Event()
+    compute = Counter(gate=gate)
+    original = threading.Thread(target=first.run, args=("m1", compute, PARAMS))
+    original.start()
+    compute.started.wait(5.0)
+    threading.Timer(0.1, gate.set).start()
+    assert second.run("m1", compute, PARAMS) == ({"status": "SUCCESS", "call": 1}, True)
+    original.join(5.0)
+    assert compute.calls == 1
+    assert second.stats()["in_flight"] == 0
+
+
+def test_sqlite_claim_of_a_dead_process_lapses(tmp_path):
+    db_path = str(tmp_path / "ltm.sqlite3")
+    dead = SqliteIdempotencyStore(db_path, wait_timeout=0.05)
+    assert dead._claim_row("m1", None)[0] == "run"  # never finished
+    time.sleep(0.1)
+    store = SqliteIdempotencyStore(db_path, wait_timeout=0.05)
+    assert store.run("m1", Counter(), PARAMS)[1] is False
+    dead.close()
+    store.close()
+
+
+def test_sqlite_prunes_to_max_entries(tmp_path):
+    store = SqliteIdempotencyStore(str(tmp_path / "ltm.sqlite3"), max_entries=10)
+    for n in range(128):
+        store.run(f"m{n}", Counter(), PARAMS)
+    assert len(store) <= 10 + 64
+    assert store.run("m127", Counter(), PARAMS)[1]
+    store.close()
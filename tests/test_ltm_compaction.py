@@ -0,0 +1,87 @@
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+from agents import config
+from agents.ltm_compaction import (compact, fold_count, fold_entries, load_aggregates, load_trend_seeds,
+                                   summarize, _new_aggregate)
+from agents.ltm_store import JsonlLTMStore
+from agents.trend_state import TrendTracker, trend_from_entries
+
+START = datetime(2026, 1, 1, 9, 0)
+RISKS = ["low", "medium", "high", "medium", "low"]
+
+
+def _entry(employee_id, i, when=None):
+    return {
+        "timestamp": (when or START + timedelta(hours=i)).isoformat(),
+        "input_data": {"employee_id": employee_id, "stress": i, "work_hours": 8, "sleep_hours": 7},
+        "final_response": {"risk_level": RISKS[i % len(RISKS)], "key_factors": ["medium_stress"] if i % 2 else [],
+                           "is_trend": i % 3 == 0},
+    }
+
+
+@pytest.fixture(autouse=True)
+def windows(monkeypatch):
+    monkeypatch.setattr(config, "HISTORY_WINDOW", 3)
+    monkeypatch.setattr(config, "TREND_WINDOW", 2)
+
+
+def test_compaction_keeps_trend_state_and_summaries(tmp_path):
+    a = [_entry("a", i) for i in range(10)]
+    b = [_entry("b", i) for i in range(2)]
+    store = JsonlLTMStore(str(tmp_path))
+    store.append_many(a + b)
+
+    result = compact(store, str(tmp_path), keep_raw=4, max_age_days=0)
+    assert (result["employees"], result["folded"], result["kept"]) == (1, 6, 6)
+    assert store.read_employee("a") == a[6:]
+    assert store.read_employee("b") == b
+
+    # Seeds from the aggregates plus the raw tail give the same trend as the full history
+    tracker = TrendTracker(window=2)
+    tracker.build(store.iter_all(), load_trend_seeds(str(tmp_path)))
+    assert tracker.get("a").to_dict() == trend_from_entries(a, window=2).to_dict()
+    assert tracker.get("b").to_dict() == trend_from_entries(b, window=2).to_dict()
+    assert tracker.entries == 6
+
+    summary = summarize(load_aggregates(str(tmp_path))["a"])
+    assert summary["count"] == 6
+    assert summary["risk_counts"] == dict(Counter(e["final_response"]["risk_level"] for e in a[:6]))
+    assert summary["factor_counts"] == {"medium_stress": 3}
+    assert summary["trend_count"] == 2
+    assert summary["inputs"]["stress"] == {"min": 0.0, "max": 5.0, "mean": 2.5, "count": 6}
+    assert (summary["first_timestamp"], summary["last_timestamp"]) == (a[0]["timestamp"], a[5]["timestamp"])
+
+    # Nothing left past the policy: a second run folds nothing and changes no aggregate
+    assert compact(store, str(tmp_path), keep_raw=4, max_age_days=0)["folded"] == 0
+    assert summarize(load_aggregates(str(tmp_path))["a"]) == summary
+    store.close()
+
+
+def test_refolding_the_same_entries_is_not_double_counted():
+    entries = [_entry("a", i) for i in range(4)]
+    aggregate = fold_entries(_new_aggregate(), entries)
+    assert fold_entries(aggregate, entries)["count"] == 4
+
+
+def test_retention_cutoffs():
+    entries = [_entry("a", i) for i in range(10)]
+    assert fold_count(entries, keep_raw=6) == 4
+    # Never folds into the history / trend window
+    assert fold_count(entries, keep_raw=1) == 7
+
+    now = START + timedelta(days=30)
+    old = [_entry("a", i, START + timedelta(minutes=i)) for i in range(5)]
+    new = [_entry("a", i, now - timedelta(hours=1) + timedelta(minutes=i)) for i in range(5)]
+    assert fold_count(old + new, keep_raw=100, max_age_days=7, now=now) == 5
+    assert fold_count(old + new, keep_raw=100, max_age_days=60, now=now) == 0
+    assert fold_count(old, keep_raw=100, max_age_days=7, now=now) == 2
+
+
+def test_entries_sharing_a_timestamp_are_not_split():
+    batch_time = START + timedelta(hours=3)
+    entries = [_entry("a", i, batch_time if 2 <= i <= 4 else None) for i in range(8)]
+    # keep_raw=5 would cut between entries 2 and 3, which were written together
+    assert fold_count(entries, keep_raw=5) == 2
@@ -0,0 +1,101 @@
+import threading
+
+import pytest
+
+pytest.importorskip("ormsgpack")
+pytest.importorskip("zstandard")
+
+from agents import config
+from agents.history_index import HistoryIndex
+from agents.ltm_snapshot import SnapshotMemory
+from agents.ltm_store import JsonlLTMStore
+from agents.trend_state import TrendTracker, trend_from_entries
+
+RISKS = ["medium", "high", "low"]
+
+
+def _entry(employee_id, i):
+    return {
+        "timestamp": f"2026-01-01T{i:02d}:00:00",
+        "input_data": {"employee_id": employee_id, "stress": i},
+        "final_response": {"risk_level": RISKS[i % len(RISKS)]},
+    }
+
+
+@pytest.fixture(autouse=True)
+def windows(monkeypatch):
+    monkeypatch.setattr(config, "HISTORY_WINDOW", 3)
+    monkeypatch.setattr(config, "TREND_WINDOW", 2)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JsonlLTMStore(str(tmp_path))
+    store.append_many([_entry(employee_id, i) for i in range(6) for employee_id in ("a", "b")])
+    yield store
+    store.close()
+
+
+def memory(store, tmp_path):
+    return SnapshotMemory(store, str(tmp_path / "snapshot.bin"), HistoryIndex(), TrendTracker())
+
+
+def saved_snapshot(store, tmp_path):
+    first = memory(store, tmp_path)
+    for employee_id in ("a", "b"):
+        first.ensure(employee_id)
+    assert first.save(threading.Lock())["employees"] == 2
+    return first
+
+
+def assert_matches_log(mem, store, employee_id):
+    entries = store.read_employee(employee_id)
+    assert mem.index.recent(employee_id) == entries[-3:]
+    assert mem.tracker.get(employee_id).to_dict() == trend_from_entries(entries, window=2).to_dict()
+
+
+def test_snapshot_round_trip(store, tmp_path):
+    first = saved_snapshot(store, tmp_path)
+    second = memory(store, tmp_path)
+    for employee_id in ("a", "b"):
+        second.ensure(employee_id)
+        assert second.index.recent(employee_id) == first.index.recent(employee_id)
+        assert second.tracker.get(employee_id).to_dict() == first.tracker.get(employee_id).to_dict()
+        assert_matches_log(second, store, employee_id)
+    assert (second.snapshot_hits, second.log_loads) == (2, 0)
+
+
+def test_stale_block_falls_back_to_the_log(store, tmp_path):
+    saved_snapshot(store, tmp_path)
+    store.append(_entry("a", 6))
+    store.flush()
+
+    mem = memory(store, tmp_path)
+    mem.ensure("a")
+    mem.ensure("b")
+    assert (mem.snapshot_hits, mem.log_loads) == (1, 1)
+    assert mem.index.recent("a")[-1]["timestamp"] == _entry("a", 6)["timestamp"]
+    assert_matches_log(mem, store, "a")
+
+
+def test_corrupt_snapshot_falls_back_to_the_log(store, tmp_path):
+    saved_snapshot(store, tmp_path)
+    path = tmp_path / "snapshot.bin"
+    data = path.read_bytes()
+
+    # Garbled blocks: the header still opens, each block fails to decode
+    path.write_bytes(data[:-20] + b"\x00" * 20)
+    mem = memory(store, tmp_path)
+    mem.ensure("a")
+    mem.ensure("b")
+    assert mem.log_loads >= 1
+    for employee_id in ("a", "b"):
+        assert_matches_log(mem, store, employee_id)
+
+    # Not a snapshot at all: ignored, everything comes from the log
+    path.write_bytes(b"not a snapshot")
+    mem = memory(store, tmp_path)
+    assert mem.stats()["snapshot_employees"] == 0
+    mem.ensure("a")
+    assert (mem.snapshot_hits, mem.log_loads) == (0, 1)
+    assert_matches_log(mem, store, "a")
@@ -0,0 +1,68 @@
+import json
+import multiprocessing
+import os
+
+import pytest
+
+from agents.ltm_sqlite import SqliteLTMStore
+from agents.ltm_store import JsonlLTMStore
+
+
+def _history(n=40):
+    return [
+        {"timestamp": f"2025-01-01T00:00:{i:02d}", "input_data": {"employee_id": f"e{i % 4}", "stress": i % 10},
+         "final_response": {}}
+        for i in range(n)
+    ]
+
+
+def _write_legacy(root):
+    path = os.path.join(root, "memory.json")
+    with open(path, "w") as f:
+        json.dump(_history(), f)
+    return path
+
+
+def test_migrates_memory_json_once(tmp_path):
+    legacy = _write_legacy(str(tmp_path))
+    store = SqliteLTMStore(str(tmp_path))
+    assert store.migrate_legacy(legacy) == 40
+    assert store.count() == 40
+    assert not os.path.exists(legacy) and os.path.exists(legacy + ".migrated")
+    assert store.migrate_legacy(legacy) == 0
+    assert [e["input_data"]["stress"] for e in store.recent("e1", 3)] == [9, 3, 7]
+    store.close()
+
+
+def test_migrates_jsonl_logs_when_there_is_no_memory_json(tmp_path):
+    jsonl = JsonlLTMStore(str(tmp_path))
+    jsonl.append_many(_history(8))
+    jsonl.close()
+    store = SqliteLTMStore(str(tmp_path))
+    assert store.migrate_legacy(str(tmp_path / "memory.json")) == 8
+    assert store.employee_ids() == ["e0", "e1", "e2", "e3"]
+    store.close()
+
+
+def _migrate(root, legacy, barrier, results):
+    barrier.wait()
+    try:
+        results.put(SqliteLTMStore(root).migrate_legacy(legacy))
+    except Exception as e:  # reported to the parent
+        results.put(repr(e))
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_concurrent_workers_import_exactly_once(tmp_path):
+    root = str(tmp_path)
+    legacy = _write_legacy(root)
+    ctx = multiprocessing.get_context("fork")
+    barrier, results = ctx.Barrier(4), ctx.Queue()
+    workers = [ctx.Process(target=_migrate, args=(root, legacy, barrier, results)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+    outcomes = sorted(results.get(timeout=5) for _ in workers)
+    assert outcomes == [0, 0, 0, 40]
+    assert SqliteLTMStore(root).count() == 40
@@ -0,0 +1,44 @@
+import os
+import time
+from unittest import mock
+
+from agents.ltm_store import JsonlLTMStore
+
+
+def _entry(employee_id, stress=5):
+    return {"input_data": {"employee_id": employee_id, "stress": stress}, "final_response": {}}
+
+
+def test_append_and_read_back(tmp_path):
+    store = JsonlLTMStore(str(tmp_path))
+    store.append_many([_entry("a", 1), _entry("b", 2), _entry("a", 3)])
+    assert [e["input_data"]["stress"] for e in store.read_employee("a")] == [1, 3]
+    assert store.employee_ids() == ["a", "b"]
+    store.close()
+
+
+def test_idle_writes_are_synced_after_the_interval(tmp_path):
+    store = JsonlLTMStore(str(tmp_path), fsync_every=1000, fsync_interval=0.1)
+    synced = []
+    real_fsync = os.fsync
+    with mock.patch("agents.ltm_store.os.fsync", side_effect=lambda fd: synced.append(fd) or real_fsync(fd)):
+        store.append(_entry("a"))
+        assert synced == []  # below both thresholds at write time
+        deadline = time.monotonic() + 2.0
+        while store._pending and time.monotonic() < deadline:
+            time.sleep(0.02)
+    assert synced, "pending record was never fsynced"
+    store.close()
+    assert store._flusher is None
+
+
+def test_torn_tail_is_dropped(tmp_path):
+    store = JsonlLTMStore(str(tmp_path))
+    store.append(_entry("a", 1))
+    store.close()
+    with open(store._path("a"), "ab") as f:
+        f.write(b'{"input_data": {"employee_id": "a"')
+    store = JsonlLTMStore(str(tmp_path))
+    store.append(_entry("a", 2))
+    assert [e["input_data"]["stress"] for e in store.read_employee("a")] == [1, 2]
+    store.close()
@@ -0,0 +1,36 @@
+import pytest
+
+from agents.metrics import percentile
+from benchmarks.harness import summarize
+
+
+@pytest.mark.parametrize("samples, pct, expected", [
+    (list(range(1, 101)), 99, 99),
+    (list(range(1, 101)), 50, 50),
+    (list(range(1, 101)), 100, 100),
+    (list(range(1, 501)), 95, 475),
+    (list(range(1, 11)), 95, 10),
+    (list(range(1, 11)), 0, 1),
+    ([7], 50, 7),
+])
+def test_nearest_rank(samples, pct, expected):
+    assert percentile(samples, pct) == expected
+
+
+def test_unsorted_and_empty_input():
+    assert percentile([5, 1, 4, 2, 3], 60) == 3
+    assert percentile([], 99) == 0.0
+
+
+def test_summarize():
+    stats = summarize([float(i) for i in range(1, 101)])
+    assert (stats["p50_ms"], stats["p95_ms"], stats["p99_ms"], stats["max_ms"]) == (50.0, 95.0, 99.0, 100.0)
+
+
+def test_histogram_percentiles_match_the_helper():
+    from agents.metrics import Histogram
+
+    histogram = Histogram("test_latency_ms", "test")
+    for value in range(1, 101):
+        histogram.observe(float(value))
+    assert histogram.percentiles() == {"all": {"count": 100, "p50": 50.0, "p95": 95.0, "p99": 99.0}}
@@ -0,0 +1,102 @@
+import json
+import os
+import threading
+
+from agents.response_cache import ResponseCache
+
+RESPONSE = {"empathetic_response": "hi", "actionable_steps": ["rest"], "conversation_starter": "hey"}
+
+
+def test_put_does_not_write_and_save_persists(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = ResponseCache(persist_path=path, enabled=True)
+    cache.put(cache.make_key("high", ["high_stress"]), dict(RESPONSE))
+    assert not os.path.exists(path)
+    cache.save()
+    with open(path) as f:
+        assert list(json.load(f)) == ["high|high_stress"]
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
+
+    reloaded = ResponseCache(persist_path=path, enabled=True)
+    assert reloaded.stats()["variants"] == 1
+
+
+def test_leader_and_followers_get_private_copies():
+    cache = ResponseCache(persist_path="", enabled=True, max_variants=1)
+    started, release = threading.Event(), threading.Event()
+    results = []
+
+    def compute():
+        started.set()
+        release.wait()
+        return {"actionable_steps": ["rest"]}
+
+    leader = threading.Thread(target=lambda: results.append(cache.get_or_compute("high", ["x"], compute)))
+    leader.start()
+    started.wait()
+    follower = threading.Thread(target=lambda: results.append(cache.get_or_compute("high", ["x"], compute)))
+    follower.start()
+    release.set()
+    leader.join()
+    follower.join()
+
+    results[0]["actionable_steps"].append("mutated")
+    assert results[1]["actionable_steps"] == ["rest"]
+    assert cache.get_or_compute("high", ["x"], compute)["actionable_steps"] == ["rest"]
+
+
+def test_caller_that_cannot_lead_never_shares_its_failure():
+    cache = ResponseCache(persist_path="", enabled=True, max_variants=2)
+    started, release = threading.Event(), threading.Event()
+    results = []
+
+    def shed():
+        started.set()
+        release.wait(5.0)
+        raise RuntimeError("shed")
+
+    degraded = threading.Thread(target=lambda: results.append(
+        _outcome(lambda: cache.get_or_compute("high", ["x"], shed, lead=False))))
+    degraded.start()
+    started.wait(5.0)
+    # A healthy caller arriving meanwhile leads its own call instead of waiting
+    assert cache.get_or_compute("high", ["x"], lambda: {"actionable_steps": ["llm"]}) == {"actionable_steps": ["llm"]}
+    release.set()
+    degraded.join(5.0)
+    assert results == ["RuntimeError"]
+
+    # Once a variant exists, a degraded caller takes it rather than asking for another
+    assert cache.get_or_compute("high", ["x"], shed, lead=False) == {"actionable_steps": ["llm"]}
+
+
+def test_async_caller_that_cannot_lead_runs_alone():
+    import asyncio
+
+    cache = ResponseCache(persist_path="", enabled=True)
+
+    async def main():
+        async def slow():
+            await asyncio.sleep(0.05)
+            return {"actionable_steps": ["llm"]}
+
+        async def shed():
+            raise RuntimeError("shed")
+
+        leader = asyncio.ensure_future(cache.aget_or_compute("high", ["x"], slow))
+        await asyncio.sleep(0)
+        try:
+            await cache.aget_or_compute("high", ["x"], shed, lead=False)
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("a degraded caller must not join the healthy call")
+        return await leader
+
+    assert asyncio.run(main()) == {"actionable_steps": ["llm"]}
+
+
+def _outcome(call):
+    try:
+        return call()
+    except Exception as e:
+        return type(e).__name__
@@ -0,0 +1,76 @@
+import json
+import time
+
+from agents.ltm_store import JsonlLTMStore
+from agents.rollups import RollupStore
+
+
+def entry(employee_id, risk, team_id="eng"):
+    return {
+        "timestamp": "2026-01-05T10:00:00",
+        "input_data": {"employee_id": employee_id, "team_id": team_id},
+        "final_response": {"risk_level": risk, "key_factors": ["high_stress"]},
+    }
+
+
+def test_saved_rollups_load_while_the_ltm_is_unchanged(tmp_path):
+    store = JsonlLTMStore(str(tmp_path))
+    path = str(tmp_path / "rollups.json")
+    rollups = RollupStore(path, ltm_size=store.total_size)
+    for risk in ("high", "low"):
+        store.append(entry("e1", risk))
+        rollups.update(entry("e1", risk))
+    rollups.save()
+
+    loaded = RollupStore(path, ltm_size=store.total_size)
+    assert loaded.load()
+    assert loaded.get("eng")["total"]["count"] == 2
+    store.close()
+
+
+def test_writes_after_the_last_save_force_a_rebuild(tmp_path):
+    store = JsonlLTMStore(str(tmp_path))
+    path = str(tmp_path / "rollups.json")
+    rollups = RollupStore(path, ltm_size=store.total_size)
+    store.append(entry("e1", "high"))
+    rollups.update(entry("e1", "high"))
+    rollups.save()
+    # Crash before the next periodic save
+    store.append(entry("e2", "medium"))
+
+    stale = RollupStore(path, ltm_size=store.total_size)
+    assert not stale.load()
+    stale.build(store.iter_all())
+    assert stale.get(None)["total"]["count"] == 2
+    stale.save()
+    assert RollupStore(path, ltm_size=store.total_size).load()
+    store.close()
+
+
+def test_files_without_a_recorded_size_are_trusted(tmp_path):
+    store = JsonlLTMStore(str(tmp_path))
+    store.append(entry("e1", "high"))
+    path = str(tmp_path / "rollups.json")
+    RollupStore(path).save(force=True)
+    with open(path) as f:
+        assert json.load(f)["ltm_size"] is None
+    assert RollupStore(path, ltm_size=store.total_size).load()
+    store.close()
+
+
+def test_update_never_writes_and_autosave_does(tmp_path):
+    path = tmp_path / "rollups.json"
+    rollups = RollupStore(str(path), save_interval=0.05)
+    rollups.update(entry("e1", "high"))
+    assert not path.exists()
+
+    rollups.start_autosave()
+    deadline = time.monotonic() + 5.0
+    while not path.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    rollups.update(entry("e2", "low"))
+    rollups.close()
+
+    loaded = RollupStore(str(path))
+    assert loaded.load()
+    assert loaded.get("eng")["total"]["count"] == 2
@@ -0,0 +1,137 @@
+import itertools
+import os
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+from agents import config
+from agents.idempotency import IdempotencyStore
+from agents.ltm_store import JsonlLTMStore
+from agents.sharding import HashRing, ShardRouter, _Worker, existing_shards, load_layout, rebalance, shard_dir
+
+EMPLOYEES = [f"emp-{n}" for n in range(2000)]
+
+
+def test_ring_spreads_employees_evenly():
+    ring = HashRing(4, vnodes=128)
+    counts = Counter(ring.shard_for(employee_id) for employee_id in EMPLOYEES)
+    assert sorted(counts) == [0, 1, 2, 3]
+    assert all(300 < count < 700 for count in counts.values())
+    assert HashRing(4, vnodes=128).shard_for("emp-7") == ring.shard_for("emp-7")
+
+
+def test_adding_a_shard_only_moves_employees_to_it():
+    before, after = HashRing(4, vnodes=128), HashRing(5, vnodes=128)
+    moved = [e for e in EMPLOYEES if before.shard_for(e) != after.shard_for(e)]
+    assert all(after.shard_for(e) == 4 for e in moved)
+    assert 0.1 < len(moved) / len(EMPLOYEES) < 0.3
+
+
+def entry(employee_id, n):
+    return {"input_data": {"employee_id": employee_id, "stress_level": n},
+            "final_response": {"risk_level": "low"}}
+
+
+def shard_contents(root):
+    contents = {}
+    for shard in existing_shards(root):
+        store = JsonlLTMStore(shard_dir(root, shard))
+        contents[shard] = {e: len(store.read_employee(e)) for e in store.employee_ids()}
+        store.close()
+    return contents
+
+
+def test_rebalance_moves_every_entry_to_its_owner(tmp_path):
+    root = str(tmp_path / "ltm")
+    chroma = str(tmp_path / "chroma")
+    store = JsonlLTMStore(root)
+    employees = EMPLOYEES[:40]
+    for i, employee_id in enumerate(employees):
+        store.append_many([entry(employee_id, n) for n in range(i % 3 + 1)])
+    store.close()
+    expected = {employee_id: i % 3 + 1 for i, employee_id in enumerate(employees)}
+
+    for shards in (3, 5, 2):
+        rebalance(root, shards, vnodes=64, chroma_path=chroma)
+        assert load_layout(root) == {"shards": shards, "vnodes": 64}
+        ring = HashRing(shards, vnodes=64)
+        contents = shard_contents(root)
+        assert sorted(contents) == list(range(shards))
+        found = {}
+        for shard, employees_here in contents.items():
+            assert all(ring.shard_for(e) == shard for e in employees_here)
+            found.update(employees_here)
+        assert found == expected
+    assert not os.path.exists(os.path.join(root, "employees")) or not os.listdir(os.path.join(root, "employees"))
+
+
+def test_restart_backoff_grows_for_crashing_workers(monkeypatch):
+    monkeypatch.setattr(config, "SHARD_RESTART_BACKOFF_MAX", 4.0)
+    worker = _Worker(0)
+    worker.started = time.monotonic()
+    delays = [ShardRouter._restart_delay(worker) for _ in range(5)]
+    assert delays == [0.5, 1.0, 2.0, 4.0, 4.0]
+    worker.started = time.monotonic() - 10
+    assert ShardRouter._restart_delay(worker) == 0.0
+
+
+class _DyingConn:
+    """Accepts sends until closed; recv() then reports the worker as gone."""
+
+    def __init__(self):
+        self.sent = []
+        self.closed = threading.Event()
+
+    def send(self, message):
+        self.sent.append(message)
+
+    def recv(self):
+        self.closed.wait()
+        raise EOFError
+
+
+def test_requests_on_a_dying_worker_fail_fast(monkeypatch):
+    monkeypatch.setattr(config, "SHARD_START_TIMEOUT", 0.2)
+    router = ShardRouter.__new__(ShardRouter)
+    router._closing = True  # no respawn
+    router._ids = itertools.count()
+    worker = _Worker(0)
+    router._workers = [worker]
+    worker.conn = _DyingConn()
+    worker.ready.set()
+    reader = threading.Thread(target=router._read_loop, args=(worker, worker.conn))
+    reader.start()
+
+    request = router._request(0, "status")
+    worker.conn.closed.set()
+    reader.join(5.0)
+    started = time.monotonic()
+    with pytest.raises(ConnectionError):
+        router._reply(*request)
+    assert time.monotonic() - started < 1.0
+    assert worker.pending == {}
+    with pytest.raises(ConnectionError):
+        router._request(0, "status")
+
+
+def test_router_replays_a_redelivered_task(tmp_path):
+    router = ShardRouter.__new__(ShardRouter)
+    router._id, router._supervisor_id, router._current_task_id = "worker", "supervisor", None
+    router._ring = HashRing(2, vnodes=16)
+    router._idempotency = IdempotencyStore(str(tmp_path / "idempotency.jsonl"))
+    calls, sent = [], []
+    router._call = lambda shard, method, *args: calls.append((shard, method)) or {"risk_level": "low"}
+    router.send_message = lambda recipient, message: sent.append(message)
+
+    message = {"type": "task_assignment", "message_id": "m1",
+               "task": {"name": "burnout_check", "parameters": {"employee_id": "e1", "stress_level": 3}}}
+    router.handle_incoming_message(message)
+    router.handle_incoming_message(message)
+
+    assert router.idempotency is router._idempotency
+    assert len(calls) == 1
+    assert len(sent) == 2 and sent[0] == sent[1]
+    assert sent[0]["status"] == "SUCCESS" and sent[0]["related_message_id"] == "m1"
+    router._idempotency.close()
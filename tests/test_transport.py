@@ -0,0 +1,155 @@
+import threading
+import time
+
+import pytest
+
+from agents.transport import (InProcessTransport, TransportFull, UnixSocketBroker, UnixSocketTransport,
+                              _LoopThread)
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def inprocess():
+    transports = []
+
+    def make(**kwargs):
+        kwargs.setdefault("batch_interval", 0.0)
+        transport = InProcessTransport(**kwargs)
+        transports.append(transport)
+        return transport
+
+    yield make
+    for transport in transports:
+        transport.close()
+
+
+def test_inprocess_delivers_and_acks_batches(inprocess):
+    transport = inprocess(batch_size=10)
+    received = []
+    transport.subscribe("worker", received.extend)
+    assert transport.publish_many("worker", [{"n": n} for n in range(5)]) == 5
+    assert wait_until(lambda: transport.stats()["delivered"] == 5)
+    assert [message["n"] for message in received] == list(range(5))
+    assert transport.stats()["retries"] == 0
+
+
+def test_inprocess_retries_a_nacked_batch(inprocess):
+    transport = inprocess(max_retries=3)
+    calls = []
+
+    def flaky(batch):
+        calls.append(batch)
+        if len(calls) < 3:
+            raise RuntimeError("not yet")
+
+    transport.subscribe("worker", flaky)
+    transport.publish("worker", {"n": 1})
+    assert wait_until(lambda: transport.stats()["delivered"] == 1)
+    assert len(calls) == 3
+    assert transport.stats()["retries"] == 2
+    assert transport.dead_letters == []
+
+
+def test_inprocess_dead_letters_after_max_retries(inprocess):
+    transport = inprocess(max_retries=1)
+
+    def broken(batch):
+        raise RuntimeError("boom")
+
+    transport.subscribe("worker", broken)
+    transport.publish("worker", {"n": 1})
+    assert wait_until(lambda: transport.stats()["dead_lettered"] == 1)
+    (letter,) = transport.dead_letters
+    assert letter["recipient"] == "worker" and letter["messages"] == [{"n": 1}]
+    assert transport.stats()["retries"] == 1
+
+
+def test_inprocess_full_mailbox_raises_transport_full(inprocess):
+    transport = inprocess(queue_size=2, batch_size=1, publish_timeout=0.1)
+    release = threading.Event()
+    transport.subscribe("worker", lambda batch: release.wait(5.0))
+    transport.publish("worker", {"n": 0})
+    assert wait_until(lambda: transport.stats()["queue_depth"] == 0)
+    transport.publish("worker", {"n": 1})
+    transport.publish("worker", {"n": 2})
+    with pytest.raises(TransportFull):
+        transport.publish("worker", {"n": 3})
+    assert transport.stats()["rejected"] == 1
+    release.set()
+    assert wait_until(lambda: transport.stats()["delivered"] == 3)
+
+
+def test_inprocess_slow_handler_is_not_redelivered(inprocess):
+    transport = inprocess(ack_timeout=0.2, max_retries=1)
+    calls = []
+
+    def slow(batch):
+        calls.append(batch)
+        time.sleep(0.7)
+
+    transport.subscribe("worker", slow)
+    transport.publish("worker", {"n": 1})
+    assert wait_until(lambda: transport.stats()["delivered"] == 1)
+    assert len(calls) == 1
+    assert transport.stats()["retries"] == 0 and transport.dead_letters == []
+
+
+@pytest.fixture
+def broker(tmp_path):
+    path = str(tmp_path / "broker.sock")
+    loop = _LoopThread("test-broker")
+    server = UnixSocketBroker(path, ack_timeout=0.2, max_retries=1, batch_interval=0.0)
+    loop.call(server.start(), timeout=5.0)
+    yield server
+    loop.stop()
+
+
+def test_unix_slow_handler_keeps_its_lease(broker):
+    publisher = UnixSocketTransport(broker.path, batch_interval=0.0)
+    subscriber = UnixSocketTransport(broker.path, ack_timeout=0.2)
+    calls = []
+
+    def slow(batch):
+        calls.append(batch)
+        time.sleep(0.7)
+
+    try:
+        subscriber.subscribe("worker", slow)
+        time.sleep(0.2)
+        publisher.publish("worker", {"n": 1})
+        assert publisher.flush(5.0)
+        assert wait_until(lambda: broker.stats()["delivered"] == 1)
+        assert len(calls) == 1
+        assert broker.stats()["retries"] == 0 and broker.stats()["dead_lettered"] == 0
+    finally:
+        publisher.close()
+        subscriber.close()
+
+
+def test_unix_nacked_batch_is_retried_then_dead_lettered(broker):
+    publisher = UnixSocketTransport(broker.path, batch_interval=0.0)
+    subscriber = UnixSocketTransport(broker.path)
+    calls = []
+
+    def broken(batch):
+        calls.append(batch)
+        raise RuntimeError("boom")
+
+    try:
+        subscriber.subscribe("worker", broken)
+        time.sleep(0.2)
+        publisher.publish("worker", {"n": 1})
+        assert wait_until(lambda: broker.stats()["dead_lettered"] == 1)
+        assert len(calls) == 2
+        assert broker.stats()["retries"] == 1
+    finally:
+        publisher.close()
+        subscriber.close()
@@ -0,0 +1,35 @@
+import time
+
+from agents.trend_state import TrendTracker, trend_detected
+
+
+def entry(employee_id, risk):
+    return {"input_data": {"employee_id": employee_id, "stress": 6},
+            "final_response": {"risk_level": risk}}
+
+
+def test_update_never_writes_and_autosave_does(tmp_path):
+    path = tmp_path / "trend_state.json"
+    tracker = TrendTracker(str(path), window=2, save_interval=0.05)
+    tracker.update(entry("e1", "medium"))
+    assert not path.exists()
+
+    tracker.start_autosave()
+    tracker.update(entry("e1", "high"))
+    deadline = time.monotonic() + 5.0
+    while not path.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    tracker.close()
+
+    loaded = TrendTracker(str(path), window=2)
+    assert loaded.load() and loaded.entries == 2
+    assert trend_detected(loaded.get("e1"), 2)
+
+
+def test_close_saves_pending_updates(tmp_path):
+    path = tmp_path / "trend_state.json"
+    tracker = TrendTracker(str(path), window=2, save_interval=0).start_autosave()
+    tracker.update(entry("e1", "low"))
+    tracker.close()
+    loaded = TrendTracker(str(path), window=2)
+    assert loaded.load() and loaded.entries == 1
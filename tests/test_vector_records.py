@@ -0,0 +1,37 @@
+import json
+
+from agents.vector_records import build_record, new_entry_id, to_case, where_clause
+
+ENTRY = {
+    "timestamp": "2025-03-01T09:00:00",
+    "input_data": {"employee_id": "e1", "stress": 8, "work_hours": 11, "sleep_hours": 5, "mood": "anxious"},
+    "final_response": {"risk_level": "high", "key_factors": ["long_work_hours", "high_stress"],
+                       "empathetic_suggestion": "Take a break."},
+}
+
+
+def test_record_id_is_the_entry_id():
+    entry = dict(ENTRY, id=new_entry_id())
+    for mode in ("full", "summary", "metadata"):
+        assert build_record(entry, mode)[2] == entry["id"]
+    # Entries written before ids existed still get a unique one
+    assert build_record(ENTRY, "full")[2] != build_record(ENTRY, "full")[2]
+
+
+def test_modes():
+    document, metadata, _, embedding = build_record(ENTRY, "full")
+    assert json.loads(document) == ENTRY and embedding is None
+    document, _, _, embedding = build_record(ENTRY, "metadata")
+    assert document is None and embedding == [8.0, 11.0, 5.0, 1.0, 2.0]
+    document, _, _, _ = build_record(ENTRY, "summary")
+    assert document.startswith("risk: high; factors: high_stress, long_work_hours")
+    assert metadata["user"] == "e1" and metadata["factors"] == "high_stress,long_work_hours"
+
+
+def test_where_clause_and_case():
+    assert where_clause() is None
+    assert where_clause(employee_id="e1") == {"user": "e1"}
+    assert where_clause(exclude_employee="e1", risk="high") == {
+        "$and": [{"user": {"$ne": "e1"}}, {"risk": "high"}]}
+    case = to_case(build_record(ENTRY, "summary")[1], "risk: high", 0.1234567)
+    assert case["employee_id"] == "e1" and case["distance"] == 0.123457 and case["summary"] == "risk: high"